@@ -1,9 +1,18 @@
+import argparse
 import importlib
 import logging
-from typing import Any
+import os
+import tracemalloc
+from typing import Any, Optional
 
+import bank_pool
+import file_watcher
+import transactionfile_reader
 from bank_handler import BankHandler
 from config_handler import ConfigHandler
+from detection_cache import DetectionCache
+from format_index import FormatIndex
+from import_ledger import ImportLedger
 from ynab_api import YNAB_API
 
 # configure our logger
@@ -28,8 +37,328 @@ def build_bank(bank_config: dict[str, Any]) -> BankHandler:
         return BankHandler(config_dict=bank_config)
 
 
+def build_bank_list(config_handler: ConfigHandler) -> list[BankHandler]:
+    """
+    Create a bank object for every section in the configuration.
+
+    :param config_handler: configuration to read bank sections from
+    :type config_handler: ConfigHandler
+    :return: list of bank objects
+    :rtype: list[BankHandler]
+    """
+    bank_obj_list: list[BankHandler] = []
+    for bank_params in config_handler.config.sections():
+        config_dict = config_handler.fix_conf_params(bank_params)
+        # create bank object using config (allows for plugin use)
+        bank_object = build_bank(bank_config=config_dict)
+        bank_obj_list.append(bank_object)
+    return bank_obj_list
+
+
+def open_import_ledger(
+    config_handler: ConfigHandler, bank_obj_list: list[BankHandler]
+) -> Optional[ImportLedger]:
+    """
+    Open the import ledger if any bank skips previously imported files.
+
+    :param config_handler: configuration containing the ledger path
+    :type config_handler: ConfigHandler
+    :param bank_obj_list: list of bank objects to run
+    :type bank_obj_list: list[BankHandler]
+    :return: import ledger, or None if not required
+    :rtype: ImportLedger, optional
+    """
+    if not any(
+        bank_object.config_dict["skip_imported"] is True
+        for bank_object in bank_obj_list
+    ):
+        return None
+    return ImportLedger(config_handler.import_ledger_path)
+
+
+def process_banks(
+    bank_obj_list: list[BankHandler],
+    file_index: dict[str, list[str]],
+    detection_cache: DetectionCache,
+    ledger: Optional[ImportLedger] = None,
+    jobs: int = 1,
+) -> tuple[int, dict[str, Any]]:
+    """
+    Run every bank object against its matching files.
+
+    :param bank_obj_list: list of bank objects to run
+    :type bank_obj_list: list[BankHandler]
+    :param file_index: dictionary mapping bank names to matching files
+    :type file_index: dict[str, list[str]]
+    :param detection_cache: cache of previous detection results
+    :type detection_cache: DetectionCache
+    :param ledger: record of files already processed
+    :type ledger: ImportLedger, optional
+    :param jobs: number of processes to run banks in
+    :type jobs: int
+    :return: number of files processed & transactions for each bank
+    :rtype: tuple[int, dict[str, pd.DataFrame]]
+    """
+    bank_groups = [bank_obj_list]
+    if jobs > 1:
+        bank_groups = bank_pool.group_banks(bank_obj_list, file_index)
+    if len(bank_groups) > 1:
+        bank_pool.run_bank_groups(
+            bank_groups, file_index, detection_cache, ledger, jobs
+        )
+    else:
+        # process account for each config entry
+        for bank_object in bank_obj_list:
+            bank_object.run(
+                matching_files=file_index[
+                    bank_object.config_dict["bank_name"]
+                ],
+                detection_cache=detection_cache,
+                ledger=ledger,
+            )
+    # gather results in configuration order
+    files_processed = 0
+    bank_transaction_dict: dict[str, Any] = dict()
+    for bank_object in bank_obj_list:
+        if bank_object.transaction_df is not None:
+            bank_transaction_dict[bank_object.name] = (
+                bank_object.transaction_df
+            )
+        files_processed += bank_object.files_processed
+    detection_cache.save()
+    if ledger is not None:
+        ledger.commit()
+    return files_processed, bank_transaction_dict
+
+
+def record_uploads(
+    bank_obj_list: list[BankHandler],
+    uploaded_banks: set[str],
+    ledger: Optional[ImportLedger] = None,
+) -> None:
+    """
+    Record the files of banks whose transactions have been uploaded as
+    imported. Files of banks whose upload failed are parsed again by the
+    next run.
+
+    :param bank_obj_list: list of bank objects which have been run
+    :type bank_obj_list: list[BankHandler]
+    :param uploaded_banks: names of the banks whose transactions were uploaded
+    :type uploaded_banks: set[str]
+    :param ledger: record of files already processed
+    :type ledger: ImportLedger, optional
+    """
+    if ledger is None:
+        return
+    for bank_object in bank_obj_list:
+        if bank_object.name in uploaded_banks:
+            bank_object.record_imports(ledger)
+    ledger.commit()
+
+
+def build_format_index(
+    bank_obj_list: list[BankHandler], detection_cache: DetectionCache
+) -> FormatIndex:
+    """
+    Index bank formats by file content, including the header lines
+    learned from previously parsed files.
+
+    :param bank_obj_list: list of bank objects to index
+    :type bank_obj_list: list[BankHandler]
+    :param detection_cache: cache of previous detection results
+    :type detection_cache: DetectionCache
+    :return: index of bank formats
+    :rtype: FormatIndex
+    """
+    return FormatIndex(
+        [bank_object.config_dict for bank_object in bank_obj_list],
+        known_files=(
+            entry["values"] for entry in detection_cache.entries.values()
+        ),
+    )
+
+
+def match_new_file(
+    file_path: str,
+    matcher: transactionfile_reader.FilenameMatcher,
+    content_configs: dict[str, dict[str, Any]],
+    format_index: FormatIndex,
+    file_index: dict[str, list[str]],
+) -> None:
+    """
+    Add a new file to the index of every bank it belongs to.
+
+    :param file_path: path to the new file (or archive member)
+    :type file_path: str
+    :param matcher: filename matcher for the file's directory
+    :type matcher: transactionfile_reader.FilenameMatcher
+    :param content_configs: banks in the directory matching files by content
+    :type content_configs: dict[str, dict[str, Any]]
+    :param format_index: index of bank formats by file content
+    :type format_index: FormatIndex
+    :param file_index: dictionary mapping bank names to matching files
+    :type file_index: dict[str, list[str]]
+    """
+    matches = matcher.match(os.path.basename(file_path))
+    if not matches and content_configs:
+        matches = transactionfile_reader.match_file_content(
+            file_path, content_configs, format_index
+        )
+    for config_dict in matches:
+        file_index[config_dict["bank_name"]].append(file_path)
+
+
+def watch_banks(
+    config_handler: ConfigHandler,
+    bank_obj_list: list[BankHandler],
+    detection_cache: DetectionCache,
+    interval: float,
+    ledger: Optional[ImportLedger] = None,
+    jobs: int = 1,
+) -> None:
+    """
+    Process new files as they appear in the source directories,
+    until interrupted.
+
+    :param config_handler: configuration used for YNAB API access
+    :type config_handler: ConfigHandler
+    :param bank_obj_list: list of bank objects to run
+    :type bank_obj_list: list[BankHandler]
+    :param detection_cache: cache of previous detection results
+    :type detection_cache: DetectionCache
+    :param interval: seconds between directory scans when polling
+    :type interval: float
+    :param ledger: record of files already processed
+    :type ledger: ImportLedger, optional
+    :param jobs: number of processes to run banks in
+    :type jobs: int
+    """
+    # group banks by the directory their files appear in
+    directory_configs: dict[str, list[dict[str, Any]]] = dict()
+    for bank_object in bank_obj_list:
+        config_dict = bank_object.config_dict
+        if config_dict["input_filename"] == "":
+            continue
+        directories, _ = transactionfile_reader.resolve_source_paths(
+            config_dict["path"]
+        )
+        # subfolders created after we start watching aren't watched
+        if config_dict["recursive"] is True:
+            _, directories = transactionfile_reader.scan_directories(
+                directories, recursive=True
+            )
+        for directory in directories:
+            directory_configs.setdefault(directory, []).append(config_dict)
+    matchers = {
+        directory: transactionfile_reader.FilenameMatcher(configs)
+        for directory, configs in directory_configs.items()
+    }
+
+    content_configs = {
+        directory: {
+            config_dict["bank_name"]: config_dict
+            for config_dict in configs
+            if config_dict["content_match"] is True
+        }
+        for directory, configs in directory_configs.items()
+    }
+
+    # directories in which archives are searched for input files
+    archive_directories = {
+        directory
+        for directory, configs in directory_configs.items()
+        if any(config_dict["archives"] is True for config_dict in configs)
+    }
+
+    watcher = file_watcher.create_watcher(list(matchers), interval)
+    api = None
+    logging.info(f"Watching for new files in: {', '.join(matchers)}")
+    try:
+        while True:
+            file_index: dict[str, list[str]] = {
+                bank_object.config_dict["bank_name"]: []
+                for bank_object in bank_obj_list
+            }
+            file_paths = watcher.wait()
+            # pick up headers learned since the last batch
+            format_index = build_format_index(bank_obj_list, detection_cache)
+            for file_path in file_paths:
+                directory = os.path.dirname(file_path)
+                matcher = matchers.get(directory)
+                if matcher is None:
+                    continue
+                if directory in archive_directories:
+                    member_paths = transactionfile_reader.expand_archives(
+                        [file_path]
+                    )
+                else:
+                    member_paths = [file_path]
+                for member_path in member_paths:
+                    match_new_file(
+                        member_path,
+                        matcher,
+                        content_configs[directory],
+                        format_index,
+                        file_index,
+                    )
+
+            active_banks = [
+                bank_object
+                for bank_object in bank_obj_list
+                if file_index[bank_object.config_dict["bank_name"]]
+            ]
+            if not active_banks:
+                continue
+            files_processed, bank_transaction_dict = process_banks(
+                active_banks, file_index, detection_cache, ledger, jobs
+            )
+            logging.info(f"\n{files_processed} new files processed.\n")
+            if bank_transaction_dict:
+                # keep watching even if an upload fails
+                try:
+                    if api is None:
+                        api = YNAB_API(config_handler)
+                    uploaded_banks = api.run(bank_transaction_dict)
+                    record_uploads(active_banks, uploaded_banks, ledger)
+                except Exception as e:
+                    logging.error(f"Unable to upload transactions: {e}")
+    except KeyboardInterrupt:
+        logging.info("Stopped watching for new files.")
+    finally:
+        watcher.close()
+
+
 # Let's run this thing!
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="bank2ynab")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and process new files as they are downloaded",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="seconds between directory scans in watch mode when the"
+        " system can't notify us of new files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="log the memory used by each stage of parsing a file",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes to run banks in; banks with files in"
+        " common run in the same process (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    if args.trace_memory:
+        tracemalloc.start()
+
     try:
         config_handler = ConfigHandler()
     except FileNotFoundError:
@@ -37,28 +366,45 @@ if __name__ == "__main__":
         pass
     else:
         # generate list of bank objects to process
-        bank_obj_list: list[BankHandler] = []
-        for bank_params in config_handler.config.sections():
-            config_dict = config_handler.fix_conf_params(bank_params)
-            # create bank object using config (allows for plugin use)
-            bank_object = build_bank(bank_config=config_dict)
-            bank_obj_list.append(bank_object)
-
-        # initialize variables for summary:
-        files_processed = 0
-        bank_transaction_dict: dict[str, list] = dict()
-        # process account for each config entry
-        for bank_object in bank_obj_list:
-            bank_object.run()
-            if bank_object.transaction_list:
-                bank_transaction_dict[bank_object.name] = (
-                    bank_object.transaction_list
-                )
-            files_processed += bank_object.files_processed
+        bank_obj_list = build_bank_list(config_handler)
+
+        # load previously detected file encodings & formats
+        detection_cache = DetectionCache(
+            cache_path=config_handler.detection_cache_path,
+            max_entries=config_handler.get_config_line_int(
+                "DEFAULT", "Detection Cache Size"
+            ),
+        )
+
+        # scan each source directory once for files matching any bank
+        file_index = transactionfile_reader.build_file_index(
+            [bank_object.config_dict for bank_object in bank_obj_list],
+            format_index=build_format_index(bank_obj_list, detection_cache),
+        )
+
+        # load record of files already processed
+        ledger = open_import_ledger(config_handler, bank_obj_list)
+
+        files_processed, bank_transaction_dict = process_banks(
+            bank_obj_list, file_index, detection_cache, ledger, args.jobs
+        )
         logging.info(
             f"\nFile processing complete! {files_processed} files processed.\n"
         )
 
         if bank_transaction_dict:
             api = YNAB_API(config_handler)
-            api.run(bank_transaction_dict)
+            uploaded_banks = api.run(bank_transaction_dict)
+            record_uploads(bank_obj_list, uploaded_banks, ledger)
+
+        if args.watch:
+            watch_banks(
+                config_handler,
+                bank_obj_list,
+                detection_cache,
+                args.interval,
+                ledger,
+                args.jobs,
+            )
+        if ledger is not None:
+            ledger.close()
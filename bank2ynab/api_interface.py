@@ -1,4 +1,5 @@
 import logging
+from typing import Union
 
 import requests
 from ynab_api_response import YNABError
@@ -26,7 +27,11 @@ class APIInterface:
 
 
 def access_api(
-    api_token: str, budget_id: str, keyword: str, method: str, data: dict
+    api_token: str,
+    budget_id: str,
+    keyword: str,
+    method: str,
+    data: Union[dict, bytes],
 ) -> dict:
     base_url = "https://api.youneedabudget.com/v1/budgets/"
 
@@ -39,7 +44,13 @@ def access_api(
     if method == "post":
         logging.info(f"\tSending '{keyword}' data to YNAB API...")
 
-        response = requests.post(url, json=data)
+        if isinstance(data, bytes):
+            # already encoded as JSON
+            response = requests.post(
+                url, data=data, headers={"Content-Type": "application/json"}
+            )
+        else:
+            response = requests.post(url, json=data)
     else:
         logging.info(f"\tReading '{keyword}' data from YNAB API...")
         response = requests.get(url)
@@ -69,7 +80,9 @@ def api_read(api_token: str, budget_id: str, keyword: str) -> dict:
     return return_data[keyword]
 
 
-def post_transactions(api_token: str, budget_id: str, data: dict) -> None:
+def post_transactions(
+    api_token: str, budget_id: str, data: Union[dict, bytes]
+) -> bool:
     """
     Send transaction data to YNAB via API call
 
@@ -77,8 +90,10 @@ def post_transactions(api_token: str, budget_id: str, data: dict) -> None:
     :type api_token: str
     :param budget_id: id of budget to post transactions to
     :type budget_id: str
-    :param data: transaction data in json format
-    :type data: str
+    :param data: transaction data, or the same already encoded as json
+    :type data: dict | bytes
+    :return: whether the transactions were uploaded
+    :rtype: bool
     """
 
     logging.info("Uploading transactions to YNAB...")
@@ -98,6 +113,8 @@ def post_transactions(api_token: str, budget_id: str, data: dict) -> None:
         )
     except YNABError as e:
         logging.error(f"YNAB API Error: {e}")
+        return False
+    return True
 
 
 def fix_id_based_dicts(input_data: dict) -> dict[str, dict]:
@@ -2,11 +2,16 @@ import logging
 import os
 import traceback
 from os import path
-from typing import Any
+from typing import Any, Optional
 
 import dataframe_handler
+import format_index
+import import_ledger
+import pandas as pd
 import transactionfile_reader
 from dataframe_handler import DataframeHandler
+from detection_cache import DetectionCache
+from import_ledger import ImportLedger
 
 
 class BankHandler:
@@ -26,30 +31,114 @@ class BankHandler:
         self.name = config_dict.get("bank_name", "DEFAULT")
         self.config_dict = config_dict
         self.files_processed = 0
-        self.transaction_list: list[dict] = list()
-
-    def run(self) -> None:
-        matching_files = transactionfile_reader.get_files(
-            name=self.config_dict["bank_name"],
-            file_pattern=self.config_dict["input_filename"],
-            try_path=self.config_dict["path"],
-            regex_active=self.config_dict["regex"],
-            ext=self.config_dict["ext"],
-            prefix=self.config_dict["fixed_prefix"],
-        )
+        # API transactions from every file, kept as columns until upload
+        self.transaction_df: Optional[pd.DataFrame] = None
+        # dates already parsed with this bank's date format
+        self.date_cache: dict[Any, Any] = dict()
+        # payee & memo strings already cleaned for this bank
+        self.string_cache: dict[Any, Any] = dict()
+        # ledger records of files imported, kept until they're uploaded
+        self.pending_imports: list[tuple] = list()
+
+    def run(
+        self,
+        matching_files: Optional[list[str]] = None,
+        detection_cache: Optional[DetectionCache] = None,
+        ledger: Optional[ImportLedger] = None,
+    ) -> None:
+        """
+        Parse every matching input file for this bank.
+
+        :param matching_files: pre-matched list of input files
+        (e.g. from a shared directory index), searched for if not provided
+        :type matching_files: list[str], optional
+        :param detection_cache: cache of previous detection results
+        :type detection_cache: DetectionCache, optional
+        :param ledger: record of files already processed
+        :type ledger: ImportLedger, optional
+        """
+        # reset results in case this bank has been run before
+        self.files_processed = 0
+        self.transaction_df = None
+        self.pending_imports = list()
+
+        if matching_files is None:
+            matching_files = transactionfile_reader.get_files(
+                name=self.config_dict["bank_name"],
+                file_pattern=self.config_dict["input_filename"],
+                try_path=self.config_dict["path"],
+                regex_active=self.config_dict["regex"],
+                ext=self.config_dict["ext"],
+                prefix=self.config_dict["fixed_prefix"],
+                recursive=self.config_dict["recursive"],
+                archives=self.config_dict["archives"],
+            )
 
         file_dfs: list = list()
+        # account & import IDs of the transactions in file_dfs
+        seen_keys: set = set()
+        if self.config_dict["skip_imported"] is not True:
+            ledger = None
+        config_hash = ""
+        if ledger is not None:
+            config_hash = import_ledger.get_config_hash(self.config_dict)
+        files_skipped = 0
 
         for src_file in matching_files:
+            # a previous bank may have already removed the file
+            if not transactionfile_reader.source_exists(src_file):
+                continue
+            # archive members are only ever read into memory
+            archive_path = transactionfile_reader.split_archive_path(src_file)
+            if archive_path is not None and not self._can_buffer():
+                logging.info(
+                    f"\nSkipping archived file: {src_file} ({self.name}),"
+                    " this bank's plugin only works on extracted files"
+                )
+                continue
+            # skip files whose contents have already been processed
+            input_file = src_file
+            file_hash = ""
+            if ledger is not None:
+                file_hash = ledger.get_hash(src_file)
+                result = ledger.lookup(file_hash, self.name, config_hash)
+                if result is not None:
+                    logging.debug(
+                        f"Skipping input file: {src_file} ({self.name}),"
+                        f" already processed ({result})"
+                    )
+                    files_skipped += 1
+                    continue
             logging.info(f"\nParsing input file: {src_file} ({self.name})")
             try:
-                # perform preprocessing operations on file if required
-                src_file = self._preprocess_file(
-                    file_path=src_file,
-                    plugin_args=self.config_dict["plugin_args"],
-                )
+                src_data = None
+                if self._buffer_source() or archive_path is not None:
+                    # read the file once & share it between all later steps
+                    src_data = transactionfile_reader.read_file_bytes(src_file)
+                    src_data = self._preprocess_data(
+                        data=src_data,
+                        plugin_args=self.config_dict["plugin_args"],
+                    )
+                else:
+                    # perform preprocessing operations on file if required
+                    src_file = self._preprocess_file(
+                        file_path=src_file,
+                        plugin_args=self.config_dict["plugin_args"],
+                    )
                 # get file's encoding
-                src_encod = transactionfile_reader.detect_encoding(src_file)
+                src_encod = self._get_encoding(
+                    src_file, detection_cache, src_data
+                )
+                # streamed files are written to the output file as parsed
+                engine = self.config_dict["dataframe_engine"]
+                chunk_size = int(self.config_dict["chunk_size"])
+                output_path = None
+                if (
+                    engine == "pandas"
+                    and chunk_size > 0
+                    and self.config_dict["save_output"] is True
+                ):
+                    output_path = self._get_output_path(src_file)
                 # create our base dataframe
 
                 df_handler = DataframeHandler()
@@ -67,6 +156,17 @@ class BankHandler:
                     date_dedupe=self.config_dict["date_dedupe"],
                     fill_memo=self.config_dict["payee_to_memo"],
                     currency_fix=self.config_dict["currency_mult"],
+                    data=src_data,
+                    csv_engine=self.config_dict["csv_engine"],
+                    decimal_sep=self.config_dict["decimal_separator"],
+                    thousands_sep=self.config_dict["thousands_separator"],
+                    exact_amounts=self.config_dict["exact_amounts"],
+                    date_cache=self.date_cache,
+                    string_cache=self.string_cache,
+                    chunk_size=chunk_size,
+                    output_path=output_path,
+                    engine=engine,
+                    arrow_strings=self.config_dict["arrow_strings"],
                 )
 
                 self.files_processed += 1
@@ -75,33 +175,240 @@ class BankHandler:
                     f"No output data from this file for this bank. ({e})"
                 )
                 logging.debug(traceback.format_exc())
+                if ledger is not None:
+                    self._record_result(
+                        ledger,
+                        input_file,
+                        file_hash,
+                        config_hash,
+                        import_ledger.NO_DATA,
+                    )
             else:
                 # make sure our data is not blank before writing
-                if not df_handler.df.empty:
+                if not df_handler.empty:
                     # only save a file if required
-                    if self.config_dict["save_output"] is True:
+                    if output_path is not None:
+                        logging.info(f"Wrote output file: {output_path}")
+                    elif self.config_dict["save_output"] is True:
                         # write export file
-                        output_path = get_output_path(
-                            input_path=src_file,
-                            prefix=self.config_dict["fixed_prefix"],
-                            ext=self.config_dict["output_ext"],
-                        )
+                        output_path = self._get_output_path(src_file)
                         logging.info(f"Writing output file: {output_path}")
                         df_handler.output_csv(output_path)
-                    # save api transaction data for each bank to list
-                    file_dfs.append(df_handler.api_transaction_df)
-                    # delete original csv file
-                    if self.config_dict["delete_original"] is True:
+                    # save api transaction data for each bank to list,
+                    # without transactions already in an earlier file
+                    file_dfs.append(
+                        dataframe_handler.drop_seen_transactions(
+                            df_handler.api_transaction_df, seen_keys
+                        )
+                    )
+                    # remember which bank format this file matched
+                    if detection_cache is not None:
+                        detected = {"bank": self.config_dict["bank_name"]}
+                        # header lines identify later files in this format
+                        if self.config_dict["content_match"] is True:
+                            detected["header"] = format_index.get_header_hash(
+                                src_file,
+                                int(self.config_dict["header_rows"]),
+                                data=src_data,
+                            )
+                        detection_cache.store(src_file, **detected)
+                    # files are only recorded as imported once uploaded
+                    if ledger is not None:
+                        self.pending_imports.extend(
+                            (
+                                content_hash,
+                                self.name,
+                                config_hash,
+                                import_ledger.IMPORTED,
+                                len(df_handler.api_transaction_df),
+                            )
+                            for content_hash in self._get_file_hashes(
+                                ledger, input_file, file_hash
+                            )
+                        )
+                    # delete original csv file (archives are left intact)
+                    if (
+                        self.config_dict["delete_original"] is True
+                        and archive_path is None
+                    ):
                         logging.info(f"Removing input file: {src_file}")
                         os.remove(src_file)
                 else:
                     logging.info(
                         "No output data from this file for this bank."
                     )
+                    if ledger is not None:
+                        self._record_result(
+                            ledger,
+                            input_file,
+                            file_hash,
+                            config_hash,
+                            import_ledger.NO_DATA,
+                        )
+        if files_skipped:
+            logging.info(
+                f"\nSkipped {files_skipped} previously processed files"
+                f" ({self.name})"
+            )
         # don't add empty transaction dataframes
         if file_dfs:
-            combined_df = dataframe_handler.combine_dfs(file_dfs)
-            self.transaction_list = combined_df.to_dict(orient="records")
+            combined_df = dataframe_handler.combine_dfs(
+                file_dfs, deduplicate=False
+            )
+            self.transaction_df = combined_df
+
+    @property
+    def transaction_list(self) -> list[dict]:
+        """
+        API transactions from every file as a list of dictionaries, one
+        per transaction (see transaction_df).
+
+        :return: list of transactions
+        :rtype: list[dict]
+        """
+        if self.transaction_df is None:
+            return list()
+        return dataframe_handler.expand_api_constants(
+            self.transaction_df
+        ).to_dict(orient="records")
+
+    def record_imports(self, ledger: ImportLedger) -> None:
+        """
+        Record the files parsed by the last run as imported, once their
+        transactions have been uploaded.
+
+        :param ledger: record of files already processed
+        :type ledger: ImportLedger
+        """
+        for record in self.pending_imports:
+            ledger.record(*record)
+        self.pending_imports = list()
+
+    def _buffer_source(self) -> bool:
+        """
+        Check whether source files should be read into memory once
+        rather than being read from disk by each processing step.
+        Plugins which only preprocess files on disk always use the file.
+
+        :return: whether to read source files into memory
+        :rtype: bool
+        """
+        if self.config_dict["buffer_source"] is not True:
+            return False
+        return self._can_buffer()
+
+    def _can_buffer(self) -> bool:
+        """
+        Check whether this bank can process source files held in memory,
+        i.e. it doesn't use a plugin which only preprocesses files on disk.
+
+        :return: whether source files can be read into memory
+        :rtype: bool
+        """
+        plugin_class = type(self)
+        return (
+            plugin_class._preprocess_file is BankHandler._preprocess_file
+            or plugin_class._preprocess_data
+            is not BankHandler._preprocess_data
+        )
+
+    def _get_output_path(self, src_file: str) -> str:
+        """
+        Get the path of the output file for an input file.
+
+        :param src_file: path to input file or archive member
+        :type src_file: str
+        :return: path to write output file to
+        :rtype: str
+        """
+        return get_output_path(
+            input_path=get_output_location(src_file),
+            prefix=self.config_dict["fixed_prefix"],
+            ext=self.config_dict["output_ext"],
+        )
+
+    def _record_result(
+        self,
+        ledger: ImportLedger,
+        input_file: str,
+        file_hash: str,
+        config_hash: str,
+        result: str,
+    ) -> None:
+        """
+        Record the result of processing a file in the import ledger.
+
+        :param ledger: record of files already processed
+        :type ledger: ImportLedger
+        :param input_file: path to the original input file
+        :type input_file: str
+        :param file_hash: content hash of the file before processing
+        :type file_hash: str
+        :param config_hash: fingerprint of this bank's configuration
+        :type config_hash: str
+        :param result: result to record, e.g. import_ledger.NO_DATA
+        :type result: str
+        """
+        for content_hash in self._get_file_hashes(
+            ledger, input_file, file_hash
+        ):
+            ledger.record(content_hash, self.name, config_hash, result)
+
+    def _get_file_hashes(
+        self, ledger: ImportLedger, input_file: str, file_hash: str
+    ) -> set[str]:
+        """
+        Get the content hashes to record for a processed file.
+        Plugins may rewrite the file while preprocessing it, so its new
+        contents are recorded as well.
+
+        :param ledger: record of files already processed
+        :type ledger: ImportLedger
+        :param input_file: path to the original input file
+        :type input_file: str
+        :param file_hash: content hash of the file before processing
+        :type file_hash: str
+        :return: content hashes of the file
+        :rtype: set[str]
+        """
+        file_hashes = {file_hash}
+        if transactionfile_reader.source_exists(input_file):
+            file_hashes.add(ledger.get_hash(input_file))
+        return file_hashes
+
+    def _get_encoding(
+        self,
+        file_path: str,
+        detection_cache: Optional[DetectionCache],
+        data: Optional[bytes] = None,
+    ) -> str:
+        """
+        Get a file's encoding, reusing a cached result for unchanged files.
+
+        :param file_path: path to file
+        :type file_path: str
+        :param detection_cache: cache of previous detection results
+        :type detection_cache: DetectionCache, optional
+        :param data: contents of the file if already read into memory
+        :type data: bytes, optional
+        :return: encoding of the file
+        :rtype: str
+        """
+        config_encoding = self.config_dict["encoding"]
+        if detection_cache is None or config_encoding != "":
+            return transactionfile_reader.detect_encoding(
+                filepath=file_path, encoding=config_encoding, data=data
+            )
+        cached_values = detection_cache.get(file_path)
+        if cached_values and "encoding" in cached_values:
+            encoding = cached_values["encoding"]
+            logging.info(f"\tOpening file using cached encoding {encoding}")
+            return encoding
+        encoding = transactionfile_reader.detect_encoding(
+            filepath=file_path, data=data
+        )
+        detection_cache.store(file_path, encoding=encoding)
+        return encoding
 
     def _preprocess_file(self, file_path: str, plugin_args: list[Any]) -> str:
         """
@@ -112,6 +419,33 @@ class BankHandler:
         # intentionally empty - plugins can use this function
         return file_path
 
+    def _preprocess_data(self, data: bytes, plugin_args: list[Any]) -> bytes:
+        """
+        in-memory counterpart of _preprocess_file, used when source files
+        are buffered - plugins implementing it can work without writing
+        to the source file
+        :param data: contents of the source file
+        """
+        # intentionally empty - plugins can use this function
+        return data
+
+
+def get_output_location(input_path: str) -> str:
+    """
+    Returns the path output files should be named after: the input file
+    itself, or for archive members, the member's name beside its archive.
+
+    :param input_path: path to input file or archive member
+    :type input_path: str
+    :return: path to name the output file after
+    :rtype: str
+    """
+    archive_path = transactionfile_reader.split_archive_path(input_path)
+    if archive_path is None:
+        return input_path
+    archive_file, member = archive_path
+    return path.join(path.dirname(archive_file), member.split("/")[-1])
+
 
 def get_output_path(input_path: str, prefix: str, ext: str) -> str:
     """
@@ -0,0 +1,177 @@
+import logging
+import logging.handlers
+import multiprocessing
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+from bank_handler import BankHandler
+from detection_cache import DetectionCache
+from import_ledger import ImportLedger
+
+
+def group_banks(
+    bank_obj_list: list[BankHandler], file_index: dict[str, list[str]]
+) -> list[list[BankHandler]]:
+    """
+    Group bank objects which have matching files in common, so that no
+    two banks in different groups read, write or remove the same files.
+    Banks keep their configuration order, within & between groups.
+
+    :param bank_obj_list: list of bank objects to group
+    :type bank_obj_list: list[BankHandler]
+    :param file_index: dictionary mapping bank names to matching files
+    :type file_index: dict[str, list[str]]
+    :return: list of groups of bank objects
+    :rtype: list[list[BankHandler]]
+    """
+    # index of the group each bank has been merged into
+    group_indexes = list(range(len(bank_obj_list)))
+    file_groups: dict[str, int] = dict()
+    for index, bank_object in enumerate(bank_obj_list):
+        for file_path in file_index[bank_object.config_dict["bank_name"]]:
+            group_index = file_groups.setdefault(file_path, index)
+            if group_indexes[index] != group_indexes[group_index]:
+                # merge this bank's group into the earlier one
+                old_group = group_indexes[index]
+                group_indexes = [
+                    group_indexes[group_index] if group == old_group else group
+                    for group in group_indexes
+                ]
+    groups: dict[int, list[BankHandler]] = dict()
+    for index, bank_object in enumerate(bank_obj_list):
+        groups.setdefault(group_indexes[index], []).append(bank_object)
+    return list(groups.values())
+
+
+def run_bank_groups(
+    bank_groups: list[list[BankHandler]],
+    file_index: dict[str, list[str]],
+    detection_cache: DetectionCache,
+    ledger: Optional[ImportLedger],
+    jobs: int,
+) -> None:
+    """
+    Run groups of bank objects in a pool of processes, each group's banks
+    one after another. The banks are updated with their results, and
+    detection results & ledger records are merged in group order, as if
+    the groups had been run here one after another. Log records are sent
+    back through a queue, and handled here one at a time.
+
+    :param bank_groups: groups of bank objects to run (see group_banks)
+    :type bank_groups: list[list[BankHandler]]
+    :param file_index: dictionary mapping bank names to matching files
+    :type file_index: dict[str, list[str]]
+    :param detection_cache: cache of previous detection results
+    :type detection_cache: DetectionCache
+    :param ledger: record of files already processed
+    :type ledger: ImportLedger, optional
+    :param jobs: maximum number of processes
+    :type jobs: int
+    """
+    if ledger is not None:
+        # let the workers see everything recorded so far
+        ledger.commit()
+    root_logger = logging.getLogger()
+    log_queue: Any = multiprocessing.Queue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *root_logger.handlers, respect_handler_level=True
+    )
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(bank_groups)),
+            initializer=init_worker,
+            initargs=(log_queue, root_logger.level, tracemalloc.is_tracing()),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    run_bank_group,
+                    bank_group,
+                    {
+                        bank_object.config_dict["bank_name"]: file_index[
+                            bank_object.config_dict["bank_name"]
+                        ]
+                        for bank_object in bank_group
+                    },
+                    detection_cache,
+                    ledger.db_path if ledger is not None else None,
+                )
+                for bank_group in bank_groups
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        listener.stop()
+    for bank_group, (run_banks, stored_entries, ledger_rows) in zip(
+        bank_groups, results
+    ):
+        for bank_object, run_bank in zip(bank_group, run_banks):
+            # results (transactions, file count) & cached values
+            vars(bank_object).update(vars(run_bank))
+        detection_cache.update(stored_entries)
+        if ledger is not None and ledger_rows is not None:
+            ledger.write_rows(ledger_rows)
+
+
+def init_worker(log_queue: Any, log_level: int, trace_memory: bool) -> None:
+    """
+    Set up a worker process to send its log records to a queue, and to
+    trace memory use if the main process does.
+
+    :param log_queue: queue of log records handled by the main process
+    :type log_queue: multiprocessing.Queue
+    :param log_level: level of messages to log
+    :type log_level: int
+    :param trace_memory: whether to trace memory allocations
+    :type trace_memory: bool
+    """
+    root_logger = logging.getLogger()
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+    if trace_memory:
+        tracemalloc.start()
+
+
+def run_bank_group(
+    bank_group: list[BankHandler],
+    file_index: dict[str, list[str]],
+    detection_cache: DetectionCache,
+    ledger_path: Optional[str],
+) -> tuple[
+    list[BankHandler], dict[str, dict[str, Any]], Optional[dict[str, Any]]
+]:
+    """
+    Run a group of bank objects one after another in a worker process.
+
+    :param bank_group: bank objects to run
+    :type bank_group: list[BankHandler]
+    :param file_index: dictionary mapping bank names to matching files
+    :type file_index: dict[str, list[str]]
+    :param detection_cache: copy of the cache of detection results
+    :type detection_cache: DetectionCache
+    :param ledger_path: path of the import ledger, if used
+    :type ledger_path: str, optional
+    :return: bank objects after running, detection results stored & rows
+    to be written to the import ledger (if used)
+    :rtype: tuple
+    """
+    ledger = None
+    if ledger_path is not None:
+        ledger = ImportLedger(ledger_path, deferred=True)
+    try:
+        for bank_object in bank_group:
+            bank_object.run(
+                matching_files=file_index[
+                    bank_object.config_dict["bank_name"]
+                ],
+                detection_cache=detection_cache,
+                ledger=ledger,
+            )
+    finally:
+        if ledger is not None:
+            ledger.close()
+    return (
+        bank_group,
+        detection_cache.get_stored_entries(),
+        ledger.pending_rows if ledger is not None else None,
+    )
@@ -16,6 +16,12 @@ class ConfigHandler:
         self.user_conf_path = os.path.join(
             project_dir, "user_configuration.conf"
         )
+        self.detection_cache_path = os.path.join(
+            project_dir, "detection_cache.json"
+        )
+        self.import_ledger_path = os.path.join(
+            project_dir, "import_ledger.sqlite3"
+        )
 
         self.config = self.get_configs()
 
@@ -68,6 +74,10 @@ class ConfigHandler:
                 section, "Source Filename Pattern"
             ),
             "path": self.get_config_line_str(section, "Source Path"),
+            "recursive": self.get_config_line_boo(
+                section, "Search Subfolders"
+            ),
+            "archives": self.get_config_line_boo(section, "Search Archives"),
             "ext": self.get_config_line_str(
                 section, "Source Filename Extension"
             ),
@@ -86,6 +96,14 @@ class ConfigHandler:
             ),
             "header_rows": self.get_config_line_int(section, "Header Rows"),
             "footer_rows": self.get_config_line_int(section, "Footer Rows"),
+            "csv_engine": self.get_config_line_str(section, "CSV Parser"),
+            "chunk_size": self.get_config_line_int(section, "Chunk Size"),
+            "dataframe_engine": self.get_config_line_str(
+                section, "Dataframe Engine"
+            ),
+            "arrow_strings": self.get_config_line_boo(
+                section, "Arrow Strings"
+            ),
             "date_format": self.get_config_line_str(section, "Date Format"),
             "date_dedupe": self.get_config_line_boo(
                 section, "Date De-Duplication"
@@ -109,12 +127,30 @@ class ConfigHandler:
             "api_account": self.get_config_line_lst(
                 section, "YNAB Account ID", "|"
             ),
+            "decimal_separator": self.get_config_line_str(
+                section, "Decimal Separator"
+            ),
+            "thousands_separator": self.get_config_line_str(
+                section, "Thousands Separator"
+            ),
             "currency_mult": self.get_config_line_flt(
                 section, "Currency Conversion Factor"
             ),
+            "exact_amounts": self.get_config_line_boo(
+                section, "Exact Amounts"
+            ),
             "save_output": self.get_config_line_boo(
                 section, "Save Output File"
             ),
+            "buffer_source": self.get_config_line_boo(
+                section, "Buffer Source File"
+            ),
+            "content_match": self.get_config_line_boo(
+                section, "Match Files By Content"
+            ),
+            "skip_imported": self.get_config_line_boo(
+                section, "Skip Imported Files"
+            ),
         }
 
         # quick n' dirty fix for tabs as delimiters
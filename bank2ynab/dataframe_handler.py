@@ -1,7 +1,55 @@
+import codecs
+import contextlib
+import functools
+import importlib
+import io
+import itertools
 import logging
-
+import operator
+import os
+import re
+import tracemalloc
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from typing import IO, Any, AnyStr, Iterator, Optional, Union
+
+import numpy as np
 import pandas as pd
 
+# amount of data read from the end of a file at first to find its footer
+FOOTER_SCAN_BYTES = 64 * 1024
+# columns always read as text, so their type doesn't depend on the values
+# which happen to be in the file (or in each chunk of it)
+TEXT_COLUMNS = ("Date", "Payee", "Memo")
+# columns also read as text when the amounts' separators are set, as the
+# parsers would otherwise read e.g. "1.500" as 1.5
+AMOUNT_COLUMNS = ("Inflow", "Outflow")
+# input column name for columns which aren't used, and so aren't read
+SKIP_COLUMN = "skip"
+# maximum number of parsed dates remembered for each bank
+DATE_CACHE_SIZE = 100000
+# maximum number of cleaned payee & memo strings remembered for each bank
+STRING_CACHE_SIZE = 100000
+# API columns identifying a transaction (YNAB rejects a repeated import_id)
+TRANSACTION_KEY_COLUMNS = ("account_id", "import_id")
+# number of transactions serialized at a time, bounding the memory used
+JSON_CHUNK_SIZE = 10000
+# API fields with the same value for every transaction, which are kept in
+# the attrs of API transaction dataframes rather than as columns
+API_CONSTANTS = {
+    "account_id": "",
+    "category": "",
+    "cleared": "cleared",
+    "payee_id": "",
+    "category_id": "",
+    "approved": False,
+    "flag_color": "",
+}
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^\w\d ]")
+MULTIPLE_SPACES_PATTERN = re.compile(" +")
+# inferred types of values holding strings (as pandas' .str accessor allows)
+STRING_TYPES = ("string", "empty", "mixed", "mixed-integer")
+
 
 class DataframeHandler:
     # TODO - integrate payee mapping in this class
@@ -12,7 +60,17 @@ class DataframeHandler:
     """
 
     def __init__(self) -> None:
-        pass
+        # parsed data (None if the file was parsed in chunks)
+        self.df: Optional[pd.DataFrame] = None
+
+    @property
+    def output_df(self) -> pd.DataFrame:
+        """
+        Output columns of the parsed data, copied from it when requested.
+
+        :raises ValueError: if the file was parsed in chunks
+        """
+        return self._get_parsed_df()[self.output_columns]
 
     def output_csv(self, path: str) -> None:
         """
@@ -20,8 +78,19 @@ class DataframeHandler:
 
         :param path: path to write exported file to
         :type path: str
+        :raises ValueError: if the file was parsed in chunks
         """
-        self.output_df.to_csv(path, index=False)
+        self._get_parsed_df().to_csv(
+            path, columns=self.output_columns, index=False
+        )
+
+    def _get_parsed_df(self) -> pd.DataFrame:
+        if self.df is None:
+            raise ValueError(
+                "Files parsed in chunks aren't kept in memory: pass an"
+                " output_path to run() to write their output file"
+            )
+        return self.df
 
     def run(
         self,
@@ -39,9 +108,28 @@ class DataframeHandler:
         date_dedupe: bool,
         fill_memo: bool,
         currency_fix: float,
+        data: Optional[bytes] = None,
+        csv_engine: str = "python",
+        decimal_sep: str = "",
+        thousands_sep: str = "",
+        exact_amounts: bool = False,
+        date_cache: Optional[dict[Any, Any]] = None,
+        string_cache: Optional[dict[Any, Any]] = None,
+        chunk_size: int = 0,
+        output_path: Optional[str] = None,
+        engine: str = "pandas",
+        arrow_strings: bool = False,
     ) -> None:
         """
         Complete handling of Dataframe creation & output.
+        If a chunk size is given the file is streamed: each chunk is parsed
+        and written to the output file in turn, and only the API columns
+        of each chunk are kept, so the whole file is never held in memory.
+        With the polars engine the whole file is parsed by Polars (see
+        polars_handler) and the chunk size is ignored; files Polars can't
+        parse are parsed whole with pandas instead.
+        With Arrow strings, text columns are read into & kept in Arrow
+        string arrays by the pandas engine (see get_text_dtype).
 
         :param df: dataframe to be modified
         :type df: DataFrame
@@ -71,33 +159,281 @@ class DataframeHandler:
         :type fill_memo: bool
         :param currency_fix: value to divide all currency amounts by
         :type currency_fix: float
+        :param data: contents of the CSV file if already read into memory
+        :type data: bytes, optional
+        :param csv_engine: CSV parser to use ("c" or "python")
+        :type csv_engine: str
+        :param decimal_sep: decimal separator of amounts ("" to guess)
+        :type decimal_sep: str
+        :param thousands_sep: thousands separator of amounts ("" if none)
+        :type thousands_sep: str
+        :param exact_amounts: whether to calculate amounts exactly in
+        integer milliunits
+        :type exact_amounts: bool
+        :param date_cache: dates already parsed with this date format,
+        shared between files
+        :type date_cache: dict[Any, Any], optional
+        :param string_cache: payee & memo strings already cleaned, shared
+        between files
+        :type string_cache: dict[Any, Any], optional
+        :param chunk_size: number of rows to parse at a time (0 to parse
+        the whole file at once)
+        :type chunk_size: int
+        :param output_path: file to write output to when streaming (nothing
+        is written if not set)
+        :type output_path: str, optional
+        :param engine: dataframe library to parse with ("pandas" or
+        "polars")
+        :type engine: str
+        :param arrow_strings: whether to store text as Arrow strings
+        :type arrow_strings: bool
+        :raises ValueError: if the file can't be parsed
         """
-        # read data from input file to dataframe
-        self.df = read_csv(
-            file_path=file_path,
-            delim=delim,
-            header_rows=header_rows,
-            footer_rows=footer_rows,
-            encod=encod,
-        )
-        # modify dataframe to match desired output
-        self.df = parse_data(
-            df=self.df,
-            input_columns=input_columns,
-            output_columns=output_columns,
-            api_columns=api_columns,
-            cd_flags=cd_flags,
-            date_format=date_format,
-            date_dedupe=date_dedupe,
-            fill_memo=fill_memo,
-            currency_fix=currency_fix,
-        )
+        if engine not in ("pandas", "polars"):
+            raise ValueError(f"Unknown dataframe engine: {engine}")
+        text_dtype = get_text_dtype(arrow_strings)
+        text_columns = get_text_columns(decimal_sep, thousands_sep)
+        if engine == "pandas" and chunk_size > 0:
+            self._run_chunked(
+                chunks=read_csv_chunks(
+                    file_path=file_path,
+                    delim=delim,
+                    header_rows=header_rows,
+                    footer_rows=footer_rows,
+                    encod=encod,
+                    chunk_size=chunk_size,
+                    input_columns=input_columns,
+                    data=data,
+                    text_dtype=text_dtype,
+                    text_columns=text_columns,
+                ),
+                output_path=output_path,
+                input_columns=get_used_columns(input_columns),
+                output_columns=output_columns,
+                api_columns=api_columns,
+                cd_flags=cd_flags,
+                date_format=date_format,
+                date_dedupe=date_dedupe,
+                fill_memo=fill_memo,
+                currency_fix=currency_fix,
+                decimal_sep=decimal_sep,
+                thousands_sep=thousands_sep,
+                exact_amounts=exact_amounts,
+                date_cache=date_cache,
+                string_cache=string_cache,
+            )
+            return
+        polars_df = None
+        if engine == "polars":
+            polars_df = parse_with_polars(
+                file_path=file_path,
+                delim=delim,
+                header_rows=header_rows,
+                footer_rows=footer_rows,
+                encod=encod,
+                input_columns=input_columns,
+                output_columns=output_columns,
+                api_columns=api_columns,
+                cd_flags=cd_flags,
+                date_format=date_format,
+                date_dedupe=date_dedupe,
+                fill_memo=fill_memo,
+                currency_fix=currency_fix,
+                data=data,
+                decimal_sep=decimal_sep,
+                thousands_sep=thousands_sep,
+                exact_amounts=exact_amounts,
+                date_cache=date_cache,
+                string_cache=string_cache,
+            )
+        if polars_df is not None:
+            self.df = polars_df
+            log_memory_use("parsing file with Polars")
+        else:
+            # read data from input file to dataframe
+            self.df = read_csv(
+                file_path=file_path,
+                delim=delim,
+                header_rows=header_rows,
+                footer_rows=footer_rows,
+                encod=encod,
+                data=data,
+                engine=csv_engine,
+                input_columns=input_columns,
+                text_dtype=text_dtype,
+                text_columns=text_columns,
+            )
+            log_memory_use("reading file")
+            # modify dataframe to match desired output
+            self.df = parse_data(
+                df=self.df,
+                input_columns=get_used_columns(input_columns),
+                output_columns=output_columns,
+                api_columns=api_columns,
+                cd_flags=cd_flags,
+                date_format=date_format,
+                date_dedupe=date_dedupe,
+                fill_memo=fill_memo,
+                currency_fix=currency_fix,
+                decimal_sep=decimal_sep,
+                thousands_sep=thousands_sep,
+                exact_amounts=exact_amounts,
+                date_cache=date_cache,
+                string_cache=string_cache,
+            )
         # check if dataframe is empty
         self.empty = self.df.empty
-        # set final columns & order for output file
-        self.output_df = self.df[output_columns]
+        # set final columns & order for output file (written from self.df)
+        self.output_columns = output_columns
         # set final columns & order for api output
-        self.api_transaction_df = self.df[api_columns]
+        self.api_transaction_df = select_api_columns(self.df, api_columns)
+        log_memory_use("selecting API columns")
+
+    def _run_chunked(
+        self,
+        *,
+        chunks: Iterator[pd.DataFrame],
+        output_path: Optional[str],
+        input_columns: list[str],
+        output_columns: list[str],
+        api_columns: list[str],
+        cd_flags: list[str],
+        date_format: str,
+        date_dedupe: bool,
+        fill_memo: bool,
+        currency_fix: float,
+        decimal_sep: str,
+        thousands_sep: str,
+        exact_amounts: bool,
+        date_cache: Optional[dict[Any, Any]],
+        string_cache: Optional[dict[Any, Any]],
+    ) -> None:
+        """
+        Parse a file one chunk at a time, appending each parsed chunk to
+        the output file. Values which depend on earlier rows (blank dates,
+        import_id occurrence counts) are carried over between chunks.
+        If parsing fails part way through, the partial output is removed.
+
+        :param chunks: chunks of the input file
+        :type chunks: Iterator[pd.DataFrame]
+        :param output_path: file to write output to (nothing is written if
+        not set)
+        :type output_path: str, optional
+        """
+        # parsed chunks are only written to the output file
+        self.df = None
+        self.output_columns = output_columns
+        state = ParseState()
+        api_dfs: list[pd.DataFrame] = list()
+        rows = 0
+        try:
+            for chunk in chunks:
+                df = parse_data(
+                    df=chunk,
+                    input_columns=input_columns,
+                    output_columns=output_columns,
+                    api_columns=api_columns,
+                    cd_flags=cd_flags,
+                    date_format=date_format,
+                    date_dedupe=date_dedupe,
+                    fill_memo=fill_memo,
+                    currency_fix=currency_fix,
+                    decimal_sep=decimal_sep,
+                    thousands_sep=thousands_sep,
+                    exact_amounts=exact_amounts,
+                    date_cache=date_cache,
+                    string_cache=string_cache,
+                    state=state,
+                )
+                if df.empty:
+                    continue
+                if output_path is not None:
+                    # start the file with the first rows found
+                    df[output_columns].to_csv(
+                        output_path,
+                        mode="w" if rows == 0 else "a",
+                        header=rows == 0,
+                        index=False,
+                    )
+                rows += len(df)
+                api_dfs.append(select_api_columns(df, api_columns))
+        except Exception:
+            if output_path is not None and rows > 0:
+                os.remove(output_path)
+            raise
+        logging.info(f"Parsed {rows} lines")
+
+        self.empty = rows == 0
+        if api_dfs:
+            self.api_transaction_df = pd.concat(api_dfs, ignore_index=True)
+        else:
+            self.api_transaction_df = select_api_columns(
+                pd.DataFrame(columns=api_columns), api_columns
+            )
+
+
+class ParseState:
+    """
+    Values carried over between the chunks of a file parsed in parts.
+    """
+
+    def __init__(self) -> None:
+        # last date seen, for filling in blank dates at the start of a chunk
+        self.last_date: Optional[str] = None
+        # number of transactions seen so far with each import_id prefix
+        self.id_counts: dict[str, int] = dict()
+
+
+def parse_with_polars(**parser_args: Any) -> Optional[pd.DataFrame]:
+    """
+    Read & parse a file with the polars engine (see
+    polars_handler.parse_file() for the arguments). As with the C parser,
+    files which can't be read this way (e.g. with malformed quoting) are
+    left to be read with pandas, as are all files if polars isn't installed.
+
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
+    :return: parsed dataframe, or None if the file should be parsed with
+    pandas instead
+    :rtype: pd.DataFrame, optional
+    """
+    try:
+        polars_handler = importlib.import_module("polars_handler")
+    except ImportError as e:
+        logging.warning(f"Parsing with pandas, as polars is missing ({e})")
+        return None
+    try:
+        return polars_handler.parse_file(**parser_args)
+    except ColumnCountError:
+        raise
+    except ValueError as e:
+        logging.debug(f"Falling back to pandas engine: {e}")
+        return None
+
+
+def log_memory_use(stage: str) -> None:
+    """
+    Logs the memory allocated after a processing stage, and the most
+    allocated at any point during it, if memory allocations are being
+    traced (see the --trace-memory option).
+
+    :param stage: description of the stage just completed
+    :type stage: str
+    """
+    if not tracemalloc.is_tracing():
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    logging.info(
+        f"Memory after {stage}: {current / 2**20:.1f} MiB"
+        f" (peak {peak / 2**20:.1f} MiB)"
+    )
+    tracemalloc.reset_peak()
+
+
+class ColumnCountError(ValueError):
+    """
+    Raised when a CSV file doesn't have one column for each input column.
+    """
 
 
 def read_csv(
@@ -106,9 +442,16 @@ def read_csv(
     header_rows: int,
     footer_rows: int,
     encod: str,
+    data: Optional[bytes] = None,
+    engine: str = "python",
+    input_columns: Optional[list[str]] = None,
+    text_dtype: Any = object,
+    text_columns: tuple[str, ...] = TEXT_COLUMNS,
 ) -> pd.DataFrame:
     """
     Read a specified CSV file into a Dataframe.
+    If the input columns are given, skipped columns aren't read and text
+    columns are read as text.
 
     :param file_path: Path to CSV file
     :type file_path: str
@@ -120,25 +463,541 @@ def read_csv(
     :type footer_rows: int
     :param encod: CSV file encoding
     :type encod: str
+    :param data: contents of the CSV file, read instead of file_path if set
+    :type data: bytes, optional
+    :param engine: CSV parser to use ("c" or "python"), falling back to
+    the python parser if the file can't be read with the C parser
+    :type engine: str
+    :param input_columns: columns present in input data
+    :type input_columns: list[str], optional
+    :param text_dtype: dtype to read text columns as
+    :type text_dtype: Any
+    :param text_columns: columns to read as text (see get_text_columns)
+    :type text_columns: tuple[str, ...]
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
     :return: Dataframe read from CSV file
     :rtype: pd.DataFrame
     """
-
+    if engine == "c":
+        try:
+            return read_csv_c(
+                file_path,
+                delim,
+                header_rows,
+                footer_rows,
+                encod,
+                data,
+                input_columns,
+                text_dtype,
+                text_columns,
+            )
+        except ColumnCountError:
+            raise
+        except ValueError as e:
+            logging.debug(f"Falling back to python CSV parser: {e}")
+
+    parser_args = {
+        "delimiter": delim,
+        "skipinitialspace": True,  # skip space after delimiter
+        "names": [],  # don't set column headers initially
+        "skiprows": header_rows,  # skip header rows
+        "skip_blank_lines": True,  # skip blank lines
+        "encoding": encod,
+        "engine": "python",
+    }
+    if input_columns is not None:
+        check_column_count(
+            io.BytesIO(data) if data is not None else file_path,
+            input_columns,
+            parser_args,
+        )
+        parser_args.update(
+            get_column_args(input_columns, text_dtype, text_columns)
+        )
     df = pd.read_csv(
-        file_path,
-        delimiter=delim,
-        skipinitialspace=True,  # skip space after delimiter
-        names=[],  # don't set column headers initially
-        skiprows=header_rows,  # skip header rows
+        io.BytesIO(data) if data is not None else file_path,
         skipfooter=footer_rows,  # skip footer rows
-        skip_blank_lines=True,  # skip blank lines
-        encoding=encod,
-        engine="python",
+        **parser_args,
     )
 
     return df
 
 
+def read_csv_c(
+    file_path: str,
+    delim: str,
+    header_rows: int,
+    footer_rows: int,
+    encod: str,
+    data: Optional[bytes] = None,
+    input_columns: Optional[list[str]] = None,
+    text_dtype: Any = object,
+    text_columns: tuple[str, ...] = TEXT_COLUMNS,
+) -> pd.DataFrame:
+    """
+    Read a CSV file with the C parser, which doesn't support skipping
+    footer rows, so the footer is trimmed off beforehand.
+    If the input columns are given, skipped columns aren't read and text
+    columns are read as text.
+
+    :param file_path: Path to CSV file
+    :type file_path: str
+    :param delim: CSV separator
+    :type delim: str
+    :param header_rows: Number of header rows
+    :type header_rows: int
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :param encod: CSV file encoding
+    :type encod: str
+    :param data: contents of the CSV file, read instead of file_path if set
+    :type data: bytes, optional
+    :param input_columns: columns present in input data
+    :type input_columns: list[str], optional
+    :param text_dtype: dtype to read text columns as
+    :type text_dtype: Any
+    :param text_columns: columns to read as text (see get_text_columns)
+    :type text_columns: tuple[str, ...]
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
+    :raises ValueError: if the file can't be read with this parser
+    :return: Dataframe read from CSV file
+    :rtype: pd.DataFrame
+    """
+    if input_columns is not None:
+        check_column_count(
+            io.BytesIO(data) if data is not None else file_path,
+            input_columns,
+            get_c_parser_args(delim, header_rows, encod),
+        )
+    with open_csv_source(file_path, footer_rows, encod, data) as (
+        source,
+        source_encod,
+    ):
+        return pd.read_csv(
+            source,
+            **get_c_parser_args(delim, header_rows, source_encod),
+            **get_column_args(input_columns, text_dtype, text_columns),
+        )
+
+
+def read_csv_chunks(
+    *,
+    file_path: str,
+    delim: str,
+    header_rows: int,
+    footer_rows: int,
+    encod: str,
+    chunk_size: int,
+    input_columns: list[str],
+    data: Optional[bytes] = None,
+    text_dtype: Any = object,
+    text_columns: tuple[str, ...] = TEXT_COLUMNS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV file a number of rows at a time with the C parser.
+    Skipped columns aren't read and text columns are read as text.
+    If the C parser can't read the file it is read whole with the python
+    parser instead, and the rows not yet returned are returned in chunks of
+    the same size.
+
+    :param file_path: Path to CSV file
+    :type file_path: str
+    :param delim: CSV separator
+    :type delim: str
+    :param header_rows: Number of header rows
+    :type header_rows: int
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :param encod: CSV file encoding
+    :type encod: str
+    :param chunk_size: number of rows per chunk
+    :type chunk_size: int
+    :param input_columns: columns present in input data
+    :type input_columns: list[str]
+    :param data: contents of the CSV file, read instead of file_path if set
+    :type data: bytes, optional
+    :param text_dtype: dtype to read text columns as
+    :type text_dtype: Any
+    :param text_columns: columns to read as text (see get_text_columns)
+    :type text_columns: tuple[str, ...]
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
+    :raises ValueError: if the file can't be read
+    :return: iterator of Dataframes read from CSV file
+    :rtype: Iterator[pd.DataFrame]
+    """
+    rows_read = 0
+    try:
+        check_column_count(
+            io.BytesIO(data) if data is not None else file_path,
+            input_columns,
+            get_c_parser_args(delim, header_rows, encod),
+        )
+        with open_csv_source(file_path, footer_rows, encod, data) as (
+            source,
+            source_encod,
+        ):
+            with pd.read_csv(
+                source,
+                chunksize=chunk_size,
+                **get_c_parser_args(delim, header_rows, source_encod),
+                **get_column_args(input_columns, text_dtype, text_columns),
+            ) as reader:
+                for chunk in reader:
+                    rows_read += len(chunk)
+                    yield chunk
+        return
+    except ColumnCountError:
+        raise
+    except ValueError as e:
+        logging.debug(f"Falling back to python CSV parser: {e}")
+
+    df = read_csv(
+        file_path,
+        delim,
+        header_rows,
+        footer_rows,
+        encod,
+        data,
+        input_columns=input_columns,
+        text_dtype=text_dtype,
+        text_columns=text_columns,
+    )
+    for start in range(rows_read, len(df), chunk_size):
+        yield df.iloc[start : start + chunk_size].copy()
+
+
+def get_c_parser_args(
+    delim: str, header_rows: int, encod: str
+) -> dict[str, Any]:
+    """
+    Returns the options used to read CSV files with the C parser.
+
+    :param delim: CSV separator
+    :type delim: str
+    :param header_rows: Number of header rows
+    :type header_rows: int
+    :param encod: CSV file encoding
+    :type encod: str
+    :return: keyword arguments for pd.read_csv
+    :rtype: dict[str, Any]
+    """
+    return {
+        "delimiter": delim,
+        "skipinitialspace": True,  # skip space after delimiter
+        "header": None,  # don't set column headers initially
+        "skiprows": header_rows,  # skip header rows
+        "skip_blank_lines": True,  # skip blank lines
+        "encoding": encod,
+        "engine": "c",
+        "float_precision": "round_trip",  # parse numbers as python does
+    }
+
+
+def get_column_args(
+    input_columns: Optional[list[str]],
+    text_dtype: Any = object,
+    text_columns: tuple[str, ...] = TEXT_COLUMNS,
+) -> dict[str, Any]:
+    """
+    Returns the options used to read only the used input columns, with
+    text columns read as text. Columns are named by their position, as
+    integer names are ambiguous to pandas once some columns are left out.
+
+    :param input_columns: columns present in input data (all columns are
+    read if not given)
+    :type input_columns: list[str], optional
+    :param text_dtype: dtype to read text columns as (see get_text_dtype)
+    :type text_dtype: Any
+    :param text_columns: columns to read as text (see get_text_columns)
+    :type text_columns: tuple[str, ...]
+    :return: keyword arguments for pd.read_csv
+    :rtype: dict[str, Any]
+    """
+    if input_columns is None:
+        return dict()
+    return {
+        "names": [str(index) for index in range(len(input_columns))],
+        "usecols": [
+            str(index) for index in get_used_column_positions(input_columns)
+        ],
+        "dtype": {
+            str(index): text_dtype
+            for index, column in enumerate(input_columns)
+            if column in text_columns
+        },
+    }
+
+
+def get_text_columns(
+    decimal_sep: str = "", thousands_sep: str = ""
+) -> tuple[str, ...]:
+    """
+    Returns the columns read as text. Amounts are also read as text if
+    their decimal or thousands separator is set, so that the separators
+    are applied to every value; otherwise whether e.g. "1.500" is read as
+    1.5 would depend on the other values in the column.
+
+    :param decimal_sep: decimal separator of amounts ("" to guess)
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator of amounts ("" if none)
+    :type thousands_sep: str
+    :return: names of the columns read as text
+    :rtype: tuple[str, ...]
+    """
+    if decimal_sep == "" and thousands_sep == "":
+        return TEXT_COLUMNS
+    return TEXT_COLUMNS + AMOUNT_COLUMNS
+
+
+def get_text_dtype(arrow_strings: bool) -> Any:
+    """
+    Returns the dtype text columns are read as: Python string objects, or
+    strings stored in Arrow arrays, which take less memory and are
+    processed by Arrow's (vectorized) string functions. Arrow strings
+    need pyarrow, and are only used if it is installed.
+
+    :param arrow_strings: whether to store text as Arrow strings
+    :type arrow_strings: bool
+    :return: dtype of text columns
+    :rtype: Any
+    """
+    if arrow_strings:
+        try:
+            return pd.StringDtype("pyarrow")
+        except ImportError as e:
+            logging.warning(
+                f"Storing text as objects, as pyarrow is missing ({e})"
+            )
+    return object
+
+
+def is_arrow_string(series: pd.Series) -> bool:
+    """
+    Checks whether a series holds Arrow strings (see get_text_dtype).
+
+    :param series: series to check
+    :type series: pd.Series
+    :return: True if the series holds Arrow strings
+    :rtype: bool
+    """
+    return (
+        isinstance(series.dtype, pd.StringDtype)
+        and series.dtype.storage == "pyarrow"
+    )
+
+
+def check_column_count(
+    source: Union[str, IO[bytes]],
+    input_columns: list[str],
+    parser_args: dict[str, Any],
+) -> None:
+    """
+    Check that the first row of a CSV file has one column for each input
+    column. The parsers don't check this when only some columns are read.
+
+    :param source: CSV file to check
+    :type source: str | IO[bytes]
+    :param input_columns: columns present in input data
+    :type input_columns: list[str]
+    :param parser_args: keyword arguments for pd.read_csv
+    :type parser_args: dict[str, Any]
+    :raises ColumnCountError: if the column count doesn't match
+    """
+    column_count = pd.read_csv(source, nrows=1, **parser_args).shape[1]
+    if column_count != len(input_columns):
+        raise ColumnCountError(
+            f"Expected {len(input_columns)} columns, found {column_count}"
+        )
+
+
+def get_used_columns(input_columns: list[str]) -> list[str]:
+    """
+    Returns the input columns which are used, i.e. not skipped.
+
+    :param input_columns: columns present in input data
+    :type input_columns: list[str]
+    :return: used input columns, in order
+    :rtype: list[str]
+    """
+    return [column for column in input_columns if column != SKIP_COLUMN]
+
+
+def get_used_column_positions(input_columns: list[str]) -> list[int]:
+    """
+    Returns the positions of the input columns which are used.
+
+    :param input_columns: columns present in input data
+    :type input_columns: list[str]
+    :return: positions of used input columns
+    :rtype: list[int]
+    """
+    return [
+        index
+        for index, column in enumerate(input_columns)
+        if column != SKIP_COLUMN
+    ]
+
+
+@contextlib.contextmanager
+def open_csv_source(
+    file_path: str,
+    footer_rows: int,
+    encod: str,
+    data: Optional[bytes] = None,
+) -> Iterator[tuple[Union[str, IO[bytes]], str]]:
+    """
+    Open a CSV file for the C parser with its footer rows cut off.
+    Files in an ASCII-compatible encoding are read up to the footer
+    directly from disk; anything else is decoded & re-encoded as UTF-8.
+
+    :param file_path: Path to CSV file
+    :type file_path: str
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :param encod: CSV file encoding
+    :type encod: str
+    :param data: contents of the CSV file, read instead of file_path if set
+    :type data: bytes, optional
+    :raises ValueError: if the footer rows can't be located
+    :return: source to read & its encoding
+    :rtype: Iterator[tuple[str | IO[bytes], str]]
+    """
+    if footer_rows == 0:
+        yield (io.BytesIO(data) if data is not None else file_path), encod
+        return
+    if data is None and is_ascii_compatible(encod):
+        with open(file_path, "rb") as f:
+            footer_start = find_file_footer_start(f, footer_rows)
+            if footer_start is None:
+                raise ValueError("Unable to locate footer rows")
+            f.seek(0)
+            yield io.BufferedReader(FileSlice(f, footer_start)), encod
+        return
+
+    if data is None:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    if is_ascii_compatible(encod):
+        # line breaks & quotes can be found without decoding
+        footer_start = find_footer_start(data, footer_rows, b"\n", b'"')
+        if footer_start is None:
+            raise ValueError("Unable to locate footer rows")
+        yield io.BytesIO(data[:footer_start]), encod
+    else:
+        text = data.decode(encod)
+        footer_start = find_footer_start(text, footer_rows, "\n", '"')
+        if footer_start is None:
+            raise ValueError("Unable to locate footer rows")
+        yield io.BytesIO(text[:footer_start].encode("utf-8")), "utf-8"
+
+
+class FileSlice(io.RawIOBase):
+    """
+    Read-only view of the first part of a binary file.
+    """
+
+    def __init__(self, raw: IO[bytes], size: int) -> None:
+        self.raw = raw
+        self.remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self.remaining <= 0:
+            return 0
+        count = self.raw.readinto(  # type: ignore
+            memoryview(buffer)[: self.remaining]
+        )
+        self.remaining -= count
+        return count
+
+
+def find_file_footer_start(f: IO[bytes], footer_rows: int) -> Optional[int]:
+    """
+    Finds where the footer rows of a file begin, reading back from its end
+    only as far as needed.
+
+    :param f: binary file in an ASCII-compatible encoding
+    :type f: IO[bytes]
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :return: offset of the first footer row, or None if the footer can't
+    be located reliably
+    :rtype: int, optional
+    """
+    size = f.seek(0, io.SEEK_END)
+    scan_bytes = FOOTER_SCAN_BYTES
+    while True:
+        scan_start = max(0, size - scan_bytes)
+        f.seek(scan_start)
+        footer_start = find_footer_start(f.read(), footer_rows, b"\n", b'"')
+        if footer_start is not None:
+            return scan_start + footer_start
+        if scan_start == 0:
+            return None
+        scan_bytes *= 4
+
+
+def find_footer_start(
+    data: AnyStr, footer_rows: int, newline: AnyStr, quote: AnyStr
+) -> Optional[int]:
+    """
+    Finds where the footer rows begin by scanning back from the end of
+    the data. Blank lines count as rows, as they do when the python parser
+    skips footer rows.
+
+    :param data: contents of the CSV file
+    :type data: bytes | str
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :param newline: line break character
+    :type newline: bytes | str
+    :param quote: quote character
+    :type quote: bytes | str
+    :return: offset of the first footer row, or None if the footer can't
+    be located reliably (e.g. quoted values spanning several lines)
+    :rtype: int, optional
+    """
+    end = len(data)
+    # a line break at the very end doesn't start another row
+    if data.endswith(newline):
+        end -= 1
+    footer_start = end
+    for _ in range(footer_rows):
+        footer_start = data.rfind(newline, 0, footer_start)
+        if footer_start < 0:
+            return None
+    footer_start += 1
+    for line in data[footer_start:end].split(newline):
+        if line.count(quote) % 2:
+            return None
+    return footer_start
+
+
+def is_ascii_compatible(encod: str) -> bool:
+    """
+    Check whether an encoding stores ASCII characters as single bytes
+    with their ASCII values, so CSV syntax can be found in undecoded data.
+
+    :param encod: encoding name
+    :type encod: str
+    :return: whether the encoding is ASCII compatible
+    :rtype: bool
+    """
+    try:
+        encoded = '\n",;'.encode(encod)
+    except (LookupError, UnicodeError):
+        return False
+    # ignore byte order marks (e.g. utf_8_sig)
+    return encoded.endswith(b'\n",;') and not codecs.lookup(
+        encod
+    ).name.startswith(("utf-16", "utf-32"))
+
+
 def parse_data(
     *,
     df: pd.DataFrame,
@@ -150,6 +1009,12 @@ def parse_data(
     date_dedupe: bool,
     fill_memo: bool,
     currency_fix: float,
+    decimal_sep: str = "",
+    thousands_sep: str = "",
+    exact_amounts: bool = False,
+    date_cache: Optional[dict[Any, Any]] = None,
+    string_cache: Optional[dict[Any, Any]] = None,
+    state: Optional[ParseState] = None,
 ) -> pd.DataFrame:
     """
     Convert each column of the dataframe to match ideal output data
@@ -170,6 +1035,20 @@ def parse_data(
     :type fill_memo: bool
     :param currency_fix: value to divide all currency amounts by
     :type currency_fix: float
+    :param decimal_sep: decimal separator of amounts ("" to guess)
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator of amounts ("" if none)
+    :type thousands_sep: str
+    :param exact_amounts: whether to calculate amounts exactly in integer
+    milliunits
+    :type exact_amounts: bool
+    :param date_cache: dates already parsed with this date format
+    :type date_cache: dict[Any, Any], optional
+    :param string_cache: payee & memo strings already cleaned
+    :type string_cache: dict[Any, Any], optional
+    :param state: values carried over from earlier chunks of the file,
+    updated with this chunk's values
+    :type state: ParseState, optional
     :return: modified dataframe matching provided configuration values
     :rtype: DataFrame
     """
@@ -180,32 +1059,64 @@ def parse_data(
     # merge duplicate input columns
     merge_duplicate_columns(df, input_columns)
     # add missing columns
-    add_missing_columns(df, input_columns, output_columns + api_columns)
+    add_missing_columns(
+        df,
+        input_columns,
+        output_columns
+        + [col for col in api_columns if col not in API_CONSTANTS],
+    )
+    log_memory_use("preparing columns")
     # fix date format
-    df["Date"] = fix_date(df["Date"], date_format)
-    df["Date"] = fill_empty_dates(df["Date"], date_dedupe)
-    # fix inflow/outflow string formatting
-    df["Inflow"] = clean_monetary_values(df["Inflow"])
-    df["Outflow"] = clean_monetary_values(df["Outflow"])
-    # process Inflow/Outflow flags
-    df = cd_flag_process(df, cd_flags)
-    # fix amounts (convert negative inflows and outflows etc)
-    df = fix_amount(df, currency_fix)
+    df["Date"] = fix_date(df["Date"], date_format, date_cache)
+    df["Date"] = fill_empty_dates(
+        df["Date"],
+        date_dedupe,
+        previous_date=state.last_date if state is not None else None,
+    )
+    if state is not None and date_dedupe:
+        last_index = df["Date"].last_valid_index()
+        if last_index is not None:
+            state.last_date = df["Date"][last_index]
+    log_memory_use("fixing dates")
+    if exact_amounts:
+        # convert amounts to milliunits & fix inflows/outflows exactly
+        df = fix_milliunits(
+            df, cd_flags, currency_fix, decimal_sep, thousands_sep
+        )
+    else:
+        # fix inflow/outflow string formatting
+        df["Inflow"] = clean_monetary_values(
+            df["Inflow"], decimal_sep, thousands_sep
+        )
+        df["Outflow"] = clean_monetary_values(
+            df["Outflow"], decimal_sep, thousands_sep
+        )
+        # process Inflow/Outflow flags
+        df = cd_flag_process(df, cd_flags)
+        # fix amounts (convert negative inflows and outflows etc)
+        df = fix_amount(df, currency_fix)
+    log_memory_use("fixing amounts")
     # auto fill memo from payee if required
     df = auto_memo(df, fill_memo)
     # auto fill payee from memo
     df = auto_payee(df)
     # fix strings
-    df["Payee"] = clean_strings(df["Payee"])
-    df["Memo"] = clean_strings(df["Memo"])
+    df["Payee"] = clean_strings(df["Payee"], string_cache)
+    df["Memo"] = clean_strings(df["Memo"], string_cache)
+    log_memory_use("cleaning strings")
     # remove invalid rows
     df = remove_invalid_rows(df)
+    log_memory_use("removing invalid rows")
     # fill API-specific columns
-    df = fill_api_columns(df)
-    # remove invalid rows
-    df = remove_invalid_rows(df)
-    # display parsed line count
-    logging.info(f"Parsed {df.shape[0]} lines")
+    df = fill_api_columns(
+        df, id_counts=state.id_counts if state is not None else None
+    )
+    log_memory_use("filling API columns")
+    # display parsed line count (the total is shown for chunked files)
+    if state is None:
+        logging.info(f"Parsed {df.shape[0]} lines")
+    else:
+        logging.debug(f"Parsed {df.shape[0]} lines")
     # view final dataframe
     logging.debug(f"\nFinal DF\n{df.head(10)}")
 
@@ -216,7 +1127,9 @@ def merge_duplicate_columns(
     df: pd.DataFrame, input_columns: list[str]
 ) -> pd.DataFrame:
     """
-    Merges columns specified more than once in the input_columns list.
+    Merges columns specified more than once in the input_columns list,
+    joining the values in each row with a space. Duplicates are renamed
+    rather than removed, and rows with no value in any of them stay blank.
     Note: converts values into strings before merging.
 
     :param df: dataframe to modify
@@ -234,23 +1147,36 @@ def merge_duplicate_columns(
             cols_to_merge[col] = []
         cols_to_merge[col] += [index]
 
-    # go through each key
-    for key in cols_to_merge:
-        key_cols: list[int] = cols_to_merge[key]
+    merged_cols: dict[str, pd.Series] = dict()
+    for key, key_cols in cols_to_merge.items():
         if len(key_cols) > 1:
-            # change first column to string
-            df.iloc[:, key_cols[0]] = df.iloc[:, key_cols[0]].astype(str) + " "
-            # merge every duplicate column into the 1st instance
-            # of the column name
-            for dupe_count, key_col in enumerate(key_cols[1:]):
-                # add string version of each column onto the first column
-                df.iloc[:, key_cols[0]] += f"{df.iloc[:, key_col]} "
-                # rename duplicate column
-                df.columns.values[key_col] = f"{key} {dupe_count}"
+            # string version of each duplicate column, keeping blanks
+            dupe_cols = [
+                to_text(df.iloc[:, key_col]).where(df.iloc[:, key_col].notna())
+                for key_col in key_cols
+            ]
+            merged_col = dupe_cols[0].str.cat(
+                dupe_cols[1:], sep=" ", na_rep=""
+            )
             # remove excess spaces
-            df[key] = (
-                df[key].str.replace("\\s{2,}", " ", regex=True).str.strip()
+            merged_col = merged_col.str.replace(
+                "\\s{2,}", " ", regex=True
+            ).str.strip()
+            has_value = np.logical_or.reduce(
+                [dupe_col.notna().to_numpy() for dupe_col in dupe_cols]
             )
+            merged_cols[key] = merged_col.where(has_value)
+
+    if merged_cols:
+        # rename duplicate columns, so each name is unique
+        column_names = list(df.columns)
+        for key in merged_cols:
+            for dupe_count, key_col in enumerate(cols_to_merge[key][1:]):
+                column_names[key_col] = f"{key} {dupe_count}"
+        df.columns = column_names
+        # replace the 1st instance of each column name with the merge
+        for key, merged_col in merged_cols.items():
+            df[key] = merged_col
 
     logging.debug(f"\nAfter duplicate merge\n{df.head()}")
     return df
@@ -332,34 +1258,316 @@ def fix_amount(df: pd.DataFrame, currency_fix: float) -> pd.DataFrame:
     return df
 
 
-def clean_monetary_values(num_series: pd.Series) -> pd.Series:
+def fix_milliunits(
+    df: pd.DataFrame,
+    cd_flags: list[str],
+    currency_fix: float,
+    decimal_sep: str = "",
+    thousands_sep: str = "",
+) -> pd.DataFrame:
+    """
+    Exact counterpart of clean_monetary_values(), cd_flag_process() and
+    fix_amount(): amounts are converted straight into integer milliunits,
+    and the inflow/outflow flag & sign rules are applied to whole columns
+    with integer arithmetic.
+
+    :param df: dataframe to modify
+    :type df: pd.DataFrame
+    :param cd_flags: list of parameters for applying indicators
+    :type cd_flags: list
+    :param currency_fix: value to divide all currency amounts by
+    :type currency_fix: float
+    :param decimal_sep: decimal separator of amounts ("" to guess)
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator of amounts ("" if none)
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
+    :return: modified dataframe
+    :rtype: pd.DataFrame
+    """
+    inflow = get_milliunits(
+        df["Inflow"], decimal_sep, currency_fix, thousands_sep
+    )
+    outflow = get_milliunits(
+        df["Outflow"], decimal_sep, currency_fix, thousands_sep
+    )
+    if len(cd_flags) == 3:
+        # if this row is indicated to be outflow, make inflow negative
+        inflow = np.where(df["CDFlag"] == cd_flags[2], -inflow, inflow)
+    # negative inflow = outflow (replacing any outflow)
+    outflow = np.where(inflow < 0, -inflow, outflow)
+    inflow = np.where(inflow < 0, 0, inflow)
+    # negative outflow = inflow (replacing any inflow)
+    inflow = np.where(outflow < 0, -outflow, inflow)
+    outflow = np.where(outflow < 0, 0, outflow)
+
+    df["Inflow"] = inflow / 1000
+    df["Outflow"] = outflow / 1000
+    # create amount column for API (in milliunits)
+    df["amount"] = inflow - outflow
+    return df
+
+
+def clean_monetary_values(
+    num_series: pd.Series, decimal_sep: str = "", thousands_sep: str = ""
+) -> pd.Series:
     """
-    Performs the following operations on a provided series of strings:
-    - Convert "," to "."
-    - Remove every instance of "." except last one
-    - Remove any characters except digits, "-", and "."
+    Converts a provided series of amount strings into numbers:
+    - Remove the thousands separator
+    - Remove any characters except digits, "-" and the decimal separator
     - Fill in null values with 0
+    If no decimal separator is given, both "," and "." are treated as
+    decimal separators and only the last one in each value is kept.
+    The distinct values are cleaned by vectorized string operations and
+    converted by a single pd.to_numeric(); only values which can't be
+    converted that way are parsed one at a time. Columns the CSV parser
+    has already read as numbers are used as they are, unless the
+    separators mean a number may have been misread (see get_text_columns).
 
     :param num_series: series of values to modify
     :type num_series: Series
+    :param decimal_sep: decimal separator used in the values
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
     :return: modified series
     :rtype: Series
     """
-    # convert all commas to full stops
-    num_series.replace({"\\,": "."}, regex=True, inplace=True)
-    # remove all except last decimal point
-    num_series.replace({"\\.(?=.*?\\.)": ""}, regex=True, inplace=True)
-    # remove all non-digit characters
-    num_series.replace(
-        {
-            "[^\\d\\.-]": "",
-        },
-        regex=True,
-        inplace=True,
+    if pd.api.types.is_numeric_dtype(num_series) and (
+        decimal_sep in ("", ".") and thousands_sep != "."
+    ):
+        return num_series.fillna(value=0).astype(float)
+    codes, values = pd.factorize(num_series)
+    values = pd.Series(values)
+    # Arrow runs the string operations much faster than Python objects
+    if pd.api.types.infer_dtype(values) == "string":
+        with contextlib.suppress(ImportError):
+            values = values.astype(pd.StringDtype("pyarrow"))
+    amounts = pd.to_numeric(
+        get_number_strings(values, decimal_sep, thousands_sep),
+        errors="coerce",
+    ).to_numpy(dtype=float, na_value=np.nan)
+    # e.g. values which aren't strings, or aren't valid amounts
+    for index in np.flatnonzero(np.isnan(amounts)):
+        amounts[index] = parse_amount(
+            values[index], decimal_sep, thousands_sep
+        )
+    # null values have a code of -1, which picks the trailing 0
+    amounts = np.append(amounts, 0.0)
+    return pd.Series(
+        amounts[codes], index=num_series.index, name=num_series.name
+    )
+
+
+def parse_amount(
+    value: Any, decimal_sep: str = "", thousands_sep: str = ""
+) -> float:
+    """
+    Converts an amount string into a number.
+
+    :param value: amount to convert
+    :type value: Any
+    :param decimal_sep: decimal separator used in the value, or "" to use
+    the last "," or "." in the value
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the value
+    :type thousands_sep: str
+    :raises ValueError: if the value isn't a valid amount
+    :return: amount
+    :rtype: float
+    """
+    if not isinstance(value, str):
+        return float(value)
+    return float(get_number_string(value, decimal_sep, thousands_sep))
+
+
+def get_number_string(
+    value: str, decimal_sep: str = "", thousands_sep: str = ""
+) -> str:
+    """
+    Removes everything except digits, "-" and the decimal separator from an
+    amount string, and replaces the decimal separator with ".".
+
+    :param value: amount to convert
+    :type value: str
+    :param decimal_sep: decimal separator used in the value, or "" to use
+    the last "," or "." in the value
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the value
+    :type thousands_sep: str
+    :return: number string
+    :rtype: str
+    """
+    if thousands_sep != "":
+        value = value.replace(thousands_sep, "")
+    if decimal_sep == "":
+        # remove all except last decimal point (of each line)
+        value = "\n".join(
+            remove_extra_points(line)
+            for line in value.replace(",", ".").split("\n")
+        )
+        decimal_sep = "."
+    value = get_non_numeric_pattern(decimal_sep).sub("", value)
+    return value.replace(decimal_sep, ".")
+
+
+def get_number_strings(
+    values: pd.Series, decimal_sep: str = "", thousands_sep: str = ""
+) -> pd.Series:
+    """
+    Vectorized get_number_string(). Values which aren't strings are left
+    blank, as are values with more than one line (whose decimal points
+    get_number_string() finds line by line).
+
+    :param values: series of amounts to convert
+    :type values: Series
+    :param decimal_sep: decimal separator used in the values, or "" to use
+    the last "," or "." in each value
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :return: series of number strings
+    :rtype: Series
+    """
+    if pd.api.types.infer_dtype(values) not in STRING_TYPES:
+        return pd.Series(None, index=values.index, dtype=object)
+    if thousands_sep != "":
+        values = values.str.replace(thousands_sep, "", regex=False)
+    if decimal_sep == "":
+        values = values.str.replace(",", ".", regex=False)
+        # values spanning several lines are left to get_number_string()
+        values = values.where(
+            ~values.str.contains("\n", regex=False).fillna(True).astype(bool)
+        )
+        # remove all except last decimal point, one point at a time
+        extra_points = (
+            values.str.len()
+            - values.str.replace(".", "", regex=False).str.len()
+            - 1
+        ).fillna(0)
+        while (extra_points > 0).any():
+            rows = extra_points > 0
+            values = values.mask(
+                rows, values[rows].str.replace(".", "", n=1, regex=False)
+            )
+            extra_points -= rows
+        decimal_sep = "."
+    values = values.str.replace(
+        get_non_numeric_pattern(decimal_sep).pattern, "", regex=True
+    )
+    if decimal_sep != ".":
+        values = values.str.replace(decimal_sep, ".", regex=False)
+    return values
+
+
+def get_milliunits(
+    num_series: pd.Series,
+    decimal_sep: str = "",
+    currency_fix: float = 1,
+    thousands_sep: str = "",
+) -> np.ndarray:
+    """
+    Converts a provided series of amounts into integer milliunits, divided
+    by a currency conversion factor, without any floating point rounding
+    errors. Null values become 0.
+    Each distinct value is only converted once.
+
+    :param num_series: series of values to convert
+    :type num_series: Series
+    :param decimal_sep: decimal separator used in the values ("" to guess)
+    :type decimal_sep: str
+    :param currency_fix: value to divide all currency amounts by
+    :type currency_fix: float
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
+    :return: amounts in milliunits
+    :rtype: np.ndarray
+    """
+    # the factor is read from the config file, so str() gives its digits
+    factor = Fraction(str(currency_fix))
+    codes, values = pd.factorize(num_series)
+    # null values have a code of -1, which picks the trailing 0
+    milliunits = np.array(
+        [
+            parse_milliunits(value, decimal_sep, factor, thousands_sep)
+            for value in values
+        ]
+        + [0],
+        dtype=np.int64,
+    )
+    return milliunits[codes]
+
+
+def parse_milliunits(
+    value: Any,
+    decimal_sep: str = "",
+    factor: Fraction = Fraction(1),
+    thousands_sep: str = "",
+) -> int:
+    """
+    Converts an amount into milliunits, divided by a currency conversion
+    factor and rounded to the nearest milliunit (halves away from zero).
+
+    :param value: amount to convert
+    :type value: Any
+    :param decimal_sep: decimal separator used in the value, or "" to use
+    the last "," or "." in the value
+    :type decimal_sep: str
+    :param factor: value to divide the amount by
+    :type factor: Fraction
+    :param thousands_sep: thousands separator used in the value
+    :type thousands_sep: str
+    :raises ValueError: if the value isn't a valid amount
+    :return: amount in milliunits
+    :rtype: int
+    """
+    if isinstance(value, str):
+        value = get_number_string(value, decimal_sep, thousands_sep)
+    else:
+        # numbers read by the CSV parser print as their original digits
+        value = str(value)
+    try:
+        numerator, denominator = Decimal(value).as_integer_ratio()
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}") from None
+    numerator *= 1000 * factor.denominator
+    denominator *= factor.numerator
+    # integer division rounding halves up, applied to the absolute value
+    milliunits = (2 * abs(numerator) + abs(denominator)) // (
+        2 * abs(denominator)
     )
-    # fill in null values with 0
-    return_series: pd.Series[float] = num_series.fillna(value=0).astype(float)
-    return return_series
+    return milliunits if (numerator < 0) == (denominator < 0) else -milliunits
+
+
+def remove_extra_points(value: str) -> str:
+    """
+    Removes every "." except the last one from a string.
+
+    :param value: string to modify
+    :type value: str
+    :return: modified string
+    :rtype: str
+    """
+    last_point = value.rfind(".")
+    if last_point <= 0:
+        return value
+    return value[:last_point].replace(".", "") + value[last_point:]
+
+
+@functools.lru_cache(maxsize=None)
+def get_non_numeric_pattern(decimal_sep: str) -> re.Pattern:
+    """
+    Returns a pattern matching everything except digits, "-" and a given
+    decimal separator.
+
+    :param decimal_sep: decimal separator
+    :type decimal_sep: str
+    :return: compiled pattern
+    :rtype: re.Pattern
+    """
+    return re.compile(f"[^\\d{re.escape(decimal_sep)}-]")
 
 
 def remove_invalid_rows(df: pd.DataFrame) -> pd.DataFrame:
@@ -373,13 +1581,20 @@ def remove_invalid_rows(df: pd.DataFrame) -> pd.DataFrame:
     :return: modified dataframe
     :rtype: pd.DataFrame
     """
-    # filter out rows where Inflow and Outflow are both blank
-    df.query("Inflow.notna() | Outflow.notna()", inplace=True)
-    # filter rows with an invalid date
-    df.query("Date.notna()", inplace=True)
-    df.fillna(0, inplace=True)
-    df.query("amount!=0", inplace=True)
-    df.reset_index(inplace=True)
+    valid_rows = (
+        # filter out rows where Inflow and Outflow are both blank
+        (df["Inflow"].notna() | df["Outflow"].notna())
+        # filter rows with an invalid date
+        & df["Date"].notna()
+        # filter rows without an amount
+        & (df["amount"].fillna(0) != 0)
+    )
+    # remove all invalid rows at once
+    df.drop(index=df.index[~valid_rows.to_numpy()], inplace=True)
+    for col in df.columns[df.isna().any().to_numpy()]:
+        # Arrow string columns can only hold strings
+        df[col] = df[col].fillna("0" if is_arrow_string(df[col]) else 0)
+    df.reset_index(drop=True, inplace=True)
     return df
 
 
@@ -412,62 +1627,141 @@ def auto_payee(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def clean_strings(string_series: pd.Series) -> pd.Series:
+def clean_strings(
+    string_series: pd.Series, cache: Optional[dict[Any, Any]] = None
+) -> pd.Series:
     """
     Perform various cleaning operations on provided string series.
+    Each distinct string is only cleaned once, and strings cleaned for
+    earlier files can be reused from a cache.
 
     :param string_series: string series to modify
     :type string_series: pd.Series
+    :param cache: previously cleaned strings, updated with the strings
+    cleaned now
+    :type cache: dict[Any, Any], optional
     :return: cleaned series
     :rtype: pd.Series
     """
-    modified_string_series = string_series
-    # convert string to title case
-    modified_string_series = modified_string_series.str.title()
-    # remove non-alphanumeric
-    modified_string_series = modified_string_series.replace(
-        r"[^\w\d ]", " ", regex=True
-    )
-    # remove newline characters
-    modified_string_series = modified_string_series.str.replace(
-        "\n", " ", regex=True
-    )
-    # strip leading and trailing whitespace
-    modified_string_series = modified_string_series.str.strip()
-    # replace multiple spacing with single
-    modified_string_series = modified_string_series.str.replace(
-        " +", " ", regex=True
-    )
+    if cache is None:
+        cache = dict()
+    codes, values = pd.factorize(string_series)
+    new_strings: dict[Any, Any] = dict()
+    cleaned_strings = list()
+    for value in values:
+        if value in cache:
+            cleaned_strings.append(cache[value])
+        else:
+            cleaned_string = clean_string(value)
+            new_strings[value] = cleaned_string
+            cleaned_strings.append(cleaned_string)
+    modified_string_series = take_values(cleaned_strings, codes, string_series)
+    if len(cache) + len(new_strings) > STRING_CACHE_SIZE:
+        cache.clear()
+    cache.update(new_strings)
     return modified_string_series
 
 
-def fix_date(date_series: pd.Series, date_format: str) -> pd.Series:
+def take_values(
+    values: list[Any], codes: np.ndarray, like: pd.Series
+) -> pd.Series:
+    """
+    Build a series from a list of values & the positions of each row's
+    value in it (e.g. as returned by pd.factorize), with -1 for nulls.
+    Values for a series of Arrow strings are stored as Arrow strings, and
+    picked by Arrow without creating a Python object for each row.
+
+    :param values: distinct values
+    :type values: list[Any]
+    :param codes: position of each row's value, or -1 for null
+    :type codes: np.ndarray
+    :param like: series with the index, name & storage of the result
+    :type like: pd.Series
+    :return: series of values
+    :rtype: pd.Series
+    """
+    if is_arrow_string(like):
+        array = pd.array(values, dtype=like.dtype).take(codes, allow_fill=True)
+    else:
+        # null values have a code of -1, which picks the trailing NaN
+        array = np.array(values + [np.nan], dtype=object)[codes]
+    return pd.Series(array, index=like.index, name=like.name)
+
+
+def clean_string(value: Any) -> Any:
+    """
+    Clean a single string: convert to title case, replace anything
+    except letters, digits & spaces with spaces, strip leading & trailing
+    whitespace and replace multiple spaces with single ones.
+
+    :param value: string to clean
+    :type value: Any
+    :return: cleaned string, or NaN if the value isn't a string
+    :rtype: Any
+    """
+    if not isinstance(value, str):
+        return np.nan
+    # convert string to title case & remove non-alphanumeric (inc. newlines)
+    value = NON_ALPHANUMERIC_PATTERN.sub(" ", value.title())
+    # strip leading and trailing whitespace, replace multiple spacing
+    return MULTIPLE_SPACES_PATTERN.sub(" ", value.strip())
+
+
+def fix_date(
+    date_series: pd.Series,
+    date_format: str,
+    cache: Optional[dict[Any, Any]] = None,
+) -> pd.Series:
     """
     If provided with an input date format,
     process the date column to the ISO format.
     Any non-parseable dates are returned as a NaT null value
+    Each distinct date is only parsed once, and dates parsed for earlier
+    files can be reused from a cache.
 
     :param df: dataframe to modify
     :type df: Series
     :param date_format: date format codes according to 1989 C standard
     (https://docs.python.org/3/library/datetime.html#strftime-strptime-behavior)
     :type date_format: str
+    :param cache: previously parsed dates with this date format, updated
+    with the dates parsed now
+    :type cache: dict[Any, Any], optional
     :return: modified dataframe
     :rtype: Series
     """
-    formatted_date_series = pd.to_datetime(
-        date_series,
-        format=date_format,
-        infer_datetime_format=True,
-        errors="coerce",
-    ).dt.strftime("%Y-%m-%d")
+    if cache is None:
+        cache = dict()
+    codes, values = pd.factorize(date_series)
+    new_values = [value for value in values if value not in cache]
+    new_dates: dict[Any, Any] = dict()
+    if new_values:
+        parsed_dates = pd.to_datetime(
+            pd.Series(new_values),
+            format=date_format,
+            infer_datetime_format=True,
+            errors="coerce",
+        ).dt.strftime("%Y-%m-%d")
+        new_dates = dict(zip(new_values, parsed_dates))
+    dates = [
+        new_dates[value] if value in new_dates else cache[value]
+        for value in values
+    ]
+    formatted_date_series = take_values(dates, codes, date_series)
+    if len(cache) + len(new_dates) > DATE_CACHE_SIZE:
+        cache.clear()
+    cache.update(new_dates)
 
     logging.debug(f"\nFixed dates:\n{date_series.head()}")
 
     return formatted_date_series
 
 
-def fill_empty_dates(date_series: pd.Series, fill_dates: bool) -> pd.Series:
+def fill_empty_dates(
+    date_series: pd.Series,
+    fill_dates: bool,
+    previous_date: Optional[str] = None,
+) -> pd.Series:
     """
     Fill in empty dates with values from previous cells.
 
@@ -475,65 +1769,306 @@ def fill_empty_dates(date_series: pd.Series, fill_dates: bool) -> pd.Series:
     :type date_series: pd.Series
     :param fill_dates: whether to fill in empty dates or not
     :type fill_dates: bool
+    :param previous_date: date preceding the series, used for empty dates
+    at its start (e.g. the last date of the previous chunk)
+    :type previous_date: str, optional
     :return: modified data series
     :rtype: pd.Series
     """
     if fill_dates:
         date_series.replace(
-            r"^\s*$", pd.NA, regex=True, inplace=True  # type:ignore
+            r"^\s*$", pd.NA, regex=True, inplace=True  # type: ignore
         )
-        date_series.fillna(method="ffill", inplace=True)  # type:ignore
+        date_series.fillna(method="ffill", inplace=True)  # type: ignore
+        if previous_date is not None:
+            date_series.fillna(previous_date, inplace=True)
 
     return date_series
 
 
-def fill_api_columns(df: pd.DataFrame) -> pd.DataFrame:
+def fill_api_columns(
+    df: pd.DataFrame, id_counts: Optional[dict[str, int]] = None
+) -> pd.DataFrame:
     """
     Generate API-specific columns using data in dataframe.
+    Fields with the same value for every transaction aren't added as
+    columns (see API_CONSTANTS & select_api_columns).
 
     :param df: dataframe to read & modify
     :type df: pd.DataFrame
+    :param id_counts: number of earlier transactions with each import_id
+    prefix (e.g. in previous chunks), updated with this dataframe's
+    :type id_counts: dict[str, int], optional
     :return: dataframe with additional columns added
     :rtype: pd.DataFrame
     """
-    df["account_id"] = ""
-    df["date"] = df["Date"].astype(str)
-    df["payee_name"] = df["Payee"].str.slice(0, 50)
-    df["memo"] = df["Memo"].str.slice(0, 100)
-    df["category"] = ""
-    df["cleared"] = "cleared"
-    df["payee_id"] = ""
-    df["category_id"] = ""
-    df["approved"] = False
-    df["flag_color"] = ""
+    df["date"] = to_text(df["Date"])
+    df["payee_name"] = truncate_strings(df["Payee"], 50)
+    df["memo"] = truncate_strings(df["Memo"], 100)
 
     # import_id format = YNAB:amount:ISO-date:occurrences
     # Maximum 36 characters ("YNAB" + ISO-date = 10 characters)
-    df["import_id"] = df.agg(
-        lambda x: f"YNAB:{x['amount']}:{x['date']}:", axis=1
+    import_ids = concat_strings(
+        "YNAB:", to_text(df["amount"], like=df["date"]), ":", df["date"], ":"
     )
     # count every instance of import id & add a counter to id
-    df["same_id_count"] = (df.groupby(["import_id"]).cumcount() + 1).astype(
-        str
+    same_id_count = import_ids.groupby(import_ids, sort=False).cumcount() + 1
+    if id_counts is not None and not df.empty:
+        # continue counting from earlier transactions
+        same_id_count += [
+            id_counts.get(import_id, 0) for import_id in import_ids
+        ]
+        id_counts.update(zip(import_ids.to_numpy(), same_id_count.to_numpy()))
+    # add a counter to each id (output columns are selected by name later)
+    df["import_id"] = concat_strings(
+        import_ids, to_text(same_id_count, like=import_ids)
     )
-    df["import_id"] = df["import_id"] + df["same_id_count"]
-    # move import_id to the end
-    cols = list(df.columns.values)
-    cols.pop(cols.index("import_id"))
-    df = df[cols + ["import_id"]]
     # view dataframe
     logging.debug(f"\nAfter API column processing\n{df.head()}")
     return df
 
 
-def combine_dfs(df_list: list[pd.DataFrame]) -> pd.DataFrame:
+def to_text(series: pd.Series, like: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Convert values to strings, stored as Arrow strings if the series (or
+    the like series, if given) holds Arrow strings (see get_text_dtype).
+
+    :param series: series to convert
+    :type series: pd.Series
+    :param like: series of strings to match the storage of
+    :type like: pd.Series, optional
+    :return: series of strings
+    :rtype: pd.Series
+    """
+    if like is None:
+        like = series
+    if not is_arrow_string(like):
+        return series.astype(str)
+    if pd.api.types.is_integer_dtype(series):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        return to_arrow_series(pc.cast(pa.array(series), pa.string()), series)
+    return series.astype(like.dtype)
+
+
+def concat_strings(*parts: Union[str, pd.Series]) -> pd.Series:
+    """
+    Join strings & series of strings row by row. Arrow strings are joined
+    by Arrow, as pandas can't add them together.
+
+    :param parts: strings & series to join, at least one being a series
+    :type parts: str | pd.Series
+    :return: joined strings
+    :rtype: pd.Series
+    """
+    series = [part for part in parts if isinstance(part, pd.Series)]
+    if not any(is_arrow_string(part) for part in series):
+        return functools.reduce(operator.add, parts)  # type: ignore
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    joined = pc.binary_join_element_wise(
+        *(
+            pa.array(part.array) if isinstance(part, pd.Series) else part
+            for part in parts
+        ),
+        "",
+    )
+    return to_arrow_series(joined, series[0])
+
+
+def to_arrow_series(array: Any, like: pd.Series) -> pd.Series:
+    """
+    Wrap an array of strings returned by Arrow in a series.
+
+    :param array: Arrow (chunked) array of strings
+    :type array: Any
+    :param like: series with the index & name of the result
+    :type like: pd.Series
+    :return: series of Arrow strings
+    :rtype: pd.Series
     """
-    Concatenate a list of provided dataframes.
+    return pd.Series(
+        pd.arrays.ArrowStringArray(array), index=like.index, name=like.name
+    )
+
+
+def select_api_columns(
+    df: pd.DataFrame, api_columns: list[str]
+) -> pd.DataFrame:
+    """
+    Select the API columns from a dataframe. Constant API fields aren't
+    selected as columns, but are stored in the attrs of the result along
+    with the order of the API columns, and are only added to transactions
+    as they're serialized (see expand_api_constants).
+
+    :param df: dataframe to select columns from
+    :type df: pd.DataFrame
+    :param api_columns: desired columns to be present in api data
+    :type api_columns: list[str]
+    :return: dataframe of API transactions
+    :rtype: pd.DataFrame
+    """
+    api_df = df[[col for col in api_columns if col not in API_CONSTANTS]]
+    api_df.attrs["api_columns"] = list(api_columns)
+    api_df.attrs["api_constants"] = {
+        col: API_CONSTANTS[col] for col in api_columns if col in API_CONSTANTS
+    }
+    return api_df
+
+
+def expand_api_constants(
+    df: pd.DataFrame, constants: Optional[dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Add the constant API fields stored in the attrs of a dataframe of API
+    transactions (see select_api_columns) as columns, in API column order.
+
+    :param df: dataframe of API transactions
+    :type df: pd.DataFrame
+    :param constants: other fields with the same value for every
+    transaction (e.g. account_id), replacing any field of the same name
+    :type constants: dict[str, Any], optional
+    :return: dataframe with a column for every API field
+    :rtype: pd.DataFrame
+    """
+    constants = {**df.attrs.get("api_constants", {}), **(constants or {})}
+    if not constants:
+        return df
+    column_order = list(df.attrs.get("api_columns", df.columns))
+    column_order += [
+        col for col in [*df.columns, *constants] if col not in column_order
+    ]
+    return pd.DataFrame(
+        {
+            col: constants[col] if col in constants else df[col]
+            for col in column_order
+        },
+        index=df.index,
+    )
+
+
+def truncate_strings(string_series: pd.Series, length: int) -> pd.Series:
+    """
+    Shorten strings to a maximum length. Other values (e.g. blanks filled
+    with 0) are left as they are, even when the series contains no strings
+    at all.
+
+    :param string_series: series of values to shorten
+    :type string_series: pd.Series
+    :param length: maximum length of strings
+    :type length: int
+    :return: shortened strings
+    :rtype: pd.Series
+    """
+    if is_arrow_string(string_series):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        return to_arrow_series(
+            pc.utf8_slice_codeunits(pa.array(string_series.array), 0, length),
+            string_series,
+        )
+    try:
+        truncated_series = string_series.str.slice(0, length)
+    except AttributeError:
+        return string_series.infer_objects()
+    return truncated_series.where(truncated_series.notna(), string_series)
+
+
+def drop_seen_transactions(
+    df: pd.DataFrame, seen_keys: set[Any]
+) -> pd.DataFrame:
+    """
+    Remove transactions which have already been seen, in this or earlier
+    dataframes, and remember the rest. Transactions are identified by
+    their account & import IDs (as columns or constant API fields), or by
+    all of their values if the dataframe doesn't have both of those.
+
+    :param df: dataframe of API transactions
+    :type df: pd.DataFrame
+    :param seen_keys: keys of transactions already seen, updated with the
+    transactions kept
+    :type seen_keys: set
+    :return: dataframe of transactions not seen before
+    :rtype: pd.DataFrame
+    """
+    constants = df.attrs.get("api_constants", {})
+    if all(
+        col in df.columns or col in constants
+        for col in TRANSACTION_KEY_COLUMNS
+    ):
+        keys: Iterator[Any] = zip(
+            *(
+                (
+                    df[col].to_numpy()
+                    if col in df.columns
+                    else itertools.repeat(constants[col], len(df))
+                )
+                for col in TRANSACTION_KEY_COLUMNS
+            )
+        )
+    else:
+        keys = iter(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    is_new = np.zeros(len(df), dtype=bool)
+    for row, key in enumerate(keys):
+        if key not in seen_keys:
+            seen_keys.add(key)
+            is_new[row] = True
+    if is_new.all():
+        return df
+    return df[is_new]
+
+
+def combine_dfs(
+    df_list: list[pd.DataFrame], deduplicate: bool = True
+) -> pd.DataFrame:
+    """
+    Concatenate a list of provided dataframes, keeping only the first
+    instance of each transaction (see drop_seen_transactions).
 
     :param df_list: list of dataframes to concatenate
     :type df_list: list[pd.DataFrame]
+    :param deduplicate: False if the dataframes have already had their
+    duplicate transactions removed
+    :type deduplicate: bool
     :return: concatenated dataframe
     :rtype: pd.DataFrame
     """
-    merged_df = pd.concat(df_list, ignore_index=True).drop_duplicates()
+    if deduplicate:
+        seen_keys: set[Any] = set()
+        df_list = [drop_seen_transactions(df, seen_keys) for df in df_list]
+    merged_df = pd.concat(df_list, ignore_index=True)
     return merged_df
+
+
+def write_transactions_json(
+    df: pd.DataFrame,
+    stream: IO[bytes],
+    constants: Optional[dict[str, Any]] = None,
+) -> None:
+    """
+    Write transactions to a stream as JSON objects separated by commas,
+    i.e. the contents of a JSON array. The JSON is written straight from
+    the dataframe's columns by pandas' (C) JSON encoder, without creating
+    a dictionary for each transaction. Constant API fields are added as
+    columns one chunk of transactions at a time.
+
+    :param df: dataframe of API transactions
+    :type df: pd.DataFrame
+    :param stream: binary stream to write to
+    :type stream: IO[bytes]
+    :param constants: other fields with the same value for every
+    transaction (e.g. account_id), replacing any field of the same name
+    :type constants: dict[str, Any], optional
+    """
+    for start in range(0, len(df), JSON_CHUNK_SIZE):
+        # only a chunk of the constant columns exists at any time
+        chunk_df = expand_api_constants(
+            df.iloc[start : start + JSON_CHUNK_SIZE], constants
+        )
+        if start > 0:
+            stream.write(b",")
+        # remove the brackets from each chunk's array of objects
+        stream.write(chunk_df.to_json(orient="records")[1:-1].encode("utf-8"))
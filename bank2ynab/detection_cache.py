@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Optional
+
+from transactionfile_reader import get_file_identity
+
+
+class DetectionCache:
+    """
+    Persistent store of detection results (encoding, bank, header line)
+    for input files, keyed by file path and invalidated whenever the file's
+    identity (size, modification time, inode) changes.
+    The least recently used entries are evicted once the cache is full.
+    Using an entry only reorders it in memory, so a run which detects
+    nothing new doesn't rewrite the cache; the order is saved along with
+    the next entry stored.
+    Copies of the cache (e.g. pickled for a worker process) keep track of
+    the entries stored in them, so they can be added back to the original.
+    """
+
+    def __init__(self, cache_path: str, max_entries: int) -> None:
+        """
+        Load the cache from disk if it exists.
+
+        :param cache_path: path of the cache file
+        :type cache_path: str
+        :param max_entries: maximum number of files to remember
+        :type max_entries: int
+        """
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.modified = False
+        self.entries: OrderedDict[str, dict[str, Any]] = self._load()
+        # files whose entries have been stored in this copy of the cache
+        self.stored_keys: set[str] = set()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # copies only track the entries stored in them
+        return {**self.__dict__, "stored_keys": set()}
+
+    def _load(self) -> OrderedDict[str, dict[str, Any]]:
+        try:
+            with open(self.cache_path, encoding="utf-8") as cache_file:
+                return OrderedDict(json.load(cache_file))
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError):
+            logging.warning(
+                f"Detection cache {self.cache_path} is unreadable, ignoring."
+            )
+        return OrderedDict()
+
+    def get(self, file_path: str) -> Optional[dict[str, Any]]:
+        """
+        Returns cached detection results for a file if it is unchanged.
+
+        :param file_path: path to file
+        :type file_path: str
+        :return: dictionary of cached values, or None if not cached
+        :rtype: dict[str, Any], optional
+        """
+        key = os.path.realpath(file_path)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            identity = get_file_identity(file_path)
+        except OSError:
+            return None
+        if entry["identity"] != identity:
+            return None
+        self.entries.move_to_end(key)
+        return entry["values"]
+
+    def store(self, file_path: str, **values: Any) -> None:
+        """
+        Add detection results for a file to the cache.
+        Values already stored for the same version of the file are kept.
+
+        :param file_path: path to file
+        :type file_path: str
+        :param values: detection results to store (e.g. encoding="utf-8")
+        :type values: Any
+        """
+        if self.max_entries <= 0:
+            return
+        key = os.path.realpath(file_path)
+        identity = get_file_identity(file_path)
+        entry = self.entries.get(key)
+        if entry is None or entry["identity"] != identity:
+            entry = {"identity": identity, "values": dict()}
+            self.entries[key] = entry
+        entry["values"].update(values)
+        self.entries.move_to_end(key)
+        self.stored_keys.add(key)
+        self._evict()
+        self.modified = True
+
+    def get_stored_entries(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the entries stored in this copy of the cache, least
+        recently used first.
+
+        :return: dictionary of entries by file key
+        :rtype: dict[str, dict[str, Any]]
+        """
+        return {
+            key: entry
+            for key, entry in self.entries.items()
+            if key in self.stored_keys
+        }
+
+    def update(self, entries: dict[str, dict[str, Any]]) -> None:
+        """
+        Add entries stored in another copy of the cache (see
+        get_stored_entries), replacing those for the same files.
+
+        :param entries: dictionary of entries by file key
+        :type entries: dict[str, dict[str, Any]]
+        """
+        if not entries:
+            return
+        for key, entry in entries.items():
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.stored_keys.add(key)
+        self._evict()
+        self.modified = True
+
+    def _evict(self) -> None:
+        # evict least recently used entries
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        Write the cache to disk if it has changed.
+        """
+        if not self.modified:
+            return
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(self.entries, cache_file)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Unable to save detection cache: {e}")
+        else:
+            self.modified = False
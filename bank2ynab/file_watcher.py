@@ -0,0 +1,205 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from os import path
+from typing import Optional, Union
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+# layout of the fixed part of an inotify event: wd, mask, cookie, len
+INOTIFY_EVENT = struct.Struct("iIII")
+# time to wait for further events once a change has been seen, so that
+# files written in a burst are handled together
+SETTLE_TIME = 0.5
+
+
+class PollingWatcher:
+    """
+    Detects new or modified files by periodically scanning directories.
+    A file is only reported once its size and modification time have
+    stopped changing between two scans, so partially-downloaded files
+    are not picked up.
+    """
+
+    def __init__(self, directories: list[str], interval: float) -> None:
+        """
+        Take an initial snapshot of the directories to watch.
+
+        :param directories: list of directories to watch
+        :type directories: list[str]
+        :param interval: seconds between directory scans
+        :type interval: float
+        """
+        self.directories = directories
+        self.interval = interval
+        # files already reported (or present when we started)
+        self.known = self._scan()
+        # files seen changing in the last scan
+        self.pending: dict[str, tuple[int, int]] = dict()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot: dict[str, tuple[int, int]] = dict()
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if not entry.is_file():
+                                continue
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        snapshot[entry.path] = (
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                        )
+            except OSError:
+                continue
+        return snapshot
+
+    def poll(self) -> list[str]:
+        """
+        Scan the directories once.
+
+        :return: files that are new or modified and no longer changing
+        :rtype: list[str]
+        """
+        snapshot = self._scan()
+        ready: list[str] = list()
+        pending: dict[str, tuple[int, int]] = dict()
+        for file_path, state in snapshot.items():
+            if self.known.get(file_path) == state:
+                continue
+            if self.pending.get(file_path) == state:
+                ready.append(file_path)
+                self.known[file_path] = state
+            else:
+                pending[file_path] = state
+        self.pending = pending
+        # forget files which have been removed
+        for file_path in set(self.known).difference(snapshot):
+            del self.known[file_path]
+        return ready
+
+    def wait(self) -> list[str]:
+        """
+        Block until new files are ready.
+
+        :return: files that are new or modified and no longer changing
+        :rtype: list[str]
+        """
+        while True:
+            ready = self.poll()
+            if ready:
+                return ready
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detects files that have been written or moved into directories
+    using the Linux inotify API, without scanning the directories.
+    """
+
+    def __init__(self, directories: list[str]) -> None:
+        """
+        Register an inotify watch for each directory.
+
+        :param directories: list of directories to watch
+        :type directories: list[str]
+        :raises OSError: if inotify is unavailable or no directory can be
+        watched
+        """
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches: dict[int, str] = dict()
+        for directory in directories:
+            watch = libc.inotify_add_watch(
+                self.fd,
+                os.fsencode(directory),
+                IN_CLOSE_WRITE | IN_MOVED_TO,
+            )
+            if watch < 0:
+                errno = ctypes.get_errno()
+                logging.error(
+                    f"Unable to watch {directory}: {os.strerror(errno)}"
+                )
+                continue
+            self.watches[watch] = directory
+        if not self.watches:
+            # nothing would ever be reported
+            os.close(self.fd)
+            raise OSError("unable to watch any of the directories")
+
+    def _read_events(self) -> list[str]:
+        buffer = os.read(self.fd, 64 * 1024)
+        file_paths: list[str] = list()
+        offset = 0
+        while offset < len(buffer):
+            watch, _, _, name_len = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = buffer[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if watch in self.watches and name:
+                file_paths.append(
+                    path.join(self.watches[watch], os.fsdecode(name))
+                )
+        return file_paths
+
+    def wait(self, timeout: Optional[float] = None) -> list[str]:
+        """
+        Block until files have been written.
+
+        :param timeout: maximum seconds to wait, or None to wait forever
+        :type timeout: float, optional
+        :return: files that have been written (empty if timed out)
+        :rtype: list[str]
+        """
+        file_paths: list[str] = list()
+        wait_time = timeout
+        while select.select([self.fd], [], [], wait_time)[0]:
+            file_paths += self._read_events()
+            wait_time = SETTLE_TIME
+        # remove duplicates while keeping the order of events
+        return [
+            file_path
+            for file_path in dict.fromkeys(file_paths)
+            if path.isfile(file_path)
+        ]
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def create_watcher(
+    directories: list[str], interval: float
+) -> Union[InotifyWatcher, PollingWatcher]:
+    """
+    Create the most efficient watcher available on this system.
+
+    :param directories: list of directories to watch
+    :type directories: list[str]
+    :param interval: seconds between directory scans when polling
+    :type interval: float
+    :return: directory watcher
+    :rtype: InotifyWatcher | PollingWatcher
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            logging.info(f"Not using inotify ({e}), polling instead.")
+    return PollingWatcher(directories, interval)
@@ -0,0 +1,220 @@
+import codecs
+import csv
+import hashlib
+from typing import Any, Iterable, Optional
+
+# amount of data read from the start of a file to identify its format
+SAMPLE_BYTES = 8 * 1024
+
+
+class FormatIndex:
+    """
+    Index of bank formats by the structure of their files, used to identify
+    files whose names don't follow their bank's filename convention.
+
+    Each format is indexed by its delimiter, number of header rows and
+    number of input columns. Formats are also indexed by the hash of their
+    header line, learned from files previously parsed successfully.
+    """
+
+    def __init__(
+        self,
+        config_list: list[dict[str, Any]],
+        known_files: Iterable[dict[str, Any]] = (),
+    ) -> None:
+        """
+        Build the index from bank configurations.
+
+        :param config_list: list of bank configuration dictionaries
+        :type config_list: list[dict[str, Any]]
+        :param known_files: detection results of previously parsed files,
+        containing the "bank" that parsed them and their "header" hash
+        :type known_files: Iterable[dict[str, Any]]
+        """
+        self.configs: dict[str, dict[str, Any]] = dict()
+        self.structure_index: dict[tuple[str, int, int], list[str]] = dict()
+        self.header_index: dict[str, list[str]] = dict()
+        for config in config_list:
+            if config["content_match"] is not True:
+                continue
+            bank_name = config["bank_name"]
+            self.configs[bank_name] = config
+            key = (
+                config["input_delimiter"],
+                int(config["header_rows"]),
+                len(config["input_columns"]),
+            )
+            self.structure_index.setdefault(key, []).append(bank_name)
+        # distinct delimiter & header row combinations to check files for
+        self.layouts = sorted(
+            {
+                (delim, header_rows)
+                for delim, header_rows, _ in self.structure_index
+            }
+        )
+        for values in known_files:
+            if "bank" in values and "header" in values:
+                self.add_header(values["bank"], values["header"])
+
+    def add_header(self, bank_name: str, header_hash: str) -> None:
+        """
+        Associate a header line hash with a bank format.
+
+        :param bank_name: name of the bank format
+        :type bank_name: str
+        :param header_hash: hash of the header line of a file in this format
+        :type header_hash: str
+        """
+        if bank_name not in self.configs:
+            return
+        bank_names = self.header_index.setdefault(header_hash, [])
+        if bank_name not in bank_names:
+            bank_names.append(bank_name)
+
+    def identify(
+        self, file_path: str, data: Optional[bytes] = None
+    ) -> list[str]:
+        """
+        Returns the bank formats a file could belong to.
+        A known header line identifies its formats directly; otherwise a
+        format is only returned if it is the only one matching the
+        file's structure.
+
+        :param file_path: path to file
+        :type file_path: str
+        :param data: contents of the file if already read into memory
+        :type data: bytes, optional
+        :return: list of matching bank names
+        :rtype: list[str]
+        """
+        if not self.configs:
+            return []
+        try:
+            lines = read_sample_lines(file_path, data)
+        except OSError:
+            return []
+
+        candidates: list[str] = list()
+        for delim, header_rows in self.layouts:
+            if header_rows > 0:
+                header_hash = hash_line(lines, header_rows - 1)
+                if header_hash in self.header_index:
+                    return [
+                        bank_name
+                        for bank_name in self.header_index[header_hash]
+                        if self._layout_matches(bank_name, delim, header_rows)
+                    ]
+            column_count = count_fields(lines, delim, header_rows)
+            candidates += self.structure_index.get(
+                (delim, header_rows, column_count), []
+            )
+        return candidates if len(candidates) == 1 else []
+
+    def _layout_matches(
+        self, bank_name: str, delim: str, header_rows: int
+    ) -> bool:
+        config = self.configs[bank_name]
+        return (
+            config["input_delimiter"] == delim
+            and int(config["header_rows"]) == header_rows
+        )
+
+
+def read_sample_lines(
+    file_path: str, data: Optional[bytes] = None
+) -> list[str]:
+    """
+    Returns the complete lines found at the start of a file.
+    Delimiters are always ASCII, so anything without a byte order mark is
+    decoded as Latin-1, which never fails.
+
+    :param file_path: path to file
+    :type file_path: str
+    :param data: contents of the file if already read into memory
+    :type data: bytes, optional
+    :return: list of lines
+    :rtype: list[str]
+    """
+    if data is not None:
+        sample = data[:SAMPLE_BYTES]
+        complete = len(data) <= SAMPLE_BYTES
+    else:
+        with open(file_path, "rb") as f:
+            sample = f.read(SAMPLE_BYTES + 1)
+        complete = len(sample) <= SAMPLE_BYTES
+        sample = sample[:SAMPLE_BYTES]
+
+    encoding = "latin_1"
+    for bom, bom_encoding in [
+        (codecs.BOM_UTF32_LE, "utf_32"),
+        (codecs.BOM_UTF32_BE, "utf_32"),
+        (codecs.BOM_UTF8, "utf_8_sig"),
+        (codecs.BOM_UTF16_LE, "utf_16"),
+        (codecs.BOM_UTF16_BE, "utf_16"),
+    ]:
+        if sample.startswith(bom):
+            encoding = bom_encoding
+            break
+    lines = sample.decode(encoding, errors="ignore").splitlines()
+    # the last line may have been cut off
+    if not complete and lines:
+        lines.pop()
+    return lines
+
+
+def hash_line(lines: list[str], line_number: int) -> Optional[str]:
+    """
+    Returns a hash of a given line, ignoring surrounding whitespace.
+
+    :param lines: list of lines
+    :type lines: list[str]
+    :param line_number: index of the line to hash
+    :type line_number: int
+    :return: hash of the line, or None if there is no such line
+    :rtype: str, optional
+    """
+    try:
+        line = lines[line_number].strip()
+    except IndexError:
+        return None
+    return hashlib.sha256(line.encode("utf-8")).hexdigest()[:16]
+
+
+def count_fields(lines: list[str], delim: str, header_rows: int) -> int:
+    """
+    Returns the number of fields in the first data row.
+
+    :param lines: list of lines
+    :type lines: list[str]
+    :param delim: CSV separator
+    :type delim: str
+    :param header_rows: number of header rows before the data
+    :type header_rows: int
+    :return: number of fields, or 0 if there is no data row
+    :rtype: int
+    """
+    for line in lines[header_rows:]:
+        if line.strip() == "":
+            continue
+        return len(next(csv.reader([line], delimiter=delim)))
+    return 0
+
+
+def get_header_hash(
+    file_path: str, header_rows: int, data: Optional[bytes] = None
+) -> Optional[str]:
+    """
+    Returns a hash of a file's header line (the last header row).
+
+    :param file_path: path to file
+    :type file_path: str
+    :param header_rows: number of header rows
+    :type header_rows: int
+    :param data: contents of the file if already read into memory
+    :type data: bytes, optional
+    :return: hash of the header line, or None if there is no header
+    :rtype: str, optional
+    """
+    if header_rows < 1:
+        return None
+    return hash_line(read_sample_lines(file_path, data), header_rows - 1)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Optional
+
+from transactionfile_reader import get_file_identity, open_source
+
+# import results recorded in the ledger
+IMPORTED = "imported"
+NO_DATA = "no_data"
+# size of each block of data read when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ImportLedger:
+    """
+    SQLite record of the content hashes of files already processed by
+    each bank, so archived files can be skipped without being parsed.
+    File hashes are themselves cached by path and file identity
+    (size, modification time, inode) so unchanged files aren't re-read.
+    A deferred ledger (e.g. in a worker process) doesn't write to the
+    database, but keeps the rows it would write for another ledger to
+    write (see write_rows), so it never locks the database.
+    """
+
+    def __init__(self, db_path: str, deferred: bool = False) -> None:
+        """
+        Open the ledger, creating it if it doesn't exist.
+
+        :param db_path: path of the ledger database
+        :type db_path: str
+        :param deferred: whether to keep rows rather than writing them
+        :type deferred: bool
+        """
+        self.db_path = db_path
+        # rows not yet written, by table & primary key, if deferred
+        self.pending_rows: Optional[dict[str, dict[Any, tuple]]] = None
+        if deferred:
+            self.pending_rows = {"file_hashes": {}, "processed_files": {}}
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS processed_files (
+                hash TEXT NOT NULL,
+                bank TEXT NOT NULL,
+                config TEXT NOT NULL,
+                result TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (hash, bank)
+            );
+            """)
+
+    def get_hash(self, file_path: str) -> str:
+        """
+        Returns the content hash of a file, reusing the stored hash if the
+        file hasn't changed since it was last hashed.
+
+        :param file_path: path to file
+        :type file_path: str
+        :return: hex digest of the file's contents
+        :rtype: str
+        """
+        key = os.path.realpath(file_path)
+        identity = get_file_identity(file_path)
+        row = self._get_pending_row("file_hashes", key)
+        if row is None:
+            row = self.connection.execute(
+                "SELECT path, size, mtime_ns, inode, hash FROM file_hashes"
+                " WHERE path = ?",
+                (key,),
+            ).fetchone()
+        if row is not None and list(row[1:4]) == identity:
+            return row[4]
+        file_hash = hash_file(file_path)
+        self._write_row("file_hashes", key, (key, *identity, file_hash))
+        return file_hash
+
+    def lookup(
+        self, file_hash: str, bank_name: str, config_hash: str
+    ) -> Optional[str]:
+        """
+        Returns the result of processing a file's contents with a bank.
+        Files without data are only reported if the bank's configuration
+        hasn't changed since, as the new configuration might parse them.
+
+        :param file_hash: content hash of the file
+        :type file_hash: str
+        :param bank_name: name of the bank format
+        :type bank_name: str
+        :param config_hash: fingerprint of the bank's configuration
+        :type config_hash: str
+        :return: recorded result, or None if not processed before
+        :rtype: str, optional
+        """
+        row = self._get_pending_row("processed_files", (file_hash, bank_name))
+        if row is None:
+            row = self.connection.execute(
+                "SELECT * FROM processed_files WHERE hash = ? AND bank = ?",
+                (file_hash, bank_name),
+            ).fetchone()
+        if row is None:
+            return None
+        recorded_config, result = row[2:4]
+        if result != IMPORTED and recorded_config != config_hash:
+            return None
+        return result
+
+    def record(
+        self,
+        file_hash: str,
+        bank_name: str,
+        config_hash: str,
+        result: str,
+        rows: int = 0,
+    ) -> None:
+        """
+        Record the result of processing a file's contents with a bank.
+
+        :param file_hash: content hash of the file
+        :type file_hash: str
+        :param bank_name: name of the bank format
+        :type bank_name: str
+        :param config_hash: fingerprint of the bank's configuration
+        :type config_hash: str
+        :param result: IMPORTED or NO_DATA
+        :type result: str
+        :param rows: number of transactions imported
+        :type rows: int
+        """
+        self._write_row(
+            "processed_files",
+            (file_hash, bank_name),
+            (file_hash, bank_name, config_hash, result, rows, time.time()),
+        )
+
+    def write_rows(self, rows: dict[str, dict[Any, tuple]]) -> None:
+        """
+        Write the rows kept by a deferred ledger.
+
+        :param rows: rows by table & primary key (see pending_rows)
+        :type rows: dict[str, dict[Any, tuple]]
+        """
+        for table, table_rows in rows.items():
+            for key, row in table_rows.items():
+                self._write_row(table, key, row)
+
+    def _get_pending_row(self, table: str, key: Any) -> Optional[tuple]:
+        if self.pending_rows is None:
+            return None
+        return self.pending_rows[table].get(key)
+
+    def _write_row(self, table: str, key: Any, row: tuple) -> None:
+        if self.pending_rows is not None:
+            self.pending_rows[table][key] = row
+            return
+        placeholders = ", ".join("?" * len(row))
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", row
+        )
+
+    def commit(self) -> None:
+        """
+        Write pending changes to disk.
+        """
+        try:
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Unable to save import ledger: {e}")
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's (or archive member's)
+    contents.
+
+    :param file_path: path to file
+    :type file_path: str
+    :return: hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open_source(file_path) as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_config_hash(config_dict: dict[str, Any]) -> str:
+    """
+    Returns a fingerprint of a bank configuration.
+
+    :param config_dict: bank configuration dictionary
+    :type config_dict: dict[str, Any]
+    :return: hex digest of the configuration
+    :rtype: str
+    """
+    serialized = json.dumps(config_dict, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
@@ -21,37 +21,44 @@ class OCBC_Bank_SG(BankHandler):
         Overwrite input file with modified output.
         :param file_path: path to file
         """
+        with open(file_path, "rb") as input_file:
+            data = input_file.read()
+
+        # overwrite source file
+        with open(file_path, "wb") as output_file:
+            output_file.write(self._preprocess_data(data, plugin_args))
+        return file_path
+
+    def _preprocess_data(self, data, plugin_args) -> bytes:
+        """
+        For every row that doesn't have a valid date field
+        strip out separators and append to preceding row.
+        :param data: contents of the source file
+        """
         # what do we actually want to do?
         header_rows = int(self.config_dict["header_rows"])
         footer_rows = int(self.config_dict["footer_rows"])
 
-        # get total number of rows in transaction file using a generator
-        with open(file_path) as row_counter:
-            row_count = sum(1 for _ in row_counter)
-
-        with open(file_path) as input_file:
-            output_rows = []
-            for rownum, row in enumerate(input_file):
-                # strip any single quotes, e.g. if payee is MCDONALD'S
-                row = row.replace("'", "")
-                # append headers and footers without modification
-                if rownum < header_rows or rownum > (row_count - footer_rows):
-                    output_rows.append(row)
-                    continue
-                if row[0] == ",":
-                    # join with the previous row but excluding the newline char
-                    # of the previous row
-                    output_rows[-1] = (
-                        output_rows[-1][:-1] + "," + row.strip(" ,")
-                    )
-                else:
-                    output_rows.append(row)
+        rows = data.splitlines(keepends=True)
+        row_count = len(rows)
 
-        # overwrite source file
-        with open(file_path, "w") as output_file:
-            for row in output_rows:
-                output_file.write(row)
-        return file_path
+        output_rows: list[bytes] = []
+        for rownum, row in enumerate(rows):
+            # strip any single quotes, e.g. if payee is MCDONALD'S
+            row = row.replace(b"'", b"")
+            # append headers and footers without modification
+            if rownum < header_rows or rownum > (row_count - footer_rows):
+                output_rows.append(row)
+                continue
+            if row.startswith(b",") and output_rows:
+                # join with the previous row but excluding the line ending
+                # of the previous row
+                output_rows[-1] = (
+                    output_rows[-1].rstrip(b"\r\n") + b"," + row.strip(b" ,")
+                )
+            else:
+                output_rows.append(row)
+        return b"".join(output_rows)
 
 
 def build_bank(config):
@@ -0,0 +1,709 @@
+"""
+Polars engine for DataframeHandler (see the Dataframe Engine option).
+Each file is read into a Polars lazy frame and the parsing steps of
+dataframe_handler.parse_data() are built up as expressions on it, which
+Polars then runs in one pass over several threads. Steps which work on
+each distinct value (parsing dates & amounts, cleaning strings) call the
+pandas engine's functions on the distinct values, so both engines give the
+same results and share the same caches.
+Requires the polars package, which is only imported by this module.
+"""
+
+import io
+import logging
+from typing import Any, Callable, Optional
+
+import dataframe_handler
+import pandas as pd
+import polars as pl
+from dataframe_handler import API_CONSTANTS, TEXT_COLUMNS
+
+# values read as blanks, as the pandas CSV parsers do by default
+NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def parse_file(
+    *,
+    file_path: str,
+    delim: str,
+    header_rows: int,
+    footer_rows: int,
+    encod: str,
+    input_columns: list[str],
+    output_columns: list[str],
+    api_columns: list[str],
+    cd_flags: list[str],
+    date_format: str,
+    date_dedupe: bool,
+    fill_memo: bool,
+    currency_fix: float,
+    data: Optional[bytes] = None,
+    decimal_sep: str = "",
+    thousands_sep: str = "",
+    exact_amounts: bool = False,
+    date_cache: Optional[dict[Any, Any]] = None,
+    string_cache: Optional[dict[Any, Any]] = None,
+) -> pd.DataFrame:
+    """
+    Read & parse a CSV file with Polars, returning the same dataframe as
+    dataframe_handler.read_csv() followed by dataframe_handler.parse_data().
+    Parameters are as for DataframeHandler.run().
+
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
+    :raises ValueError: if the file can't be read or parsed
+    :return: modified dataframe matching provided configuration values
+    :rtype: pd.DataFrame
+    """
+    lf = read_csv(
+        file_path=file_path,
+        delim=delim,
+        header_rows=header_rows,
+        footer_rows=footer_rows,
+        encod=encod,
+        input_columns=input_columns,
+        data=data,
+    )
+    lf = parse_data(
+        lf=lf,
+        input_columns=dataframe_handler.get_used_columns(input_columns),
+        output_columns=output_columns,
+        api_columns=api_columns,
+        cd_flags=cd_flags,
+        date_format=date_format,
+        date_dedupe=date_dedupe,
+        fill_memo=fill_memo,
+        currency_fix=currency_fix,
+        decimal_sep=decimal_sep,
+        thousands_sep=thousands_sep,
+        exact_amounts=exact_amounts,
+        date_cache=date_cache,
+        string_cache=string_cache,
+    )
+    # other input columns are read as numbers if they can be, as by pandas
+    text_columns = dataframe_handler.get_text_columns(
+        decimal_sep, thousands_sep
+    )
+    number_columns = [
+        col
+        for col in dataframe_handler.get_used_columns(input_columns)
+        if col not in text_columns
+    ]
+    milliunit_columns = ["Inflow", "Outflow"] if exact_amounts else None
+    try:
+        df = to_pandas(lf.collect(), number_columns, milliunit_columns)
+    except pl.exceptions.PolarsError as e:
+        raise ValueError(f"Unable to parse file with Polars: {e}") from e
+    logging.info(f"Parsed {df.shape[0]} lines")
+    logging.debug(f"\nFinal DF\n{df.head(10)}")
+    return df
+
+
+def read_csv(
+    *,
+    file_path: str,
+    delim: str,
+    header_rows: int,
+    footer_rows: int,
+    encod: str,
+    input_columns: list[str],
+    data: Optional[bytes] = None,
+) -> pl.LazyFrame:
+    """
+    Read a CSV file into a lazy frame of text columns named after the
+    input columns, with duplicated input columns merged. Skipped columns
+    aren't read, and blank lines are read as blank rows.
+    Polars only reads UTF-8 with "\\n" line breaks, so the file is decoded
+    (and its header & footer rows removed) beforehand.
+
+    :param file_path: Path to CSV file
+    :type file_path: str
+    :param delim: CSV separator
+    :type delim: str
+    :param header_rows: Number of header rows
+    :type header_rows: int
+    :param footer_rows: Number of footer rows
+    :type footer_rows: int
+    :param encod: CSV file encoding
+    :type encod: str
+    :param input_columns: columns present in input data
+    :type input_columns: list[str]
+    :param data: contents of the CSV file, read instead of file_path if set
+    :type data: bytes, optional
+    :raises ColumnCountError: if the file doesn't have one column for each
+    input column
+    :raises ValueError: if the file can't be read
+    :return: lazy frame of the used input columns
+    :rtype: pl.LazyFrame
+    """
+    if data is None:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    dataframe_handler.check_column_count(
+        io.BytesIO(data),
+        input_columns,
+        dataframe_handler.get_c_parser_args(delim, header_rows, encod),
+    )
+    with io.TextIOWrapper(io.BytesIO(data), encoding=encod) as f:
+        # universal newlines, so "\r\n" & "\r" line breaks become "\n"
+        text = f.read().removeprefix("\ufeff")
+    start = 0
+    for _ in range(header_rows):
+        start = text.find("\n", start) + 1
+        if start == 0:
+            start = len(text)
+            break
+    end = len(text)
+    slice_footer = False
+    if footer_rows > 0:
+        footer_start = dataframe_handler.find_footer_start(
+            text, footer_rows, "\n", '"'
+        )
+        if footer_start is None:
+            # rows span several lines, so drop them after reading
+            slice_footer = True
+        else:
+            end = footer_start
+    # the number of columns is taken from the first line read
+    text = text[start:end].lstrip("\n")
+
+    lf = pl.scan_csv(
+        io.BytesIO(text.encode("utf-8")),
+        has_header=False,
+        separator=delim,
+        new_columns=[str(index) for index in range(len(input_columns))],
+        infer_schema=False,
+        truncate_ragged_lines=True,
+    )
+    if slice_footer:
+        lf = lf.filter(pl.int_range(pl.len()) < pl.len() - footer_rows)
+    # merge duplicate input columns
+    column_values: dict[str, list[pl.Expr]] = dict()
+    for index in dataframe_handler.get_used_column_positions(input_columns):
+        column_values.setdefault(input_columns[index], []).append(
+            clean_value(pl.col(str(index)))
+        )
+    return lf.select(
+        merge_values(values).alias(column)
+        for column, values in column_values.items()
+    )
+
+
+def clean_value(value: pl.Expr) -> pl.Expr:
+    """
+    Remove the spaces after the delimiter from a value read as text, and
+    make blank values null.
+
+    :param value: value read from a CSV file
+    :type value: pl.Expr
+    :return: cleaned value
+    :rtype: pl.Expr
+    """
+    value = value.str.strip_chars_start(" ")
+    return pl.when(value.is_in(NULL_VALUES)).then(None).otherwise(value)
+
+
+def merge_values(values: list[pl.Expr]) -> pl.Expr:
+    """
+    Join the values of duplicated input columns with a space, leaving rows
+    with no value in any of them blank (see merge_duplicate_columns()).
+
+    :param values: values of each duplicate column
+    :type values: list[pl.Expr]
+    :return: merged value
+    :rtype: pl.Expr
+    """
+    if len(values) == 1:
+        return values[0]
+    merged = (
+        pl.concat_str(values, separator=" ", ignore_nulls=True)
+        .str.replace_all(r"\s{2,}", " ")
+        .str.strip_chars()
+    )
+    return pl.when(pl.any_horizontal(v.is_not_null() for v in values)).then(
+        merged
+    )
+
+
+def parse_data(
+    *,
+    lf: pl.LazyFrame,
+    input_columns: list[str],
+    output_columns: list[str],
+    api_columns: list[str],
+    cd_flags: list[str],
+    date_format: str,
+    date_dedupe: bool,
+    fill_memo: bool,
+    currency_fix: float,
+    decimal_sep: str = "",
+    thousands_sep: str = "",
+    exact_amounts: bool = False,
+    date_cache: Optional[dict[Any, Any]] = None,
+    string_cache: Optional[dict[Any, Any]] = None,
+) -> pl.LazyFrame:
+    """
+    Add the steps of dataframe_handler.parse_data() to a lazy frame read
+    by read_csv(). Nothing is parsed until the frame is collected.
+
+    :param lf: lazy frame of the used input columns
+    :type lf: pl.LazyFrame
+    :param input_columns: used columns present in input data
+    :type input_columns: list
+    :return: lazy frame of the parsed data
+    :rtype: pl.LazyFrame
+    """
+    # add missing columns (blank text, or blank numbers as with pandas)
+    lf = lf.with_columns(
+        pl.lit(
+            None, dtype=pl.String if col in TEXT_COLUMNS else pl.Float64
+        ).alias(col)
+        for col in dict.fromkeys(
+            output_columns
+            + [col for col in api_columns if col not in API_CONSTANTS]
+            + list(TEXT_COLUMNS)
+        )
+        if col not in input_columns
+    )
+    # fix date format
+    date = fix_date(pl.col("Date"), date_format, date_cache)
+    if date_dedupe:
+        date = date.forward_fill()
+    lf = lf.with_columns(date)
+    if exact_amounts:
+        # convert amounts to milliunits & fix inflows/outflows exactly
+        lf = fix_milliunits(
+            lf, cd_flags, currency_fix, decimal_sep, thousands_sep
+        )
+    else:
+        # fix inflow/outflow string formatting
+        lf = lf.with_columns(
+            clean_monetary_values(
+                pl.col("Inflow"), decimal_sep, thousands_sep
+            ),
+            clean_monetary_values(
+                pl.col("Outflow"), decimal_sep, thousands_sep
+            ),
+        )
+        # process Inflow/Outflow flags
+        lf = cd_flag_process(lf, cd_flags)
+        # fix amounts (convert negative inflows and outflows etc)
+        lf = fix_amount(lf, currency_fix)
+    # auto fill memo from payee if required, then payee from memo
+    if fill_memo:
+        lf = lf.with_columns(pl.col("Memo").fill_null(pl.col("Payee")))
+    lf = lf.with_columns(pl.col("Payee").fill_null(pl.col("Memo")))
+    # fix strings
+    lf = lf.with_columns(
+        clean_strings(pl.col("Payee"), string_cache),
+        clean_strings(pl.col("Memo"), string_cache),
+    )
+    # remove invalid rows
+    lf = remove_invalid_rows(lf)
+    # fill API-specific columns
+    return fill_api_columns(lf)
+
+
+def map_distinct(
+    column: pl.Expr,
+    function: Callable[[pd.Series], Any],
+    dtype: type[pl.DataType],
+) -> pl.Expr:
+    """
+    Convert the distinct values of a column with a function of a pandas
+    series, so each value is only converted once & as the pandas engine
+    converts it. Null values stay null.
+
+    :param column: column to convert
+    :type column: pl.Expr
+    :param function: function converting a series of distinct values
+    :type function: Callable[[pd.Series], Any]
+    :param dtype: type of the converted values
+    :type dtype: type[pl.DataType]
+    :return: converted column
+    :rtype: pl.Expr
+    """
+
+    def convert(series: pl.Series) -> pl.Series:
+        distinct = series.drop_nulls().unique(maintain_order=True)
+        converted = function(pd.Series(distinct.to_list(), dtype=object))
+        return series.replace_strict(
+            distinct,
+            pl.Series(
+                [None if pd.isna(value) else value for value in converted],
+                dtype=dtype,
+            ),
+            default=None,
+            return_dtype=dtype,
+        )
+
+    return column.map_batches(convert, return_dtype=dtype)
+
+
+def infer_numbers(values: pd.Series) -> pd.Series:
+    """
+    Convert values to numbers if they're all numbers, as the pandas CSV
+    parsers do for each column.
+
+    :param values: values read as text
+    :type values: pd.Series
+    :return: numbers, or the values unchanged
+    :rtype: pd.Series
+    """
+    try:
+        return pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return values
+
+
+def infer_amounts(
+    values: pd.Series, decimal_sep: str = "", thousands_sep: str = ""
+) -> pd.Series:
+    """
+    Convert amounts to numbers as infer_numbers() does, unless the pandas
+    engine would read them as text (see dataframe_handler.get_text_columns).
+
+    :param values: amounts read as text
+    :type values: pd.Series
+    :param decimal_sep: decimal separator used in the values
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :return: numbers, or the values unchanged
+    :rtype: pd.Series
+    """
+    if decimal_sep != "" or thousands_sep != "":
+        return values
+    return infer_numbers(values)
+
+
+def fix_date(
+    date_column: pl.Expr,
+    date_format: str,
+    cache: Optional[dict[Any, Any]] = None,
+) -> pl.Expr:
+    """
+    Convert dates to the ISO format (see dataframe_handler.fix_date()).
+
+    :param date_column: dates to convert
+    :type date_column: pl.Expr
+    :param date_format: date format codes according to 1989 C standard
+    :type date_format: str
+    :param cache: previously parsed dates with this date format, updated
+    with the dates parsed now
+    :type cache: dict[Any, Any], optional
+    :return: ISO dates, or null for unparseable dates
+    :rtype: pl.Expr
+    """
+    return map_distinct(
+        date_column,
+        lambda values: dataframe_handler.fix_date(values, date_format, cache),
+        pl.String,
+    )
+
+
+def clean_monetary_values(
+    num_column: pl.Expr, decimal_sep: str = "", thousands_sep: str = ""
+) -> pl.Expr:
+    """
+    Convert amounts into numbers, with blanks as 0 (see
+    dataframe_handler.clean_monetary_values()). As with pandas, amounts
+    are only read as numbers first if no separators are set.
+
+    :param num_column: amounts to convert
+    :type num_column: pl.Expr
+    :param decimal_sep: decimal separator used in the values
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
+    :return: amounts
+    :rtype: pl.Expr
+    """
+    return map_distinct(
+        num_column,
+        lambda values: dataframe_handler.clean_monetary_values(
+            infer_amounts(values, decimal_sep, thousands_sep),
+            decimal_sep,
+            thousands_sep,
+        ),
+        pl.Float64,
+    ).fill_null(0.0)
+
+
+def get_milliunits(
+    num_column: pl.Expr,
+    decimal_sep: str = "",
+    currency_fix: float = 1,
+    thousands_sep: str = "",
+) -> pl.Expr:
+    """
+    Convert amounts into exact integer milliunits, divided by a currency
+    conversion factor, with blanks as 0 (see
+    dataframe_handler.get_milliunits()). As with pandas, amounts are only
+    read as numbers first if no separators are set.
+
+    :param num_column: amounts to convert
+    :type num_column: pl.Expr
+    :param decimal_sep: decimal separator used in the values ("" to guess)
+    :type decimal_sep: str
+    :param currency_fix: value to divide all currency amounts by
+    :type currency_fix: float
+    :param thousands_sep: thousands separator used in the values
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
+    :return: amounts in milliunits
+    :rtype: pl.Expr
+    """
+    return map_distinct(
+        num_column,
+        lambda values: dataframe_handler.get_milliunits(
+            infer_amounts(values, decimal_sep, thousands_sep),
+            decimal_sep,
+            currency_fix,
+            thousands_sep,
+        ),
+        pl.Int64,
+    ).fill_null(0)
+
+
+def cd_flag_process(lf: pl.LazyFrame, cd_flags: list[str]) -> pl.LazyFrame:
+    """
+    Make inflows negative in rows flagged as outflows (see
+    dataframe_handler.cd_flag_process()).
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :param cd_flags: list of parameters for applying indicators
+    :type cd_flags: list
+    :return: modified lazy frame
+    :rtype: pl.LazyFrame
+    """
+    if len(cd_flags) == 3:
+        inflow = pl.col("Inflow")
+        lf = lf.with_columns(
+            pl.when(pl.col("CDFlag") == cd_flags[2])
+            .then(-inflow)
+            .otherwise(inflow)
+            .alias("Inflow")
+        )
+    return lf
+
+
+def swap_negative_amounts(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Convert negative inflows into outflows and vice versa, in the order
+    dataframe_handler.fix_amount() does.
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :return: modified lazy frame
+    :rtype: pl.LazyFrame
+    """
+    inflow, outflow = pl.col("Inflow"), pl.col("Outflow")
+    # negative inflow = outflow (replacing any outflow)
+    lf = lf.with_columns(
+        pl.when(inflow < 0).then(-inflow).otherwise(outflow).alias("Outflow"),
+        pl.when(inflow < 0).then(0).otherwise(inflow).alias("Inflow"),
+    )
+    # negative outflow = inflow (replacing any inflow)
+    return lf.with_columns(
+        pl.when(outflow < 0).then(-outflow).otherwise(inflow).alias("Inflow"),
+        pl.when(outflow < 0).then(0).otherwise(outflow).alias("Outflow"),
+    )
+
+
+def fix_amount(lf: pl.LazyFrame, currency_fix: float) -> pl.LazyFrame:
+    """
+    Convert negative inflows into outflows and vice versa, apply the
+    currency conversion and add the amount column in milliunits (see
+    dataframe_handler.fix_amount()).
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :param currency_fix: value to divide all currency amounts by
+    :type currency_fix: float
+    :return: modified lazy frame
+    :rtype: pl.LazyFrame
+    """
+    lf = swap_negative_amounts(lf).with_columns(
+        pl.col("Inflow") / currency_fix, pl.col("Outflow") / currency_fix
+    )
+    # create amount column for API (in milliunits)
+    return lf.with_columns(
+        (1000 * (pl.col("Inflow") - pl.col("Outflow")))
+        .cast(pl.Int64)
+        .alias("amount")
+    )
+
+
+def fix_milliunits(
+    lf: pl.LazyFrame,
+    cd_flags: list[str],
+    currency_fix: float,
+    decimal_sep: str = "",
+    thousands_sep: str = "",
+) -> pl.LazyFrame:
+    """
+    Exact counterpart of clean_monetary_values(), cd_flag_process() and
+    fix_amount(), with amounts in integer milliunits (see
+    dataframe_handler.fix_milliunits()). Inflows & outflows are left in
+    milliunits, to be converted back by to_pandas(): Polars divides by
+    multiplying by 0.001, which isn't correctly rounded.
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :param cd_flags: list of parameters for applying indicators
+    :type cd_flags: list
+    :param currency_fix: value to divide all currency amounts by
+    :type currency_fix: float
+    :param decimal_sep: decimal separator of amounts ("" to guess)
+    :type decimal_sep: str
+    :param thousands_sep: thousands separator of amounts ("" if none)
+    :type thousands_sep: str
+    :raises ValueError: if a value isn't a valid amount
+    :return: modified lazy frame
+    :rtype: pl.LazyFrame
+    """
+    lf = lf.with_columns(
+        get_milliunits(
+            pl.col("Inflow"), decimal_sep, currency_fix, thousands_sep
+        ),
+        get_milliunits(
+            pl.col("Outflow"), decimal_sep, currency_fix, thousands_sep
+        ),
+    )
+    lf = swap_negative_amounts(cd_flag_process(lf, cd_flags))
+    return lf.with_columns(
+        (pl.col("Inflow") - pl.col("Outflow")).alias("amount")
+    )
+
+
+def clean_strings(
+    string_column: pl.Expr, cache: Optional[dict[Any, Any]] = None
+) -> pl.Expr:
+    """
+    Clean payee & memo strings (see dataframe_handler.clean_strings()).
+
+    :param string_column: strings to clean
+    :type string_column: pl.Expr
+    :param cache: previously cleaned strings, updated with the strings
+    cleaned now
+    :type cache: dict[Any, Any], optional
+    :return: cleaned strings
+    :rtype: pl.Expr
+    """
+    return map_distinct(
+        string_column,
+        lambda values: dataframe_handler.clean_strings(values, cache),
+        pl.String,
+    )
+
+
+def remove_invalid_rows(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Removes rows without a date, an Inflow or Outflow value or an amount.
+    Blank values in the remaining rows are filled in with 0 once they're
+    converted to pandas (see to_pandas()).
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :return: modified lazy frame
+    :rtype: pl.LazyFrame
+    """
+    return lf.filter(
+        (pl.col("Inflow").is_not_null() | pl.col("Outflow").is_not_null())
+        & pl.col("Date").is_not_null()
+        & (pl.col("amount").fill_null(0) != 0)
+    )
+
+
+def fill_api_columns(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Generate API-specific columns (see dataframe_handler.fill_api_columns()).
+
+    :param lf: lazy frame to modify
+    :type lf: pl.LazyFrame
+    :return: lazy frame with additional columns added
+    :rtype: pl.LazyFrame
+    """
+    lf = lf.with_columns(
+        pl.col("Date").alias("date"),
+        pl.col("Payee").str.slice(0, 50).alias("payee_name"),
+        pl.col("Memo").str.slice(0, 100).alias("memo"),
+    )
+    # import_id format = YNAB:amount:ISO-date:occurrences
+    import_id = pl.concat_str(
+        pl.lit("YNAB:"),
+        pl.col("amount").cast(pl.String),
+        pl.lit(":"),
+        pl.col("date"),
+        pl.lit(":"),
+    )
+    # count every instance of import id & add a counter to id
+    same_id_count = pl.int_range(1, pl.len() + 1).over(import_id)
+    return lf.with_columns(
+        pl.concat_str(import_id, same_id_count.cast(pl.String)).alias(
+            "import_id"
+        )
+    )
+
+
+def to_pandas(
+    df: pl.DataFrame,
+    number_columns: Optional[list[str]] = None,
+    milliunit_columns: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """
+    Convert a parsed dataframe to pandas, with blanks filled with 0 as
+    dataframe_handler.remove_invalid_rows() fills them, and blank payees &
+    memos as dataframe_handler.truncate_strings() leaves them. Columns are
+    copied through numpy, so pyarrow isn't needed.
+
+    :param df: parsed dataframe
+    :type df: pl.DataFrame
+    :param number_columns: text columns to convert to numbers if all their
+    values are numbers
+    :type number_columns: list[str], optional
+    :param milliunit_columns: columns of milliunits to convert to amounts
+    :type milliunit_columns: list[str], optional
+    :return: pandas dataframe
+    :rtype: pd.DataFrame
+    """
+    pandas_df = pd.DataFrame(
+        {column: df.get_column(column).to_numpy() for column in df.columns}
+    )
+    # divided by numpy, which rounds exactly as the pandas engine does
+    for column in milliunit_columns or []:
+        pandas_df[column] = pandas_df[column] / 1000
+    for column in number_columns or []:
+        if pandas_df[column].dtype == object:
+            pandas_df[column] = infer_numbers(pandas_df[column])
+    # only columns with blanks are filled, as checking for them is slow
+    for column in df.columns:
+        null_count = df.get_column(column).null_count()
+        if null_count > 0:
+            pandas_df[column] = pandas_df[column].fillna(0)
+        if column in ("payee_name", "memo") and null_count == len(df):
+            pandas_df[column] = pandas_df[column].infer_objects()
+    return pandas_df
@@ -1,10 +1,27 @@
 import codecs
+import glob
+import gzip
+import io
 import logging
 import os
 import re
+import zipfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from os import path
+from typing import IO, Any, Optional
 
-import chardet
+from chardet.universaldetector import UniversalDetector
+from format_index import SAMPLE_BYTES, FormatIndex
+
+# maximum number of directories scanned at once
+SCAN_WORKERS = 8
+# archives whose members can be read as input files
+ARCHIVE_EXTENSIONS = (".zip", ".gz")
 
 
 def get_files(
@@ -14,6 +31,8 @@ def get_files(
     regex_active: bool,
     ext: str,
     prefix: str,
+    recursive: bool = False,
+    archives: bool = False,
 ) -> list[str]:
     """
     Returns list of files matching the specified search parameters.
@@ -22,7 +41,7 @@ def get_files(
     :type name: str
     :param file_pattern: filename or regex pattern to match
     :type file_pattern: str
-    :param try_path: provided path to search initially
+    :param try_path: provided path(s) to search initially
     :type try_path: str
     :param regex_active: whether or not to use regex in file name check
     :type regex_active: bool
@@ -30,49 +49,375 @@ def get_files(
     :type ext: str
     :param prefix: prefix attached to processed files
     :type prefix: str
+    :param recursive: whether to search subdirectories
+    :type recursive: bool
+    :param archives: whether to search inside .zip and .gz archives
+    :type archives: bool
     :return: list of matching files
     :rtype: list
     """
 
     files: list[str] = list()
-    missing_dir = False
-    fpath = ""
     if file_pattern != "":
-        try:
-            fpath = find_directory(try_path)
-        except FileNotFoundError:
-            missing_dir = True
-            fpath = find_directory("")
-        fpath = path.abspath(fpath)
-        try:
-            directory_list = os.listdir(fpath)
-        except FileNotFoundError:
-            directory_list = os.listdir(".")
+        directories, missing_dir = resolve_source_paths(try_path)
+        file_paths, _ = scan_directories(directories, recursive)
+        if archives is True:
+            file_paths = expand_archives(file_paths)
         if regex_active is True:
-            files = [
-                path.join(fpath, f)
-                for f in directory_list
-                if f.endswith(ext)
-                if re.match(file_pattern + r".*\.", f)
-                if prefix not in f
-            ]
-        else:
-            files = [
-                path.join(fpath, f)
-                for f in directory_list
-                if f.endswith(ext)
-                if f.startswith(file_pattern)
-                if prefix not in f
-            ]
+            pattern = re.compile(file_pattern + r".*\.")
+        for file_path in file_paths:
+            f = path.basename(file_path)
+            if not f.endswith(ext) or prefix in f:
+                continue
+            if regex_active is True:
+                if pattern.match(f):
+                    files.append(file_path)
+            elif f.startswith(file_pattern):
+                files.append(file_path)
         if not files and missing_dir:
             logging.error(
                 f"\nFormat: {name}\n\n "
                 "Error: Can't find download path: "
-                f"{try_path}\nTrying default path instead:\t {fpath}"
+                f"{try_path}\nTrying default path instead:\t "
+                f"{', '.join(directories)}"
             )
     return files
 
 
+class PrefixTrie:
+    """
+    Character trie mapping filename prefixes to the values registered
+    under them, so every matching prefix is found in a single walk.
+    """
+
+    # key used to store values on a node; never clashes with a character
+    _VALUES = ""
+
+    def __init__(self) -> None:
+        self.root: dict[str, Any] = dict()
+
+    def insert(self, prefix: str, value: Any) -> None:
+        """
+        Register a value under a given prefix.
+
+        :param prefix: prefix to register
+        :type prefix: str
+        :param value: value to return for strings starting with the prefix
+        :type value: Any
+        """
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, dict())
+        node.setdefault(self._VALUES, []).append(value)
+
+    def match(self, text: str) -> list[Any]:
+        """
+        Returns every value registered under a prefix of the given text.
+
+        :param text: string to check against the registered prefixes
+        :type text: str
+        :return: list of matching values, shortest prefix first
+        :rtype: list
+        """
+        matches: list[Any] = list()
+        node = self.root
+        matches += node.get(self._VALUES, [])
+        for char in text:
+            try:
+                node = node[char]
+            except KeyError:
+                break
+            matches += node.get(self._VALUES, [])
+        return matches
+
+
+def build_file_index(
+    config_list: list[dict[str, Any]],
+    format_index: Optional[FormatIndex] = None,
+) -> dict[str, list[str]]:
+    """
+    Scans each distinct source path once and matches every filename
+    against all bank configurations in a single pass.
+    Non-regex patterns are matched with a prefix trie; regex patterns are
+    pre-filtered with one combined regex before checking each pattern.
+    Files matching no filename rule are identified by their content
+    if a format index is provided.
+
+    :param config_list: list of bank configuration dictionaries
+    :type config_list: list[dict[str, Any]]
+    :param format_index: index of bank formats by file content
+    :type format_index: FormatIndex, optional
+    :return: dictionary mapping bank names to lists of matching files
+    :rtype: dict[str, list[str]]
+    """
+    file_index: dict[str, list[str]] = dict()
+    path_groups: dict[tuple[str, bool, bool], list[dict[str, Any]]] = dict()
+    for config in config_list:
+        file_index[config["bank_name"]] = list()
+        if config["input_filename"] != "":
+            key = (config["path"], config["recursive"], config["archives"])
+            path_groups.setdefault(key, []).append(config)
+
+    for (try_path, recursive, archives), configs in path_groups.items():
+        directories, missing_dir = resolve_source_paths(try_path)
+        file_paths, _ = scan_directories(directories, recursive)
+        if archives is True:
+            file_paths = expand_archives(file_paths)
+
+        matcher = FilenameMatcher(configs)
+        content_configs = {
+            config["bank_name"]: config
+            for config in configs
+            if format_index and config["bank_name"] in format_index.configs
+        }
+        for file_path in file_paths:
+            matches = matcher.match(path.basename(file_path))
+            if not matches and content_configs:
+                matches = match_file_content(
+                    file_path, content_configs, format_index
+                )
+            for config in matches:
+                file_index[config["bank_name"]].append(file_path)
+
+        if missing_dir:
+            for config in configs:
+                if not file_index[config["bank_name"]]:
+                    logging.error(
+                        f"\nFormat: {config['bank_name']}\n\n "
+                        "Error: Can't find download path: "
+                        f"{try_path}\nTrying default path instead:\t "
+                        f"{', '.join(directories)}"
+                    )
+    return file_index
+
+
+def expand_archives(file_paths: list[str]) -> list[str]:
+    """
+    Adds the members of any archives to a list of files.
+
+    :param file_paths: list of file paths
+    :type file_paths: list[str]
+    :return: list of file paths and archive member paths
+    :rtype: list[str]
+    """
+    expanded: list[str] = list()
+    for file_path in file_paths:
+        expanded.append(file_path)
+        if file_path.lower().endswith(ARCHIVE_EXTENSIONS):
+            expanded += list_archive_members(file_path)
+    return expanded
+
+
+def match_file_content(
+    file_path: str,
+    configs: dict[str, dict[str, Any]],
+    format_index: FormatIndex,
+) -> list[dict[str, Any]]:
+    """
+    Returns the bank configurations a file belongs to based on its content.
+
+    :param file_path: path to file
+    :type file_path: str
+    :param configs: bank configurations to consider, keyed by bank name
+    :type configs: dict[str, dict[str, Any]]
+    :param format_index: index of bank formats by file content
+    :type format_index: FormatIndex
+    :return: list of matching bank configurations
+    :rtype: list[dict[str, Any]]
+    """
+    filename = path.basename(file_path)
+    # avoid reading files that no configuration could accept
+    if not any(
+        filename.endswith(config["ext"])
+        and config["fixed_prefix"] not in filename
+        for config in configs.values()
+    ):
+        return []
+    if not source_exists(file_path):
+        return []
+    head = read_file_head(file_path, SAMPLE_BYTES + 1)
+    return [
+        configs[bank_name]
+        for bank_name in format_index.identify(file_path, data=head)
+        if bank_name in configs
+        and filename.endswith(configs[bank_name]["ext"])
+        and configs[bank_name]["fixed_prefix"] not in filename
+    ]
+
+
+def resolve_source_paths(try_path: str) -> tuple[list[str], bool]:
+    """
+    Returns the absolute directories to search for a configured source
+    path, falling back to the default download directory if none exist.
+    Multiple paths can be separated with "|" and may contain wildcards,
+    "~" and environment variables. Wildcards are only expanded in paths
+    which aren't existing folders.
+
+    :param try_path: source path(s) from the configuration
+    :type try_path: str
+    :return: directories to search and whether the fallback was used
+    :rtype: tuple[list[str], bool]
+    """
+    directories: list[str] = list()
+    missing_paths: list[str] = list()
+    for source_path in try_path.split("|"):
+        source_path = path.expandvars(path.expanduser(source_path.strip()))
+        if source_path == "":
+            continue
+        if path.isdir(source_path):
+            directories.append(source_path)
+        elif any(char in source_path for char in "*?["):
+            matches = [
+                match
+                for match in sorted(glob.glob(source_path, recursive=True))
+                if path.isdir(match)
+            ]
+            if not matches:
+                missing_paths.append(source_path)
+            directories += matches
+        else:
+            missing_paths.append(source_path)
+    missing_dir = False
+    if not directories:
+        missing_dir = bool(missing_paths)
+        default_dir = find_directory("")
+        directories = [default_dir if path.isdir(default_dir) else "."]
+    elif missing_paths:
+        logging.warning(
+            f"Can't find download path(s): {', '.join(missing_paths)}"
+        )
+    # remove duplicates while keeping the configured order
+    directories = list(dict.fromkeys(path.abspath(d) for d in directories))
+    return directories, missing_dir
+
+
+def scan_directories(
+    directories: list[str],
+    recursive: bool = False,
+    max_workers: int = SCAN_WORKERS,
+) -> tuple[list[str], list[str]]:
+    """
+    Lists the files in a set of directories, and optionally all of their
+    subdirectories, scanning several directories at once so that slow
+    (e.g. network) file systems are enumerated quickly.
+
+    :param directories: directories to scan
+    :type directories: list[str]
+    :param recursive: whether to scan subdirectories
+    :type recursive: bool
+    :param max_workers: maximum number of directories scanned at once
+    :type max_workers: int
+    :return: sorted lists of the files found and directories scanned
+    :rtype: tuple[list[str], list[str]]
+    """
+    file_paths: list[str] = list()
+    scanned: list[str] = list()
+    visited: set[str] = set()
+
+    def submit(
+        executor: ThreadPoolExecutor, directory: str
+    ) -> Optional[Future]:
+        real_dir = path.realpath(directory)
+        # avoid scanning a directory twice (overlapping roots or links)
+        if real_dir in visited:
+            return None
+        visited.add(real_dir)
+        scanned.append(directory)
+        return executor.submit(scan_directory, directory)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {submit(executor, directory) for directory in directories}
+        pending.discard(None)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                file_paths += files
+                if recursive:
+                    for subdirectory in subdirectories:
+                        pending.add(submit(executor, subdirectory))
+                    pending.discard(None)
+    return sorted(file_paths), sorted(scanned)
+
+
+def scan_directory(directory: str) -> tuple[list[str], list[str]]:
+    """
+    Lists the files and subdirectories of a directory.
+    File types come from the directory listing itself, so no further
+    system calls are needed per entry on most platforms.
+
+    :param directory: directory to scan
+    :type directory: str
+    :return: lists of file and subdirectory paths
+    :rtype: tuple[list[str], list[str]]
+    """
+    files: list[str] = list()
+    subdirectories: list[str] = list()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        files.append(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                except OSError:
+                    continue
+    except OSError as e:
+        logging.warning(f"Unable to read directory {directory}: {e}")
+    return files, subdirectories
+
+
+class FilenameMatcher:
+    """
+    Matches filenames against the filename rules of a list of bank
+    configurations in one pass.
+    """
+
+    def __init__(self, config_list: list[dict[str, Any]]) -> None:
+        self.trie = PrefixTrie()
+        self.regex_configs: list[tuple[re.Pattern, dict[str, Any]]] = list()
+        for config in config_list:
+            if config["input_filename"] == "":
+                continue
+            if config["regex"] is True:
+                pattern = re.compile(config["input_filename"] + r".*\.")
+                self.regex_configs.append((pattern, config))
+            else:
+                self.trie.insert(config["input_filename"], config)
+        self.combined_regex = None
+        if self.regex_configs:
+            self.combined_regex = re.compile(
+                "|".join(
+                    f"(?:{pattern.pattern})"
+                    for pattern, _ in self.regex_configs
+                )
+            )
+
+    def match(self, filename: str) -> list[dict[str, Any]]:
+        """
+        Returns the bank configurations whose filename rules match a filename.
+
+        :param filename: name of the file to check (without directory)
+        :type filename: str
+        :return: list of matching bank configurations
+        :rtype: list[dict[str, Any]]
+        """
+        candidates = self.trie.match(filename)
+        if self.combined_regex and self.combined_regex.match(filename):
+            candidates += [
+                config
+                for pattern, config in self.regex_configs
+                if pattern.match(filename)
+            ]
+        return [
+            config
+            for config in candidates
+            if filename.endswith(config["ext"])
+            if config["fixed_prefix"] not in filename
+        ]
+
+
 def find_directory(filepath: str) -> str:
     """
     Finds the downloads directory for active user if filepath is not set.
@@ -107,126 +452,332 @@ def find_directory(filepath: str) -> str:
     return input_dir
 
 
-# TODO add check of config to see if we have encoding specified
-def detect_encoding(filepath: str) -> str:
+def read_file_bytes(filepath: str) -> bytes:
+    """
+    Reads the entire contents of a file (or archive member) into memory
+    in a single read.
+
+    :param filepath: path to file
+    :type filepath: str
+    :return: contents of the file
+    :rtype: bytes
+    """
+    with open_source(filepath) as f:
+        return f.read()
+
+
+def read_file_head(filepath: str, size: int) -> bytes:
+    """
+    Reads the start of a file (or archive member).
+
+    :param filepath: path to file
+    :type filepath: str
+    :param size: maximum number of bytes to read
+    :type size: int
+    :return: first bytes of the file
+    :rtype: bytes
+    """
+    with open_source(filepath) as f:
+        return f.read(size)
+
+
+def get_file_identity(filepath: str) -> list[int]:
+    """
+    Returns values identifying the current version of a file on disk,
+    which change whenever the file is replaced or modified.
+
+    :param filepath: path to file
+    :type filepath: str
+    :return: list of file size, modification time (ns) and inode
+    :rtype: list[int]
+    """
+    # archive members change whenever their archive does
+    archive_path = split_archive_path(filepath)
+    if archive_path is not None:
+        filepath = archive_path[0]
+    stat = os.stat(filepath)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def list_archive_members(archive_path: str) -> list[str]:
+    """
+    Returns the paths of the files contained in a .zip or .gz archive,
+    as paths below the archive itself (e.g. "statements.zip/2021/jan.csv").
+
+    :param archive_path: path to archive
+    :type archive_path: str
+    :return: list of member paths
+    :rtype: list[str]
+    """
+    if archive_path.lower().endswith(".gz"):
+        # gzip files hold a single member named after the archive
+        return [path.join(archive_path, path.basename(archive_path)[:-3])]
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            return [
+                path.join(archive_path, *info.filename.split("/"))
+                for info in archive.infolist()
+                if not info.is_dir()
+            ]
+    except (OSError, zipfile.BadZipFile) as e:
+        logging.warning(f"Unable to read archive {archive_path}: {e}")
+        return []
+
+
+def split_archive_path(filepath: str) -> Optional[tuple[str, str]]:
+    """
+    Splits the path of an archive member into the path of the archive
+    and the name of the member within it.
+
+    :param filepath: path to file
+    :type filepath: str
+    :return: archive path and member name, or None if not an archive member
+    :rtype: tuple[str, str], optional
+    """
+    if path.isfile(filepath):
+        return None
+    archive_path = filepath
+    while True:
+        parent = path.dirname(archive_path)
+        if parent == archive_path or parent == "":
+            return None
+        archive_path = parent
+        if archive_path.lower().endswith(ARCHIVE_EXTENSIONS) and path.isfile(
+            archive_path
+        ):
+            member = filepath[len(archive_path) :].lstrip(os.sep + "/")
+            return archive_path, member.replace(os.sep, "/")
+
+
+def open_source(filepath: str) -> IO[bytes]:
+    """
+    Opens a file or archive member for reading in binary mode.
+    Archive members are decompressed as they are read, without being
+    extracted to disk.
+
+    :param filepath: path to file or archive member
+    :type filepath: str
+    :return: binary file object
+    :rtype: IO[bytes]
+    """
+    archive_path = split_archive_path(filepath)
+    if archive_path is None:
+        return open(filepath, "rb")
+    archive_file, member = archive_path
+    if archive_file.lower().endswith(".gz"):
+        return gzip.open(archive_file, "rb")
+    # the member stays readable after its archive is closed
+    with zipfile.ZipFile(archive_file) as archive:
+        return archive.open(member)
+
+
+def source_exists(filepath: str) -> bool:
+    """
+    Check whether a file or archive member exists.
+
+    :param filepath: path to file or archive member
+    :type filepath: str
+    :return: whether the file exists
+    :rtype: bool
+    """
+    return path.isfile(filepath) or split_archive_path(filepath) is not None
+
+
+# size of each block of data fed to the encoding detector
+DETECTION_CHUNK_SIZE = 64 * 1024
+# amount of data after which we accept the encoding detector's best guess
+DETECTION_MAX_BYTES = 1024 * 1024
+# minimum confidence needed to accept the encoding detector's guess
+DETECTION_CONFIDENCE = 0.6
+
+# byte order marks and the encodings they identify
+# (UTF-32 must be checked before UTF-16 as their little-endian BOMs overlap)
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, "utf_32"),
+    (codecs.BOM_UTF32_BE, "utf_32"),
+    (codecs.BOM_UTF8, "utf_8_sig"),
+    (codecs.BOM_UTF16_LE, "utf_16"),
+    (codecs.BOM_UTF16_BE, "utf_16"),
+]
+
+# because some encodings will happily encode anything even if wrong,
+# keeping the most common near the top should make it more likely that
+# we're doing the right thing.
+FALLBACK_ENCODINGS = [
+    "ascii",
+    "utf-8",
+    "utf-16",
+    "cp1251",
+    "utf_32",
+    "utf_32_be",
+    "utf_32_le",
+    "utf_16_be",
+    "utf_16_le",
+    "utf_7",
+    "utf_8_sig",
+    "cp850",
+    "cp852",
+    "latin_1",
+    "big5",
+    "big5hkscs",
+    "cp037",
+    "cp424",
+    "cp437",
+    "cp500",
+    "cp720",
+    "cp737",
+    "cp775",
+    "cp855",
+    "cp856",
+    "cp857",
+    "cp858",
+    "cp860",
+    "cp861",
+    "cp862",
+    "cp863",
+    "cp864",
+    "cp865",
+    "cp866",
+    "cp869",
+    "cp874",
+    "cp875",
+    "cp932",
+    "cp949",
+    "cp950",
+    "cp1006",
+    "cp1026",
+    "cp1140",
+    "cp1250",
+    "cp1252",
+    "cp1253",
+    "cp1254",
+    "cp1255",
+    "cp1256",
+    "cp1257",
+    "cp1258",
+    "euc_jp",
+    "euc_jis_2004",
+    "euc_jisx0213",
+    "euc_kr",
+    "gb2312",
+    "gbk",
+    "gb18030",
+    "hz",
+    "iso2022_jp",
+    "iso2022_jp_1",
+    "iso2022_jp_2",
+    "iso2022_jp_2004",
+    "iso2022_jp_3",
+    "iso2022_jp_ext",
+    "iso2022_kr",
+    "iso8859_2",
+    "iso8859_3",
+    "iso8859_4",
+    "iso8859_5",
+    "iso8859_6",
+    "iso8859_7",
+    "iso8859_8",
+    "iso8859_9",
+    "iso8859_10",
+    "iso8859_11",
+    "iso8859_13",
+    "iso8859_14",
+    "iso8859_15",
+    "iso8859_16",
+    "johab",
+    "koi8_r",
+    "koi8_u",
+    "mac_cyrillic",
+    "mac_greek",
+    "mac_iceland",
+    "mac_latin2",
+    "mac_roman",
+    "mac_turkish",
+    "ptcp154",
+    "shift_jis",
+    "shift_jis_2004",
+    "shift_jisx0213",
+]
+
+
+def detect_encoding(
+    filepath: str, encoding: str = "", data: Optional[bytes] = None
+) -> str:
     """
     Utility to detect file encoding. This is imperfect, but
     should work for the most common cases.
+    Checks for a configured encoding, then a byte order mark, then feeds
+    the file to chardet in chunks until it is confident enough.
+    If that fails, each fallback encoding is tried against the file data.
+
     :param filepath: string path to a given file
+    :type filepath: str
+    :param encoding: encoding specified in the configuration, if any
+    :type encoding: str
+    :param data: contents of the file if already read into memory
+    :type data: bytes, optional
     :return: encoding alias that can be used with open()
+    :rtype: str
     """
-    # First try to guess the encoding with chardet. Take it if the
-    # confidence is >60% (randomly chosen)
-    with open(filepath, "rb") as f:
-        file_content = f.read()
-        rslt = chardet.detect(file_content)
-        conf, enc = rslt["confidence"], rslt["encoding"]
-        if conf > 0.6:
+    if encoding != "":
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            logging.warning(
+                f"\tUnknown encoding {encoding} in configuration,"
+                " detecting encoding instead."
+            )
+        else:
+            logging.info(
+                f"\tOpening file using configured encoding {encoding}"
+            )
+            return encoding
+
+    # BytesIO shares the buffer of the bytes object rather than copying it
+    source = io.BytesIO(data) if data is not None else open_source(filepath)
+    with source as f:
+        # a byte order mark tells us the encoding with certainty
+        file_start = f.read(4)
+        for bom, bom_encoding in BYTE_ORDER_MARKS:
+            if file_start.startswith(bom):
+                logging.info(
+                    f"\tOpening file using encoding {bom_encoding} (BOM)"
+                )
+                return bom_encoding
+        f.seek(0)
+
+        # Next try to guess the encoding with chardet. Take it if the
+        # confidence is >60% (randomly chosen)
+        detector = UniversalDetector()
+        bytes_fed = 0
+        non_ascii_seen = False
+        for chunk in iter(lambda: f.read(DETECTION_CHUNK_SIZE), b""):
+            is_ascii = chunk.isascii()
+            if bytes_fed >= DETECTION_MAX_BYTES:
+                if non_ascii_seen:
+                    break
+                # until now everything looked like plain ASCII, so only the
+                # first non-ASCII data can change the detector's mind
+                if is_ascii:
+                    continue
+            detector.feed(chunk)
+            bytes_fed += len(chunk)
+            non_ascii_seen = non_ascii_seen or not is_ascii
+            if detector.done:
+                break
+        detector.close()
+        conf = detector.result["confidence"]
+        enc = detector.result["encoding"]
+        if enc and conf > DETECTION_CONFIDENCE:
             logging.info(
                 f"\tOpening file using encoding {enc} (confidence {conf})"
             )
             return enc
 
-    # because some encodings will happily encode anything even if wrong,
-    # keeping the most common near the top should make it more likely that
-    # we're doing the right thing.
-    encodings = [
-        "ascii",
-        "utf-8",
-        "utf-16",
-        "cp1251",
-        "utf_32",
-        "utf_32_be",
-        "utf_32_le",
-        "utf_16",
-        "utf_16_be",
-        "utf_16_le",
-        "utf_7",
-        "utf_8_sig",
-        "cp850",
-        "cp852",
-        "latin_1",
-        "big5",
-        "big5hkscs",
-        "cp037",
-        "cp424",
-        "cp437",
-        "cp500",
-        "cp720",
-        "cp737",
-        "cp775",
-        "cp855",
-        "cp856",
-        "cp857",
-        "cp858",
-        "cp860",
-        "cp861",
-        "cp862",
-        "cp863",
-        "cp864",
-        "cp865",
-        "cp866",
-        "cp869",
-        "cp874",
-        "cp875",
-        "cp932",
-        "cp949",
-        "cp950",
-        "cp1006",
-        "cp1026",
-        "cp1140",
-        "cp1250",
-        "cp1252",
-        "cp1253",
-        "cp1254",
-        "cp1255",
-        "cp1256",
-        "cp1257",
-        "cp1258",
-        "euc_jp",
-        "euc_jis_2004",
-        "euc_jisx0213",
-        "euc_kr",
-        "gb2312",
-        "gbk",
-        "gb18030",
-        "hz",
-        "iso2022_jp",
-        "iso2022_jp_1",
-        "iso2022_jp_2",
-        "iso2022_jp_2004",
-        "iso2022_jp_3",
-        "iso2022_jp_ext",
-        "iso2022_kr",
-        "latin_1",
-        "iso8859_2",
-        "iso8859_3",
-        "iso8859_4",
-        "iso8859_5",
-        "iso8859_6",
-        "iso8859_7",
-        "iso8859_8",
-        "iso8859_9",
-        "iso8859_10",
-        "iso8859_11",
-        "iso8859_13",
-        "iso8859_14",
-        "iso8859_15",
-        "iso8859_16",
-        "johab",
-        "koi8_r",
-        "koi8_u",
-        "mac_cyrillic",
-        "mac_greek",
-        "mac_iceland",
-        "mac_latin2",
-        "mac_roman",
-        "mac_turkish",
-        "ptcp154",
-        "shift_jis",
-        "shift_jis_2004",
-        "shift_jisx0213",
-    ]
+        # read the whole file once to test the fallback encodings against
+        f.seek(0)
+        file_content = f.read()
+
     result = ""
     error = (
         ValueError,
@@ -234,13 +785,11 @@ def detect_encoding(filepath: str) -> str:
         UnicodeDecodeError,
         UnicodeEncodeError,
     )
-    for enc in encodings:
+    for enc in FALLBACK_ENCODINGS:
         try:
             logging.info(f"\tAttempting to open file using {enc} encoding...")
-            with codecs.open(filepath, "r", encoding=enc) as f:
-                for line in f:
-                    line.encode("utf-8")
-                return enc
+            file_content.decode(enc).encode("utf-8")
+            return enc
         except error:
             continue
 
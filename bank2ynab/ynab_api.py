@@ -1,7 +1,10 @@
+import io
 import logging
 from configparser import DuplicateSectionError, NoSectionError
 
 import api_interface
+import dataframe_handler
+import pandas as pd
 import user_input
 from api_interface import APIInterface
 from config_handler import ConfigHandler
@@ -33,7 +36,15 @@ class YNAB_API:
         # TODO: Fix debug structure, so it will be used in logging instead
         self.debug = False
 
-    def run(self, transaction_data: dict[str, list]):
+    def run(self, transaction_data: dict[str, pd.DataFrame]) -> set[str]:
+        """
+        Upload each bank's transactions to its YNAB account.
+
+        :param transaction_data: dictionary of bank names to transactions
+        :type transaction_data: dict[str, pd.DataFrame]
+        :return: names of the banks whose transactions were uploaded
+        :rtype: set[str]
+        """
         logging.debug(f"Transaction data: {transaction_data}")
 
         # get previously-saved budget/account mapping
@@ -50,22 +61,31 @@ class YNAB_API:
         # save account mappings
         self.save_account_mappings(bank_account_mapping)
         # map transactions to budget and account IDs
-        budget_transactions = apply_mapping(
+        budget_transactions = build_budget_payloads(
             transaction_data, bank_account_mapping
         )
 
+        uploaded_budgets = set()
         for budget_id in budget_info:
             try:
-                api_interface.post_transactions(
+                if api_interface.post_transactions(
                     api_token=self.api_token,
                     budget_id=budget_id,
                     data=budget_transactions[budget_id],
-                )
+                ):
+                    uploaded_budgets.add(budget_id)
             except KeyError:
                 logging.info(
                     "No transactions to upload for"
                     f" {budget_info[budget_id]['name']}."
                 )
+        # banks without transactions have nothing left to upload
+        return {
+            bank
+            for bank, transaction_df in transaction_data.items()
+            if transaction_df.empty
+            or bank_account_mapping[bank]["budget_id"] in uploaded_budgets
+        }
 
     def get_saved_accounts(self, t_data: dict) -> dict[str, dict[str, str]]:
         bank_account_mapping = dict()
@@ -188,40 +208,46 @@ def generate_name_id_list(input_dict: dict):
     return output_list
 
 
-def apply_mapping(
-    transaction_data: dict[str, list], mapping: dict[str, dict[str, str]]
-) -> dict[str, dict[str, list]]:
+def build_budget_payloads(
+    transaction_data: dict[str, pd.DataFrame],
+    mapping: dict[str, dict[str, str]],
+) -> dict[str, bytes]:
     """
-    Create a dictionary of budget_ids mapped to a dictionary of transactions.
-    Add an account_id to each transaction.
+    Create a dictionary of budget_ids mapped to the JSON data uploading
+    their transactions. Add an account_id to each transaction.
+    The JSON is written directly from the transactions' columns.
 
     :param transaction_data: dictionary of bank names to transaction data
-    :type transaction_data: dict[str, list]
+    :type transaction_data: dict[str, pd.DataFrame]
     :param mapping: dictionary mapping bank names to budget ID and account ID
     :type mapping: dict[str, dict[str, str]]
-    :return: dictionary of budget_id mapped to a dictionary of transactions
-    :rtype: dict[str, dict]
+    :return: dictionary of budget_id mapped to JSON transaction data
+    :rtype: dict[str, bytes]
     """
     logging.info("Adding budget and account IDs to transactions...")
-    budget_transaction_dict: dict[str, dict[str, list]] = dict()
+    budget_payloads: dict[str, io.BytesIO] = dict()
 
     # get transactions for each bank
-    for bank in transaction_data.keys():
-        account_transactions = transaction_data[bank]
+    for bank, transaction_df in transaction_data.items():
+        if transaction_df.empty:
+            continue
         budget_id = mapping[bank]["budget_id"]
         account_id = mapping[bank]["account_id"]
-
-        # insert account_id into each transaction
-        for transaction in account_transactions:
-            transaction["account_id"] = account_id
-        # add transaction list into entry for relevant budget
-        if budget_id in budget_transaction_dict:
-            budget_transaction_dict[budget_id][
-                "transactions"
-            ] += account_transactions
+        # add transactions into entry for relevant budget
+        if budget_id in budget_payloads:
+            payload = budget_payloads[budget_id]
+            payload.write(b",")
         else:
-            budget_transaction_dict.setdefault(
-                budget_id, {"transactions": account_transactions}
-            )
+            payload = budget_payloads.setdefault(budget_id, io.BytesIO())
+            payload.write(b'{"transactions":[')
+        # insert account_id into each transaction
+        dataframe_handler.write_transactions_json(
+            transaction_df, payload, constants={"account_id": account_id}
+        )
 
-    return budget_transaction_dict
+    for payload in budget_payloads.values():
+        payload.write(b"]}")
+    return {
+        budget_id: payload.getvalue()
+        for budget_id, payload in budget_payloads.items()
+    }
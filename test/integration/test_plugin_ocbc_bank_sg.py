@@ -0,0 +1,44 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from plugins.OCBC_Bank_SG import OCBC_Bank_SG
+
+
+class TestOCBCBankSG(TestCase):
+    def setUp(self) -> None:
+        self.config = {
+            "bank_name": "OCBC Bank",
+            "header_rows": 1,
+            "footer_rows": 0,
+        }
+        self.input_data = (
+            b"Date,Description,Withdrawals,Deposits\r\n"
+            b"01/02/2021,MCDONALD'S,5.00,\r\n"
+            b",Card 1234,,\r\n"
+            b"02/02/2021,Salary,,100.00\r\n"
+        )
+        self.expected_output = (
+            b"Date,Description,Withdrawals,Deposits\r\n"
+            b"01/02/2021,MCDONALDS,5.00,,Card 1234,,\r\n"
+            b"02/02/2021,Salary,,100.00\r\n"
+        )
+        return super().setUp()
+
+    def test_preprocess_data(self):
+        """Test that continuation rows are joined onto the previous row."""
+        bank = OCBC_Bank_SG(self.config)
+        self.assertEqual(
+            self.expected_output, bank._preprocess_data(self.input_data, [])
+        )
+
+    def test_preprocess_file(self):
+        """Test that the source file is overwritten with the joined rows."""
+        bank = OCBC_Bank_SG(self.config)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "ocbc.csv")
+            with open(file_path, "wb") as f:
+                f.write(self.input_data)
+            self.assertEqual(file_path, bank._preprocess_file(file_path, []))
+            with open(file_path, "rb") as f:
+                self.assertEqual(self.expected_output, f.read())
@@ -2,6 +2,9 @@ import unittest
 from unittest import TestCase
 from unittest.mock import patch
 
+from bank2ynab import api_interface
+from bank2ynab.api_interface import post_transactions
+
 
 class TestAPIInterface(TestCase):
     def setUp(self) -> None:
@@ -36,9 +39,18 @@ class TestAPIInterface(TestCase):
     def test_get_budget_accounts(self):
         raise NotImplementedError
 
-    @unittest.skip("Not tested yet.")
-    def test_post_transactions(self):
-        raise NotImplementedError
+    @patch("bank2ynab.api_interface.access_api")
+    def test_post_transactions(self, mock_access_api):
+        """Test that failed uploads are reported to the caller."""
+        mock_access_api.return_value = {
+            "transaction_ids": ["1", "2"],
+            "duplicate_import_ids": [],
+        }
+        self.assertTrue(post_transactions("token", "budget", b"{}"))
+        mock_access_api.side_effect = api_interface.YNABError(
+            "400", "invalid data"
+        )
+        self.assertFalse(post_transactions("token", "budget", b"{}"))
 
     def fix_id_based_dicts(self):
         raise NotImplementedError
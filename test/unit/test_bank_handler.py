@@ -1,7 +1,10 @@
+import os
+import tempfile
 import unittest
 from unittest import TestCase
 
-# from bank2ynab.bank_handler import BankHandler
+from bank2ynab.bank_handler import BankHandler
+from bank2ynab.import_ledger import IMPORTED, ImportLedger
 
 
 class TestBankHandler(TestCase):
@@ -23,6 +26,18 @@ class TestBankHandler(TestCase):
     def test_get_output_path(self):
         raise NotImplementedError
 
+    def test_record_imports(self):
+        """Test that imported files are only recorded once uploaded."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ledger = ImportLedger(os.path.join(temp_dir, "ledger.sqlite3"))
+            bank = BankHandler({"bank_name": "Bank"})
+            bank.pending_imports = [("hash", "Bank", "config", IMPORTED, 2)]
+            self.assertIsNone(ledger.lookup("hash", "Bank", "config"))
+            bank.record_imports(ledger)
+            self.assertEqual(IMPORTED, ledger.lookup("hash", "Bank", "config"))
+            self.assertListEqual([], bank.pending_imports)
+            ledger.close()
+
     '''def test_init_and_name(self):
         """Check parameters are correctly stored in the object."""
         self.b = BankHandler(self.defaults)
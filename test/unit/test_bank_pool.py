@@ -0,0 +1,107 @@
+import logging
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from bank2ynab.bank_handler import BankHandler
+from bank2ynab.bank_pool import group_banks, run_bank_groups
+from bank2ynab.detection_cache import DetectionCache
+from bank2ynab.import_ledger import IMPORTED, ImportLedger
+
+
+class FakeBank(BankHandler):
+    """Bank recording the files it's run on instead of parsing them."""
+
+    def run(self, matching_files=None, detection_cache=None, ledger=None):
+        logging.info(f"Running {self.name}")
+        self.files_processed = len(matching_files)
+        self.transaction_df = pd.DataFrame({"file": matching_files})
+        for file_path in matching_files:
+            detection_cache.store(file_path, bank=self.name)
+            if ledger is not None:
+                ledger.record(
+                    ledger.get_hash(file_path), self.name, "", IMPORTED
+                )
+
+
+class TestBankPool(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.files = list()
+        for count in range(4):
+            file_path = os.path.join(self.temp_dir.name, f"{count}.csv")
+            with open(file_path, "w") as f:
+                f.write(f"file {count}\n")
+            self.files.append(file_path)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_group_banks(self):
+        """Test that banks with files in common are grouped in order."""
+        test_data = [
+            ({"A": [0], "B": [1], "C": [0, 2], "D": [2], "E": []}, "ACD|B|E"),
+            # a later bank joins two earlier groups
+            ({"A": [0], "B": [1], "C": [2], "D": [1, 0]}, "ABD|C"),
+            ({"A": [0], "B": [1], "C": [2]}, "A|B|C"),
+        ]
+        for bank_files, expected_groups in test_data:
+            with self.subTest(bank_files=bank_files):
+                banks = [
+                    BankHandler({"bank_name": name}) for name in bank_files
+                ]
+                file_index = {
+                    name: [self.files[index] for index in indexes]
+                    for name, indexes in bank_files.items()
+                }
+                groups = group_banks(banks, file_index)
+                self.assertEqual(
+                    expected_groups,
+                    "|".join(
+                        "".join(bank.name for bank in group)
+                        for group in groups
+                    ),
+                )
+
+    def test_run_bank_groups(self):
+        """Test that results from worker processes are merged in order."""
+        banks = [FakeBank({"bank_name": name}) for name in "ABC"]
+        file_index = {
+            "A": self.files[:2],
+            "B": self.files[1:3],
+            "C": self.files[3:],
+        }
+        cache = DetectionCache(os.path.join(self.temp_dir.name, "c.json"), 10)
+        ledger_path = os.path.join(self.temp_dir.name, "ledger.sqlite3")
+        ledger = ImportLedger(ledger_path)
+        with self.assertLogs(level="INFO") as logs:
+            run_bank_groups(
+                group_banks(banks, file_index), file_index, cache, ledger, 2
+            )
+        self.assertCountEqual(
+            [f"INFO:root:Running {name}" for name in "ABC"], logs.output
+        )
+        for bank in banks:
+            self.assertEqual(len(file_index[bank.name]), bank.files_processed)
+            self.assertListEqual(
+                file_index[bank.name], list(bank.transaction_df["file"])
+            )
+        # files are left with the last bank to run on them
+        self.assertListEqual(
+            ["A", "B", "B", "C"],
+            [cache.get(file_path)["bank"] for file_path in self.files],
+        )
+        self.assertTrue(cache.modified)
+        ledger.close()
+        ledger = ImportLedger(ledger_path)
+        for bank in banks:
+            for file_path in file_index[bank.name]:
+                self.assertEqual(
+                    IMPORTED,
+                    ledger.lookup(ledger.get_hash(file_path), bank.name, ""),
+                )
+        ledger.close()
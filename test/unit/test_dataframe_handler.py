@@ -1,26 +1,190 @@
+import io
+import itertools
+import json
+import os
+import tempfile
+import tracemalloc
 import unittest
 from unittest import TestCase
+from unittest.mock import patch
 
 import pandas as pd
 import pandas.testing
 from pandas._libs.missing import NA
 
+from bank2ynab import dataframe_handler
 from bank2ynab.dataframe_handler import (
+    ColumnCountError,
+    DataframeHandler,
     add_missing_columns,
     auto_memo,
     auto_payee,
     cd_flag_process,
-    clean_monetary_values,
-    clean_strings,
     combine_dfs,
-    fill_api_columns,
+    drop_seen_transactions,
+    expand_api_constants,
     fill_empty_dates,
-    fix_amount,
-    fix_date,
+    find_footer_start,
+    log_memory_use,
     merge_duplicate_columns,
+    read_csv,
+    read_csv_chunks,
     remove_invalid_rows,
+    select_api_columns,
+    write_transactions_json,
 )
 
+try:
+    import polars
+
+    from bank2ynab import polars_handler
+except ImportError:  # the polars engine is optional
+    polars = None
+
+try:
+    import pyarrow
+except ImportError:  # Arrow strings are optional
+    pyarrow = None
+
+
+def to_polars(df: pd.DataFrame):
+    """Copy a pandas dataframe into a polars lazy frame."""
+    return polars.DataFrame(
+        {
+            col: [None if pd.isna(v) else v for v in df[col].tolist()]
+            for col in df.columns
+        }
+    ).lazy()
+
+
+class PolarsEngine:
+    """
+    The polars engine's parsing steps, run on pandas series & dataframes
+    as the pandas engine's are.
+    """
+
+    @staticmethod
+    def _run_on_series(function, series: pd.Series, *args) -> pd.Series:
+        result = (
+            to_polars(series.to_frame("values"))
+            .select(function(polars.col("values"), *args))
+            .collect()
+            .to_series()
+        )
+        return pd.Series(
+            result.to_numpy(), index=series.index, name=series.name
+        )
+
+    @staticmethod
+    def _run_on_frame(
+        function, df: pd.DataFrame, *args, milliunit_columns=None
+    ) -> pd.DataFrame:
+        return polars_handler.to_pandas(
+            function(to_polars(df), *args).collect(),
+            milliunit_columns=milliunit_columns,
+        )
+
+    def fix_date(self, date_series, date_format, cache=None):
+        return self._run_on_series(
+            polars_handler.fix_date, date_series, date_format, cache
+        )
+
+    def clean_monetary_values(
+        self, num_series, decimal_sep="", thousands_sep=""
+    ):
+        return self._run_on_series(
+            polars_handler.clean_monetary_values,
+            num_series,
+            decimal_sep,
+            thousands_sep,
+        )
+
+    def clean_strings(self, string_series, cache=None):
+        return self._run_on_series(
+            polars_handler.clean_strings, string_series, cache
+        )
+
+    def fix_amount(self, df, currency_fix):
+        return self._run_on_frame(polars_handler.fix_amount, df, currency_fix)
+
+    def fix_milliunits(
+        self, df, cd_flags, currency_fix, decimal_sep="", thousands_sep=""
+    ):
+        return self._run_on_frame(
+            polars_handler.fix_milliunits,
+            df,
+            cd_flags,
+            currency_fix,
+            decimal_sep,
+            thousands_sep,
+            milliunit_columns=["Inflow", "Outflow"],
+        )
+
+    def fill_api_columns(self, df):
+        return self._run_on_frame(polars_handler.fill_api_columns, df)
+
+
+def to_arrow_strings(data):
+    """Store the text columns of a series or dataframe as Arrow strings."""
+    if isinstance(data, pd.Series):
+        return data.astype("string[pyarrow]")
+    return data.astype(
+        {
+            col: "string[pyarrow]"
+            for col in dataframe_handler.TEXT_COLUMNS
+            if col in data.columns
+        }
+    )
+
+
+def from_arrow_strings(data):
+    """Store any Arrow strings in a series or dataframe as objects."""
+    if isinstance(data, pd.Series):
+        return data.astype(object)
+    return data.astype(
+        {
+            col: object
+            for col in data.columns
+            if dataframe_handler.is_arrow_string(data[col])
+        }
+    )
+
+
+class ArrowStringsEngine:
+    """
+    The pandas engine's parsing steps, run on text stored as Arrow strings.
+    """
+
+    def __getattr__(self, name):
+        return getattr(dataframe_handler, name)
+
+    def fix_date(self, date_series, date_format, cache=None):
+        return from_arrow_strings(
+            dataframe_handler.fix_date(
+                to_arrow_strings(date_series), date_format, cache
+            )
+        )
+
+    def clean_strings(self, string_series, cache=None):
+        return from_arrow_strings(
+            dataframe_handler.clean_strings(
+                to_arrow_strings(string_series), cache
+            )
+        )
+
+    def fill_api_columns(self, df):
+        return from_arrow_strings(
+            dataframe_handler.fill_api_columns(to_arrow_strings(df))
+        )
+
+
+# parsing steps of each engine, to run the same tests against
+ENGINES = {"pandas": dataframe_handler}
+if polars is not None:
+    ENGINES["polars"] = PolarsEngine()
+if pyarrow is not None:
+    ENGINES["pandas (Arrow strings)"] = ArrowStringsEngine()
+
 
 class TestDataframeHandler(TestCase):
     def setUp(self) -> None:
@@ -29,17 +193,451 @@ class TestDataframeHandler(TestCase):
     def tearDown(self) -> None:
         return super().tearDown()
 
-    @unittest.skip("Not tested yet.")
     def test_read_csv(self):
         """Test reading of CSV file into dataframe."""
-        """
-        file_path: str,
-        delim: str,
-        header_rows: int,
-        footer_rows: int,
-        encod: str,
-        """
-        raise NotImplementedError
+        csv_data = (
+            "Header line\n"
+            "Date;Payee;Amount\n"
+            "01.02.2021; Shop A;-3,50\n"
+            "\n"
+            "02.02.2021;Shop B;10,00\n"
+            "Footer line\n"
+        ).encode("utf-8")
+        expected_output = pd.DataFrame(
+            {
+                0: ["01.02.2021", "02.02.2021"],
+                1: ["Shop A", "Shop B"],
+                2: ["-3,50", "10,00"],
+            }
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "test.csv")
+            with open(file_path, "wb") as f:
+                f.write(csv_data)
+            for data in [None, csv_data]:
+                for engine in ["python", "c"]:
+                    with self.subTest(
+                        "Test reading from file and from memory.",
+                        from_memory=data is not None,
+                        engine=engine,
+                    ):
+                        test_df = read_csv(
+                            file_path=file_path,
+                            delim=";",
+                            header_rows=2,
+                            footer_rows=1,
+                            encod="utf-8",
+                            data=data,
+                            engine=engine,
+                        )
+                        pandas.testing.assert_frame_equal(
+                            expected_output, test_df
+                        )
+
+    def test_read_csv_engines(self):
+        """Test that the C parser reads files as the python parser does."""
+        test_data = [
+            # trailing blank lines count as footer rows
+            ("a;b\n1;2.05\nfooter\n\n\n", 2, "utf-8"),
+            ("a;b\r\n1;2\r\n footer;\r\n", 1, "cp1252"),
+            ("a;b\n1;2\nfooter", 1, "utf-8"),
+            ("a;b\n1; 2\nÆble;\nfooter\n", 1, "utf_16"),
+            ("a;b\nÆble;2\nfooter\n", 1, "utf_8_sig"),
+            # quoted line breaks in the footer fall back to python parser
+            ('a;b\n1;2\n"foot\ner";x\n', 1, "utf-8"),
+            ("a;b\n1;2\n", 0, "utf-8"),
+        ]
+        for csv_text, footer_rows, encoding in test_data:
+            with self.subTest(data=csv_text, encoding=encoding):
+                data = csv_text.encode(encoding)
+                expected_output = read_csv(
+                    "", ";", 0, footer_rows, encoding, data=data
+                )
+                test_df = read_csv(
+                    "", ";", 0, footer_rows, encoding, data=data, engine="c"
+                )
+                pandas.testing.assert_frame_equal(expected_output, test_df)
+
+    def test_read_csv_input_columns(self):
+        """Test that skipped columns aren't read & text is read as text."""
+        csv_data = (
+            "Date;Payee;Amount;Balance\n"
+            "20210201;007;-3,50;10\n"
+            "20210202;123;10,00;20\n"
+        ).encode("utf-8")
+        expected_output = pd.DataFrame(
+            {
+                "0": ["20210201", "20210202"],
+                "1": ["007", "123"],
+                "2": ["-3,50", "10,00"],
+            }
+        )
+        for engine in ["python", "c"]:
+            with self.subTest(engine=engine):
+                test_df = read_csv(
+                    "",
+                    ";",
+                    1,
+                    0,
+                    "utf-8",
+                    data=csv_data,
+                    engine=engine,
+                    input_columns=["Date", "Payee", "Inflow", "skip"],
+                )
+                pandas.testing.assert_frame_equal(expected_output, test_df)
+                # files must still have one column for each input column
+                for input_columns in [["Date", "Payee"], ["Date"] * 5]:
+                    with self.assertRaises(ColumnCountError):
+                        read_csv(
+                            "",
+                            ";",
+                            1,
+                            0,
+                            "utf-8",
+                            data=csv_data,
+                            engine=engine,
+                            input_columns=input_columns,
+                        )
+
+    def test_find_footer_start(self):
+        """Test that footer rows are located from the end of the data."""
+        data = b'a,b\n"x",1\nfoot\n\n'
+        self.assertEqual(10, find_footer_start(data, 2, b"\n", b'"'))
+        self.assertEqual(15, find_footer_start(data, 1, b"\n", b'"'))
+        self.assertEqual(4, find_footer_start(data, 3, b"\n", b'"'))
+        self.assertIsNone(find_footer_start(data, 5, b"\n", b'"'))
+        data = 'a,b\n"x\ny",1\n'
+        self.assertIsNone(find_footer_start(data, 1, "\n", '"'))
+
+    def test_read_csv_chunks(self):
+        """Test that reading in chunks returns the same rows as a whole."""
+        csv_data = (
+            "Date;Payee;Amount\n"
+            + "".join(f"0{i}.02.2021;Shop {i};{i},50\n" for i in range(1, 8))
+            + "Footer line\nBalance;1;2;3\n"
+        ).encode("utf-8")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "test.csv")
+            with open(file_path, "wb") as f:
+                f.write(csv_data)
+            input_columns = ["Date", "Payee", "skip"]
+            expected_output = read_csv(
+                file_path, ";", 1, 2, "utf-8", input_columns=input_columns
+            )
+            # footer is found by reading back from the end of the file
+            with patch.object(dataframe_handler, "FOOTER_SCAN_BYTES", 8):
+                for data in [None, csv_data]:
+                    with self.subTest(from_memory=data is not None):
+                        chunks = list(
+                            read_csv_chunks(
+                                file_path=file_path,
+                                delim=";",
+                                header_rows=1,
+                                footer_rows=2,
+                                encod="utf-8",
+                                chunk_size=3,
+                                input_columns=input_columns,
+                                data=data,
+                            )
+                        )
+                        self.assertListEqual(
+                            [3, 3, 1], [len(chunk) for chunk in chunks]
+                        )
+                        pandas.testing.assert_frame_equal(
+                            expected_output,
+                            pd.concat(chunks, ignore_index=True),
+                        )
+
+    def test_run_chunked(self):
+        """Test that streamed files give the same results as whole ones."""
+        # duplicate transactions & blank dates either side of chunk breaks
+        csv_data = (
+            "Date,Payee,Outflow,Inflow,Memo\n"
+            "01/02/2021,Shop,1.00,,\n"
+            "01/02/2021,Shop,1.00,,\n"
+            ",Cafe,,2.00,\n"
+            ",Cafe,,2.00,\n"
+            "02/02/2021,Shop,1.00,,a\n"
+            "01/02/2021,Shop,1.00,,\n"
+            "01/02/2021,Shop,1.00,,\n"
+        ).encode("utf-8")
+        config = {
+            "delim": ",",
+            "header_rows": 1,
+            "footer_rows": 0,
+            "encod": "utf-8",
+            "input_columns": ["Date", "Payee", "Outflow", "Inflow", "Memo"],
+            "output_columns": [
+                "Date",
+                "Payee",
+                "Category",
+                "Memo",
+                "Outflow",
+                "Inflow",
+            ],
+            "api_columns": ["date", "payee_name", "amount", "import_id"],
+            "cd_flags": [],
+            "date_format": "%d/%m/%Y",
+            "date_dedupe": True,
+            "fill_memo": False,
+            "currency_fix": 1.0,
+            "csv_engine": "c",
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "test.csv")
+            with open(file_path, "wb") as f:
+                f.write(csv_data)
+            expected_handler = DataframeHandler()
+            expected_handler.run(file_path=file_path, **config)
+            self.assertEqual(
+                "YNAB:-1000:2021-02-01:4",
+                expected_handler.api_transaction_df["import_id"].iloc[-1],
+            )
+            for chunk_size in [1, 2, 3]:
+                with self.subTest(chunk_size=chunk_size):
+                    output_path = os.path.join(temp_dir, f"{chunk_size}.csv")
+                    test_handler = DataframeHandler()
+                    test_handler.run(
+                        file_path=file_path,
+                        chunk_size=chunk_size,
+                        output_path=output_path,
+                        **config,
+                    )
+                    self.assertFalse(test_handler.empty)
+                    pandas.testing.assert_frame_equal(
+                        expected_handler.api_transaction_df.reset_index(
+                            drop=True
+                        ),
+                        test_handler.api_transaction_df,
+                    )
+                    with open(output_path) as f:
+                        self.assertEqual(
+                            expected_handler.output_df.to_csv(index=False),
+                            f.read(),
+                        )
+            # without an output file, only the API columns are kept
+            test_handler = DataframeHandler()
+            test_handler.run(file_path=file_path, chunk_size=2, **config)
+            pandas.testing.assert_frame_equal(
+                expected_handler.api_transaction_df.reset_index(drop=True),
+                test_handler.api_transaction_df,
+            )
+            with self.assertRaisesRegex(ValueError, "output_path"):
+                test_handler.output_df
+            with self.assertRaisesRegex(ValueError, "output_path"):
+                test_handler.output_csv(os.path.join(temp_dir, "out.csv"))
+
+    @unittest.skipIf(polars is None, "polars isn't installed")
+    def test_run_engines(self):
+        """Test that the polars engine parses files as pandas does."""
+        config = {
+            "delim": ",",
+            "header_rows": 1,
+            "footer_rows": 1,
+            "input_columns": [
+                "Date",
+                "Payee",
+                "Outflow",
+                "Inflow",
+                "Memo",
+                "Memo",
+                "skip",
+            ],
+            "output_columns": [
+                "Date",
+                "Payee",
+                "Category",
+                "Memo",
+                "Outflow",
+                "Inflow",
+            ],
+            "api_columns": list(dataframe_handler.API_CONSTANTS)
+            + ["date", "payee_name", "amount", "memo", "import_id"],
+            "cd_flags": [],
+            "date_format": "%d/%m/%Y",
+            "date_dedupe": True,
+            "fill_memo": True,
+            "currency_fix": 1.0,
+        }
+        csv_text = (
+            "Date,Payee,Outflow,Inflow,Memo,Memo,Balance\n"
+            "\n"
+            "01/02/2021, Shop A,1.00,,Ref,  1,5\n"
+            "\n"
+            "02/02/2021,NA,,2.50,,,6\n"
+            ",Café,3,,x,,7\n"
+            '03/02/2021,"Quoted, payee",,-4.5,,,8\n'
+            "03/02/2021,Shop A,1.00,,Ref 1,,9\n"
+            "04/02/2021,Shop B,9.95,12.87,,,10\n"
+            "Footer line\n"
+        )
+        test_data = [
+            (csv_text, "utf-8"),
+            (csv_text.replace("\n", "\r\n"), "cp1252"),
+            (csv_text.replace("\n", "\r"), "utf_8_sig"),
+            # malformed quoting is left to the pandas parsers
+            (
+                '"Date","Payee","Outflow","Inflow","Memo","Memo","Balance"\n'
+                '"01/02/2021","Shop","1.00","","","","5"\n'
+                '02/02/2021","Cafe","2.00","","","","6"\n'
+                "Footer line\n",
+                "utf-8",
+            ),
+        ]
+        for (csv_text, encoding), exact_amounts in itertools.product(
+            test_data, [False, True]
+        ):
+            with self.subTest(
+                data=csv_text, encoding=encoding, exact_amounts=exact_amounts
+            ):
+                data = csv_text.encode(encoding)
+                handlers = dict()
+                for engine in ["pandas", "polars"]:
+                    handlers[engine] = DataframeHandler()
+                    handlers[engine].run(
+                        file_path="",
+                        encod=encoding,
+                        data=data,
+                        csv_engine="c",
+                        engine=engine,
+                        exact_amounts=exact_amounts,
+                        **config,
+                    )
+                self.assertFalse(handlers["polars"].empty)
+                pandas.testing.assert_frame_equal(
+                    handlers["pandas"].output_df,
+                    handlers["polars"].output_df,
+                    check_exact=True,
+                )
+                pandas.testing.assert_frame_equal(
+                    handlers["pandas"].api_transaction_df,
+                    handlers["polars"].api_transaction_df,
+                    check_exact=True,
+                )
+                # files must still have one column for each input column
+                with self.assertRaises(ValueError):
+                    DataframeHandler().run(
+                        file_path="",
+                        encod=encoding,
+                        data=data,
+                        engine="polars",
+                        **{**config, "input_columns": ["Date", "Payee"]},
+                    )
+
+    @unittest.skipIf(pyarrow is None, "pyarrow isn't installed")
+    def test_run_arrow_strings(self):
+        """Test that files parsed into Arrow strings give the same output."""
+        config = {
+            "file_path": "",
+            "delim": ",",
+            "header_rows": 1,
+            "footer_rows": 0,
+            "encod": "utf-8",
+            "input_columns": ["Date", "Payee", "Outflow", "Inflow", "Memo"],
+            "output_columns": ["Date", "Payee", "Memo", "Outflow", "Inflow"],
+            "api_columns": ["date", "payee_name", "amount", "import_id"],
+            "cd_flags": [],
+            "date_format": "%d/%m/%Y",
+            "date_dedupe": True,
+            "fill_memo": False,
+            "currency_fix": 1.0,
+            "data": (
+                "Date,Payee,Outflow,Inflow,Memo\n"
+                "01/02/2021,Shop  A!,1.00,,Ref\n"
+                ",Shop  A!,1.00,,\n"
+                "02/02/2021,,,2.50,\n"
+                "bad date,Cafe,3.00,,\n"
+            ).encode("utf-8"),
+        }
+        for csv_engine, chunk_size in [("c", 0), ("python", 0), ("c", 2)]:
+            with self.subTest(csv_engine=csv_engine, chunk_size=chunk_size):
+                handlers = dict()
+                for arrow_strings in [False, True]:
+                    handlers[arrow_strings] = DataframeHandler()
+                    handlers[arrow_strings].run(
+                        csv_engine=csv_engine,
+                        chunk_size=chunk_size,
+                        arrow_strings=arrow_strings,
+                        **config,
+                    )
+                arrow_df = handlers[True].api_transaction_df
+                for col in ["date", "payee_name", "import_id"]:
+                    self.assertTrue(
+                        dataframe_handler.is_arrow_string(arrow_df[col])
+                    )
+                # blank text is filled with "0" rather than 0
+                pandas.testing.assert_frame_equal(
+                    handlers[False].api_transaction_df.astype(
+                        {"payee_name": str}
+                    ),
+                    from_arrow_strings(arrow_df),
+                )
+                if chunk_size == 0:
+                    self.assertEqual(
+                        handlers[False].output_df.to_csv(index=False),
+                        handlers[True].output_df.to_csv(index=False),
+                    )
+
+    def test_run_decimal_separator(self):
+        """Test that amounts don't depend on the other rows of the file."""
+        config = {
+            "file_path": "",
+            "delim": ";",
+            "header_rows": 1,
+            "footer_rows": 0,
+            "encod": "utf-8",
+            "input_columns": ["Date", "Payee", "Outflow", "Inflow", "Memo"],
+            "output_columns": ["Date", "Payee", "Memo", "Outflow", "Inflow"],
+            "api_columns": ["date", "payee_name", "amount"],
+            "cd_flags": [],
+            "date_format": "%d/%m/%Y",
+            "date_dedupe": False,
+            "fill_memo": False,
+            "currency_fix": 1.0,
+            "decimal_sep": ",",
+        }
+        csv_text = "Date;Payee;Outflow;Inflow;Memo\n01/02/2021;Shop;;1.500;\n"
+        engines = ["pandas"] if polars is None else ["pandas", "polars"]
+        test_cases = itertools.product(
+            ["", "02/02/2021;Cafe;;-2.000,50;\n"],
+            ["c", "python"],
+            engines,
+            [0, 1],
+            [False, True],
+        )
+        for comma_row, csv_engine, engine, chunk_size, exact in test_cases:
+            with self.subTest(
+                comma_row=comma_row,
+                csv_engine=csv_engine,
+                engine=engine,
+                chunk_size=chunk_size,
+                exact_amounts=exact,
+            ):
+                test_handler = DataframeHandler()
+                test_handler.run(
+                    data=(csv_text + comma_row).encode("utf-8"),
+                    csv_engine=csv_engine,
+                    engine=engine,
+                    chunk_size=chunk_size,
+                    exact_amounts=exact,
+                    **config,
+                )
+                amounts = test_handler.api_transaction_df["amount"]
+                self.assertEqual(1500000, amounts.iloc[0])
+                if comma_row:
+                    self.assertEqual(-2000500, amounts.iloc[1])
+
+    def test_get_text_dtype(self):
+        """Test that text is stored as objects without pyarrow."""
+        self.assertEqual(object, dataframe_handler.get_text_dtype(False))
+        with patch.object(
+            dataframe_handler.pd, "StringDtype", side_effect=ImportError
+        ), self.assertLogs(level="WARNING"):
+            self.assertEqual(object, dataframe_handler.get_text_dtype(True))
+        if pyarrow is not None:
+            self.assertEqual(
+                "string[pyarrow]", dataframe_handler.get_text_dtype(True)
+            )
 
     @unittest.skip("Not tested yet.")
     def test_parse_data(self):
@@ -94,6 +692,27 @@ class TestDataframeHandler(TestCase):
                     list(test_df),
                 )
 
+    def test_merge_duplicate_columns_values(self):
+        """Check that duplicate columns are merged row by row."""
+        input_cols = ["Memo", "Inflow", "Memo", "Memo"]
+        test_df = pd.DataFrame(
+            [
+                ["a  b", 1.5, None, " c"],
+                [None, 2.0, None, None],
+                [None, 3.0, "x", None],
+                ["y", 4.0, "z", "z"],
+            ],
+            columns=input_cols,
+        )
+        test_df = merge_duplicate_columns(test_df, input_cols)
+        self.assertEqual(
+            ["Memo", "Inflow", "Memo 0", "Memo 1"], list(test_df.columns)
+        )
+        pandas.testing.assert_series_equal(
+            pd.Series(["a b c", NA, "x", "y z z"], name="Memo"),
+            test_df["Memo"],
+        )
+
     def test_add_missing_columns(self):
         """Check that adding missing columns works correctly."""
         desired_cols = ["One", "Two", "Three", "Four"]
@@ -156,7 +775,6 @@ class TestDataframeHandler(TestCase):
         initial_df = pd.DataFrame(
             {"Inflow": [10, -20, 0, 0, 0], "Outflow": [0, 0, -100, 0, 0]}
         )
-        test_df = fix_amount(initial_df, 1)
         desired_output = pd.DataFrame(
             {
                 "Inflow": [10, 0, 100, 0, 0],
@@ -167,22 +785,24 @@ class TestDataframeHandler(TestCase):
         desired_output["Inflow"] = desired_output["Inflow"].astype(float)
         desired_output["Outflow"] = desired_output["Outflow"].astype(float)
         desired_output["amount"] = desired_output["amount"].astype(int)
-        for column in desired_output.keys():
-            with self.subTest(
-                "Test each column's negative inflow/outflow processing.",
-                column=column,
-            ):
-                pandas.testing.assert_series_equal(
-                    desired_output[column],
-                    test_df[column],
-                )
+        for engine_name, engine in ENGINES.items():
+            test_df = engine.fix_amount(initial_df.copy(), 1)
+            for column in desired_output.keys():
+                with self.subTest(
+                    "Test each column's negative inflow/outflow processing.",
+                    column=column,
+                    engine=engine_name,
+                ):
+                    pandas.testing.assert_series_equal(
+                        desired_output[column],
+                        test_df[column],
+                    )
 
     def test_currency_fix(self):
         """Test currency conversion."""
         initial_df = pd.DataFrame(
             {"Inflow": [10, -20, 0, 0, 0], "Outflow": [0, 0, -100, 0, 0]}
         )
-        test_df = fix_amount(initial_df, 4)
         desired_output = pd.DataFrame(
             {
                 "Inflow": [2.5, 0, 25, 0, 0],
@@ -193,15 +813,59 @@ class TestDataframeHandler(TestCase):
         desired_output["Inflow"] = desired_output["Inflow"].astype(float)
         desired_output["Outflow"] = desired_output["Outflow"].astype(float)
         desired_output["amount"] = desired_output["amount"].astype(int)
-        for column in desired_output.keys():
-            with self.subTest(
-                "Test each column's currency conversion.",
-                column=column,
-            ):
-                pandas.testing.assert_series_equal(
-                    desired_output[column],
-                    test_df[column],
-                )
+        for engine_name, engine in ENGINES.items():
+            test_df = engine.fix_amount(initial_df.copy(), 4)
+            for column in desired_output.keys():
+                with self.subTest(
+                    "Test each column's currency conversion.",
+                    column=column,
+                    engine=engine_name,
+                ):
+                    pandas.testing.assert_series_equal(
+                        desired_output[column],
+                        test_df[column],
+                    )
+
+    def test_fix_milliunits(self):
+        """Test exact milliunit amounts, flags & currency conversion."""
+        initial_df = pd.DataFrame(
+            {
+                "Inflow": ["2,01", "-20", None, "1,0005", "5"],
+                "Outflow": [None, None, "-100", None, None],
+                "CDFlag": ["C", "C", "C", "C", "D"],
+            }
+        )
+        desired_output = pd.DataFrame(
+            {
+                "Inflow": [2.01, 0, 100, 1.001, 0],
+                "Outflow": [0.0, 20, 0, 0, 5],
+                "amount": [2010, -20000, 100000, 1001, -5000],
+            }
+        )
+        for engine_name, engine in ENGINES.items():
+            test_df = engine.fix_milliunits(
+                initial_df.copy(), ["", "C", "D"], 1, ","
+            )
+            for column in desired_output.keys():
+                with self.subTest(column=column, engine=engine_name):
+                    pandas.testing.assert_series_equal(
+                        desired_output[column],
+                        test_df[column],
+                    )
+            # converted amounts are rounded to the nearest milliunit
+            test_df = engine.fix_milliunits(initial_df.copy(), [], 3, ",")
+            self.assertListEqual(
+                [670, -6667, 33333, 334, 1667], test_df["amount"].tolist()
+            )
+            # thousands separators are removed first
+            test_df = engine.fix_milliunits(
+                pd.DataFrame({"Inflow": ["1.234,5"], "Outflow": [None]}),
+                [],
+                1,
+                "",
+                ".",
+            )
+            self.assertListEqual([1234500], test_df["amount"].tolist())
 
     def test_clean_monetary_values(self):
         """Test string format fixing for monetary values."""
@@ -233,11 +897,63 @@ class TestDataframeHandler(TestCase):
                 "j": -30.30,
             }
         )
-        test_data = clean_monetary_values(initial_data)
-        pandas.testing.assert_series_equal(
-            desired_output,
-            test_data,
-        )
+        for engine_name, engine in ENGINES.items():
+            with self.subTest(engine=engine_name):
+                test_data = engine.clean_monetary_values(initial_data)
+                pandas.testing.assert_series_equal(
+                    desired_output,
+                    test_data,
+                )
+
+    def test_clean_monetary_values_separators(self):
+        """Test amounts with configured decimal & thousands separators."""
+        test_data = [
+            (
+                ",",
+                "",
+                ["1.234,56", "€ -7,5", "1 000", None],
+                [1234.56, -7.5, 1000, 0],
+            ),
+            (
+                ".",
+                "",
+                ["1,234.56", "$-7.5", "1,000", None],
+                [1234.56, -7.5, 1000, 0],
+            ),
+            # guessed decimal separators, without thousands separators
+            (
+                "",
+                ",",
+                ["1,234.56", "1,000", "-7.5", "1,000,000"],
+                [1234.56, 1000, -7.5, 1000000],
+            ),
+            (
+                "",
+                ".",
+                ["1.234,56", "1.000", "-7,5", "1.000.000"],
+                [1234.56, 1000, -7.5, 1000000],
+            ),
+            # values already read as numbers are used as they are
+            (",", "", [1.5, None, 3], [1.5, 0, 3]),
+            # values which aren't converted together are parsed one by one
+            ("", "", ["1.5\n2", "2.5", None], [1.52, 2.5, 0]),
+        ]
+        for engine_name, engine in ENGINES.items():
+            for decimal_sep, thousands_sep, values, expected in test_data:
+                with self.subTest(
+                    decimal_sep=decimal_sep,
+                    thousands_sep=thousands_sep,
+                    values=values,
+                    engine=engine_name,
+                ):
+                    test_series = engine.clean_monetary_values(
+                        pd.Series(values), decimal_sep, thousands_sep
+                    )
+                    pandas.testing.assert_series_equal(
+                        pd.Series(expected, dtype=float), test_series
+                    )
+            with self.assertRaises(ValueError):
+                engine.clean_monetary_values(pd.Series(["1,234,56"]), ",")
 
     def test_remove_invalid_rows(self):
         initial_df = pd.DataFrame(
@@ -275,7 +991,6 @@ class TestDataframeHandler(TestCase):
         ).set_index("Date")
 
         test_df = remove_invalid_rows(initial_df).set_index("Date")
-        del test_df["index"]
         pandas.testing.assert_frame_equal(desired_output, test_df, False)
 
     def test_auto_memo(self):
@@ -338,14 +1053,38 @@ class TestDataframeHandler(TestCase):
                 "Ðö Nøt Rēmove Ácçeñtéd Chäråcterß",
             ],
         ]
-        for test in test_strings:
-            with self.subTest(
-                "Test different types of string input.", test=test
-            ):
-                test_series = pd.Series(data={1: test[0]})
-                desired_output = pd.Series(data={1: test[1]})
-                test_output = clean_strings(test_series)
-                pandas.testing.assert_series_equal(desired_output, test_output)
+        for engine_name, engine in ENGINES.items():
+            for test in test_strings:
+                with self.subTest(
+                    "Test different types of string input.",
+                    test=test,
+                    engine=engine_name,
+                ):
+                    test_series = pd.Series(data={1: test[0]})
+                    desired_output = pd.Series(data={1: test[1]})
+                    test_output = engine.clean_strings(test_series)
+                    pandas.testing.assert_series_equal(
+                        desired_output, test_output
+                    )
+
+    def test_clean_strings_cache(self):
+        """Test that each distinct string is cleaned once & remembered."""
+        string_series = pd.Series(
+            ["a  b!", None, "c\nd", "a  b!"], index=[3, 4, 5, 6]
+        )
+        for engine_name, engine in ENGINES.items():
+            with self.subTest(engine=engine_name):
+                cache = dict()
+                test_series = engine.clean_strings(string_series, cache)
+                pandas.testing.assert_series_equal(
+                    pd.Series(["A B", NA, "C D", "A B"], index=[3, 4, 5, 6]),
+                    test_series,
+                )
+                self.assertCountEqual(["a  b!", "c\nd"], cache)
+                # cached strings aren't cleaned again
+                cache["a  b!"] = "cached"
+                test_series = engine.clean_strings(string_series, cache)
+                self.assertEqual("cached", test_series[6])
 
     def test_fix_date(self):
         test_params = [
@@ -394,12 +1133,36 @@ class TestDataframeHandler(TestCase):
                 "d": "2001-10-01",
             }
         )
-        for test in test_params:
-            with self.subTest(test=test):
-                test_series = fix_date(
-                    pd.Series(data=test["data"]), test["date_format"]
+        for engine_name, engine in ENGINES.items():
+            for test in test_params:
+                with self.subTest(test=test, engine=engine_name):
+                    test_series = engine.fix_date(
+                        pd.Series(data=test["data"]), test["date_format"]
+                    )
+                    pandas.testing.assert_series_equal(
+                        desired_output, test_series
+                    )
+
+    def test_fix_date_cache(self):
+        """Test that each distinct date is parsed once & remembered."""
+        date_series = pd.Series(
+            ["01.10.2021", None, "29.02.2021", "01.10.2021", "bad"]
+        )
+        for engine_name, engine in ENGINES.items():
+            with self.subTest(engine=engine_name):
+                cache = dict()
+                test_series = engine.fix_date(date_series, "%d.%m.%Y", cache)
+                pandas.testing.assert_series_equal(
+                    pd.Series(["2021-10-01", NA, NA, "2021-10-01", NA]),
+                    test_series,
+                )
+                self.assertCountEqual(
+                    ["01.10.2021", "29.02.2021", "bad"], cache
                 )
-                pandas.testing.assert_series_equal(desired_output, test_series)
+                # cached dates aren't parsed again
+                cache["01.10.2021"] = "cached"
+                test_series = engine.fix_date(date_series, "%d.%m.%Y", cache)
+                self.assertEqual("cached", test_series[3])
 
     def test_fill_empty_dates(self):
         """Test filling in of empty date values."""
@@ -490,8 +1253,28 @@ class TestDataframeHandler(TestCase):
             }
         )
 
-        test_df = fill_api_columns(initial_df)
-        pandas.testing.assert_frame_equal(expected_output, test_df[api_cols])
+        for engine_name, engine in ENGINES.items():
+            with self.subTest(engine=engine_name):
+                test_df = select_api_columns(
+                    engine.fill_api_columns(initial_df.copy()), api_cols
+                )
+                # constant fields are only added when needed
+                self.assertListEqual(
+                    ["date", "payee_name", "amount", "memo", "import_id"],
+                    list(test_df.columns),
+                )
+                pandas.testing.assert_frame_equal(
+                    expected_output, expand_api_constants(test_df)
+                )
+                # with other constant fields, e.g. the account ID
+                pandas.testing.assert_frame_equal(
+                    expected_output.assign(
+                        account_id="account", approved=False
+                    ),
+                    expand_api_constants(
+                        test_df, {"account_id": "account", "approved": False}
+                    ),
+                )
 
     def test_combine_dfs(self):
         dfs = [
@@ -501,3 +1284,96 @@ class TestDataframeHandler(TestCase):
         expected_output = pd.DataFrame({"Col1": [45, 55], "Col2": [36, 98]})
         test_output = combine_dfs(dfs)
         pandas.testing.assert_frame_equal(expected_output, test_output)
+
+    def test_combine_dfs_import_ids(self):
+        """Test transactions are combined by account & import ID."""
+        dfs = [
+            pd.DataFrame(
+                {
+                    "account_id": ["a", "a", "b"],
+                    "memo": ["One", "Two", "Three"],
+                    "import_id": ["YNAB:1:1", "YNAB:2:1", "YNAB:1:1"],
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "account_id": ["a", "a"],
+                    "memo": ["Two again", "Four"],
+                    "import_id": ["YNAB:2:1", "YNAB:4:1"],
+                }
+            ),
+        ]
+        expected_output = pd.DataFrame(
+            {
+                "account_id": ["a", "a", "b", "a"],
+                "memo": ["One", "Two", "Three", "Four"],
+                "import_id": ["YNAB:1:1", "YNAB:2:1", "YNAB:1:1", "YNAB:4:1"],
+            }
+        )
+        pandas.testing.assert_frame_equal(expected_output, combine_dfs(dfs))
+        # frames already deduplicated are only concatenated
+        self.assertEqual(5, len(combine_dfs(dfs, deduplicate=False)))
+
+    def test_drop_seen_transactions(self):
+        """Test transactions seen in earlier dataframes are removed."""
+        seen_keys: set = set()
+        first_df = pd.DataFrame({"Col1": [45, 55], "Col2": [36, 98]})
+        self.assertIs(first_df, drop_seen_transactions(first_df, seen_keys))
+        second_df = pd.DataFrame({"Col1": [55, 45, 65], "Col2": [98, 0, 0]})
+        pandas.testing.assert_frame_equal(
+            second_df.iloc[1:],
+            drop_seen_transactions(second_df, seen_keys),
+        )
+        self.assertEqual(4, len(seen_keys))
+        # account_id as a constant API field
+        api_df = select_api_columns(
+            pd.DataFrame(
+                {"memo": ["One", "Two"], "import_id": ["YNAB:1:1", "YNAB:1:1"]}
+            ),
+            ["account_id", "memo", "import_id"],
+        )
+        self.assertListEqual(
+            ["One"], drop_seen_transactions(api_df, set())["memo"].tolist()
+        )
+
+    def test_write_transactions_json(self):
+        """Test transactions are serialized in chunks, with constants."""
+        test_df = pd.DataFrame(
+            {
+                "account_id": ["", "", ""],
+                "payee_name": ['Caf\u00e9 "A/B"', None, "C"],
+                "amount": [1000, -20, 5],
+                "approved": [False, False, False],
+            }
+        )
+        expected_output = test_df.assign(account_id="account").to_dict(
+            orient="records"
+        )
+        for chunk_size in [1, 2, 10]:
+            with self.subTest(chunk_size=chunk_size), patch.object(
+                dataframe_handler, "JSON_CHUNK_SIZE", chunk_size
+            ):
+                stream = io.BytesIO()
+                write_transactions_json(
+                    test_df, stream, constants={"account_id": "account"}
+                )
+                test_output = json.loads(b"[" + stream.getvalue() + b"]")
+                self.assertEqual(expected_output, test_output)
+        # nothing is written without transactions
+        stream = io.BytesIO()
+        write_transactions_json(test_df.iloc[:0], stream)
+        self.assertEqual(b"", stream.getvalue())
+
+    def test_log_memory_use(self):
+        """Test memory use is only logged while tracing allocations."""
+        with patch("logging.info") as mock_info:
+            log_memory_use("testing")
+        mock_info.assert_not_called()
+        tracemalloc.start()
+        try:
+            with self.assertLogs(level="INFO") as logs:
+                log_memory_use("testing")
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Memory after testing", logs.output[0])
@@ -0,0 +1,100 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from bank2ynab.detection_cache import DetectionCache
+
+
+class TestDetectionCache(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "cache.json")
+        self.files = list()
+        for count in range(3):
+            file_path = os.path.join(self.temp_dir.name, f"{count}.csv")
+            with open(file_path, "w") as f:
+                f.write(f"file {count}\n")
+            self.files.append(file_path)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_store_and_get(self):
+        """Test that stored values are returned and merged."""
+        cache = DetectionCache(self.cache_path, 10)
+        self.assertIsNone(cache.get(self.files[0]))
+        cache.store(self.files[0], encoding="utf-8")
+        cache.store(self.files[0], bank="Test Bank")
+        self.assertDictEqual(
+            {"encoding": "utf-8", "bank": "Test Bank"},
+            cache.get(self.files[0]),  # type: ignore
+        )
+
+    def test_modified_file(self):
+        """Test that changing a file invalidates its cache entry."""
+        cache = DetectionCache(self.cache_path, 10)
+        cache.store(self.files[0], encoding="utf-8")
+        with open(self.files[0], "a") as f:
+            f.write("more data\n")
+        self.assertIsNone(cache.get(self.files[0]))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = DetectionCache(self.cache_path, 2)
+        cache.store(self.files[0], encoding="a")
+        cache.store(self.files[1], encoding="b")
+        # use the first entry so the second becomes the oldest
+        cache.get(self.files[0])
+        cache.store(self.files[2], encoding="c")
+        self.assertIsNotNone(cache.get(self.files[0]))
+        self.assertIsNone(cache.get(self.files[1]))
+        self.assertIsNotNone(cache.get(self.files[2]))
+
+    def test_save_and_load(self):
+        """Test that the cache persists between instances."""
+        cache = DetectionCache(self.cache_path, 10)
+        cache.store(self.files[0], encoding="utf-8")
+        cache.save()
+        loaded_cache = DetectionCache(self.cache_path, 10)
+        self.assertDictEqual(
+            {"encoding": "utf-8"},
+            loaded_cache.get(self.files[0]),  # type: ignore
+        )
+
+    def test_save_unchanged(self):
+        """Test that the cache is only saved when entries are stored."""
+        cache = DetectionCache(self.cache_path, 10)
+        cache.store(self.files[0], encoding="utf-8")
+        cache.save()
+        loaded_cache = DetectionCache(self.cache_path, 10)
+        self.assertIsNotNone(loaded_cache.get(self.files[0]))
+        self.assertFalse(loaded_cache.modified)
+        loaded_cache.store(self.files[1], encoding="utf-8")
+        self.assertTrue(loaded_cache.modified)
+
+    def test_copy_and_update(self):
+        """Test that entries stored in a copy can be added back."""
+        cache = DetectionCache(self.cache_path, 10)
+        cache.store(self.files[0], encoding="utf-8")
+        cache_copy = pickle.loads(pickle.dumps(cache))
+        self.assertDictEqual({}, cache_copy.get_stored_entries())
+        cache_copy.store(self.files[1], encoding="cp1252")
+        cache_copy.store(self.files[0], bank="Test Bank")
+        stored_entries = cache_copy.get_stored_entries()
+        self.assertListEqual(
+            [os.path.realpath(path) for path in self.files[1::-1]],
+            list(stored_entries),
+        )
+        self.assertIsNone(cache.get(self.files[1]))
+        cache.update(stored_entries)
+        self.assertDictEqual(
+            {"encoding": "cp1252"},
+            cache.get(self.files[1]),  # type: ignore
+        )
+        self.assertDictEqual(
+            {"encoding": "utf-8", "bank": "Test Bank"},
+            cache.get(self.files[0]),  # type: ignore
+        )
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import TestCase
+
+from bank2ynab.file_watcher import (
+    InotifyWatcher,
+    PollingWatcher,
+    create_watcher,
+)
+
+
+class TestFileWatcher(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.existing_file = self.write_file("existing.csv", "old")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def write_file(self, filename: str, contents: str) -> str:
+        file_path = os.path.join(self.temp_dir.name, filename)
+        with open(file_path, "w") as f:
+            f.write(contents)
+        return file_path
+
+    def test_polling_watcher(self):
+        """Test that new files are reported once they stop changing."""
+        watcher = PollingWatcher([self.temp_dir.name], 0)
+        # files present at the start are not reported
+        self.assertListEqual([], watcher.poll())
+        new_file = self.write_file("new.csv", "partial")
+        # first sighting, the file may still be downloading
+        self.assertListEqual([], watcher.poll())
+        self.write_file("new.csv", "partial download complete")
+        self.assertListEqual([], watcher.poll())
+        # unchanged since the last scan
+        self.assertListEqual([new_file], watcher.poll())
+        # only reported once
+        self.assertListEqual([], watcher.poll())
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only.")
+    def test_inotify_watcher(self):
+        """Test that written files are reported."""
+        watcher = InotifyWatcher([self.temp_dir.name])
+        try:
+            self.assertListEqual([], watcher.wait(timeout=0))
+            new_file = self.write_file("new.csv", "data")
+            self.assertListEqual([new_file], watcher.wait(timeout=1))
+        finally:
+            watcher.close()
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only.")
+    def test_inotify_watcher_missing_directories(self):
+        """Test that polling is used if no directory can be watched."""
+        missing_dir = os.path.join(self.temp_dir.name, "missing")
+        with self.assertLogs(level="ERROR"):
+            with self.assertRaises(OSError):
+                InotifyWatcher([missing_dir])
+        with self.assertLogs(level="ERROR"):
+            watcher = create_watcher([missing_dir], 0)
+        self.assertIsInstance(watcher, PollingWatcher)
@@ -0,0 +1,143 @@
+import codecs
+import os
+import tempfile
+from unittest import TestCase
+
+from bank2ynab.format_index import FormatIndex, get_header_hash
+from bank2ynab.transactionfile_reader import build_file_index
+
+
+def make_config(
+    name: str, delim: str, header_rows: int, columns: int, fpath: str = ""
+) -> dict:
+    return {
+        "bank_name": name,
+        "input_filename": f"{name}_export",
+        "path": fpath,
+        "recursive": False,
+        "archives": False,
+        "regex": False,
+        "ext": ".csv",
+        "fixed_prefix": "fixed_",
+        "input_delimiter": delim,
+        "header_rows": header_rows,
+        "input_columns": [f"col{i}" for i in range(columns)],
+        "content_match": True,
+    }
+
+
+class TestFormatIndex(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.configs = [
+            make_config("comma", ",", 1, 4, self.temp_dir.name),
+            make_config("semicolon", ";", 1, 4, self.temp_dir.name),
+            make_config("shared a", ",", 1, 3, self.temp_dir.name),
+            make_config("shared b", ",", 1, 3, self.temp_dir.name),
+            make_config("two headers", ",", 2, 5, self.temp_dir.name),
+        ]
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def write_test_file(self, filename: str, data: bytes) -> str:
+        file_path = os.path.join(self.temp_dir.name, filename)
+        with open(file_path, "wb") as test_file:
+            test_file.write(data)
+        return file_path
+
+    def test_identify(self):
+        """Test that files are identified by their structure."""
+        index = FormatIndex(self.configs)
+        test_files = [
+            (b"Date,Payee,Out,In\n01/01/2021,Shop,1.00,\n", ["comma"]),
+            (
+                b"Date;Payee;Out;In\r\n\r\n01/01/2021;Shop;1,00;\r\n",
+                ["semicolon"],
+            ),
+            (
+                codecs.BOM_UTF16_LE
+                + "Date;Payee;Out;In\r\n01/01/2021;Shop;1,00;\r\n".encode(
+                    "utf-16-le"
+                ),
+                ["semicolon"],
+            ),
+            (b'Bank\nDate,Payee,Memo,Out,In\n1,"A, B",,2,\n', ["two headers"]),
+            # structure matches more than one format
+            (b"Date,Payee,Amount\n01/01/2021,Shop,1.00\n", []),
+            (b"Date,Amount\n01/01/2021,1.00\n", []),
+            (b"", []),
+        ]
+        for data, expected in test_files:
+            with self.subTest(data=data):
+                file_path = self.write_test_file("test.csv", data)
+                self.assertListEqual(expected, index.identify(file_path))
+                self.assertListEqual(
+                    expected, index.identify(file_path, data=data)
+                )
+
+    def test_identify_learned_header(self):
+        """Test that learned header lines identify ambiguous formats."""
+        data = b"Date,Payee,Amount\n01/01/2021,Shop,1.00\n"
+        file_path = self.write_test_file("test.csv", data)
+        header_hash = get_header_hash(file_path, 1)
+        index = FormatIndex(
+            self.configs,
+            known_files=[
+                {"bank": "shared b", "header": header_hash},
+                {"bank": "shared b", "header": header_hash},
+                {"bank": "not indexed", "header": header_hash},
+                {"encoding": "utf-8"},
+            ],
+        )
+        self.assertListEqual(["shared b"], index.identify(file_path))
+        # the header hash ignores line endings & surrounding whitespace
+        other_path = self.write_test_file(
+            "other.csv", b" Date,Payee,Amount \r\n02/01/2021,Cafe,2.00\r\n"
+        )
+        self.assertEqual(header_hash, get_header_hash(other_path, 1))
+        self.assertIsNone(get_header_hash(other_path, 0))
+
+    def test_disabled_sections(self):
+        """Test that only sections with content matching are indexed."""
+        self.configs[0]["content_match"] = False
+        index = FormatIndex(self.configs)
+        self.assertNotIn("comma", index.configs)
+        file_path = self.write_test_file(
+            "test.csv", b"Date,Payee,Out,In\n01/01/2021,Shop,1.00,\n"
+        )
+        self.assertListEqual([], index.identify(file_path))
+
+    def test_build_file_index(self):
+        """Test that unmatched filenames are assigned by content."""
+        self.write_test_file(
+            "renamed.csv", b"Date,Payee,Out,In\n01/01/2021,Shop,1.00,\n"
+        )
+        self.write_test_file(
+            "renamed.txt", b"Date,Payee,Out,In\n01/01/2021,Shop,1.00,\n"
+        )
+        self.write_test_file(
+            "fixed_renamed.csv", b"Date,Payee,Out,In\n01/01/2021,Shop,1.00,\n"
+        )
+        self.write_test_file(
+            "comma_export.csv", b"Date;Payee;Out;In\n01/01/2021;Shop;1,00;\n"
+        )
+        file_index = build_file_index(
+            self.configs, format_index=FormatIndex(self.configs)
+        )
+        self.assertCountEqual(
+            [
+                os.path.join(self.temp_dir.name, "comma_export.csv"),
+                os.path.join(self.temp_dir.name, "renamed.csv"),
+            ],
+            file_index["comma"],
+        )
+        self.assertListEqual([], file_index["semicolon"])
+        # without an index only filenames are matched
+        file_index = build_file_index(self.configs)
+        self.assertListEqual(
+            [os.path.join(self.temp_dir.name, "comma_export.csv")],
+            file_index["comma"],
+        )
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from bank2ynab import import_ledger
+from bank2ynab.import_ledger import (
+    IMPORTED,
+    NO_DATA,
+    ImportLedger,
+    get_config_hash,
+)
+
+
+class TestImportLedger(TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "ledger.sqlite3")
+        self.files = list()
+        for count, contents in enumerate(["a\n", "b\n", "a\n"]):
+            file_path = os.path.join(self.temp_dir.name, f"{count}.csv")
+            with open(file_path, "w") as f:
+                f.write(contents)
+            self.files.append(file_path)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_get_hash(self):
+        """Test that files are identified by content & hashed once."""
+        ledger = ImportLedger(self.db_path)
+        hashes = [ledger.get_hash(file_path) for file_path in self.files]
+        self.assertEqual(hashes[0], hashes[2])
+        self.assertNotEqual(hashes[0], hashes[1])
+        with patch.object(import_ledger, "hash_file") as mock_hash:
+            self.assertEqual(hashes[0], ledger.get_hash(self.files[0]))
+            mock_hash.assert_not_called()
+        # modified files are hashed again
+        with open(self.files[0], "a") as f:
+            f.write("c\n")
+        self.assertNotEqual(hashes[0], ledger.get_hash(self.files[0]))
+        ledger.close()
+
+    def test_record_and_lookup(self):
+        """Test that results persist & failures are retried on change."""
+        config_hash = get_config_hash({"bank_name": "Bank", "header_rows": 1})
+        ledger = ImportLedger(self.db_path)
+        file_hash = ledger.get_hash(self.files[0])
+        other_hash = ledger.get_hash(self.files[1])
+        self.assertIsNone(ledger.lookup(file_hash, "Bank", config_hash))
+        ledger.record(file_hash, "Bank", config_hash, IMPORTED, rows=3)
+        ledger.record(other_hash, "Bank", config_hash, NO_DATA)
+        ledger.close()
+
+        ledger = ImportLedger(self.db_path)
+        self.assertEqual(
+            IMPORTED, ledger.lookup(file_hash, "Bank", config_hash)
+        )
+        self.assertEqual(
+            NO_DATA, ledger.lookup(other_hash, "Bank", config_hash)
+        )
+        self.assertIsNone(ledger.lookup(file_hash, "Other", config_hash))
+        new_config_hash = get_config_hash(
+            {"bank_name": "Bank", "header_rows": 2}
+        )
+        self.assertEqual(
+            IMPORTED, ledger.lookup(file_hash, "Bank", new_config_hash)
+        )
+        self.assertIsNone(ledger.lookup(other_hash, "Bank", new_config_hash))
+        ledger.close()
+
+    def test_deferred(self):
+        """Test that deferred ledgers keep their rows for another to write."""
+        config_hash = get_config_hash({"bank_name": "Bank"})
+        ImportLedger(self.db_path).close()
+        deferred_ledger = ImportLedger(self.db_path, deferred=True)
+        file_hash = deferred_ledger.get_hash(self.files[0])
+        with patch.object(import_ledger, "hash_file") as mock_hash:
+            self.assertEqual(
+                file_hash, deferred_ledger.get_hash(self.files[0])
+            )
+            mock_hash.assert_not_called()
+        deferred_ledger.record(file_hash, "Bank", config_hash, IMPORTED)
+        self.assertEqual(
+            IMPORTED, deferred_ledger.lookup(file_hash, "Bank", config_hash)
+        )
+        deferred_ledger.close()
+
+        ledger = ImportLedger(self.db_path)
+        self.assertIsNone(ledger.lookup(file_hash, "Bank", config_hash))
+        ledger.write_rows(deferred_ledger.pending_rows)  # type: ignore
+        ledger.close()
+        ledger = ImportLedger(self.db_path)
+        self.assertEqual(
+            IMPORTED, ledger.lookup(file_hash, "Bank", config_hash)
+        )
+        with patch.object(import_ledger, "hash_file") as mock_hash:
+            self.assertEqual(file_hash, ledger.get_hash(self.files[0]))
+            mock_hash.assert_not_called()
+        ledger.close()
@@ -1,13 +1,306 @@
+import gzip
+import os
+import tempfile
+import zipfile
 from unittest import TestCase
+from unittest.mock import patch
+
+from bank2ynab import transactionfile_reader
+from bank2ynab.transactionfile_reader import (
+    PrefixTrie,
+    build_file_index,
+    detect_encoding,
+    get_file_identity,
+    get_files,
+    list_archive_members,
+    read_file_bytes,
+    resolve_source_paths,
+    scan_directories,
+)
+
+
+def make_config(
+    name: str, pattern: str, fpath: str, regex=False, recursive=False
+) -> dict:
+    return {
+        "bank_name": name,
+        "input_filename": pattern,
+        "path": fpath,
+        "recursive": recursive,
+        "archives": False,
+        "regex": regex,
+        "ext": ".csv",
+        "fixed_prefix": "fixed_",
+    }
 
 
 class TestTransactionFileReader(TestCase):
     def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for filename in [
+            "bank_a_2021.csv",
+            "bank_a_2021.txt",
+            "bank_ab_2021.csv",
+            "fixed_bank_a_2021.csv",
+            "stmt-123.csv",
+            "unrelated.csv",
+        ]:
+            with open(os.path.join(self.temp_dir.name, filename), "w"):
+                pass
         return super().setUp()
 
     def tearDown(self) -> None:
+        self.temp_dir.cleanup()
         return super().tearDown()
 
+    def test_prefix_trie(self):
+        """Test that every matching prefix is found."""
+        trie = PrefixTrie()
+        trie.insert("ab", 1)
+        trie.insert("abc", 2)
+        trie.insert("abc", 3)
+        trie.insert("b", 4)
+        self.assertListEqual([1, 2, 3], trie.match("abcd"))
+        self.assertListEqual([1], trie.match("abd"))
+        self.assertListEqual([], trie.match("a"))
+
+    def test_build_file_index(self):
+        """Test that files are matched to every bank they belong to."""
+        configs = [
+            make_config("prefix a", "bank_a", self.temp_dir.name),
+            make_config("prefix ab", "bank_ab", self.temp_dir.name),
+            make_config("regex", r"stmt(-\d+)?", self.temp_dir.name, True),
+            make_config("no match", "missing", self.temp_dir.name),
+            make_config("no pattern", "", self.temp_dir.name),
+        ]
+        file_index = build_file_index(configs)
+        expected = {
+            "prefix a": ["bank_a_2021.csv", "bank_ab_2021.csv"],
+            "prefix ab": ["bank_ab_2021.csv"],
+            "regex": ["stmt-123.csv"],
+            "no match": [],
+            "no pattern": [],
+        }
+        for bank, files in expected.items():
+            with self.subTest(bank=bank):
+                self.assertCountEqual(
+                    [os.path.join(self.temp_dir.name, f) for f in files],
+                    file_index[bank],
+                )
+
+    def make_tree(self) -> tuple[str, str]:
+        """Create nested per-account & per-month statement folders."""
+        archive = os.path.join(self.temp_dir.name, "archive")
+        for account, month in [("acc1", "2021-01"), ("acc2", "2021-02")]:
+            os.makedirs(os.path.join(archive, account, month))
+            with open(
+                os.path.join(archive, account, month, f"bank_a_{month}.csv"),
+                "w",
+            ):
+                pass
+        return archive, os.path.join(archive, "acc1", "2021-01")
+
+    def test_resolve_source_paths(self):
+        """Test that several paths & wildcards are resolved."""
+        archive, month_dir = self.make_tree()
+        with self.assertLogs(level="WARNING"):
+            directories, missing_dir = resolve_source_paths(
+                f"{self.temp_dir.name} | {archive}/acc*/2021-0[12] | missing"
+            )
+        self.assertFalse(missing_dir)
+        self.assertListEqual(
+            [
+                self.temp_dir.name,
+                month_dir,
+                os.path.join(archive, "acc2", "2021-02"),
+            ],
+            directories,
+        )
+        # duplicates are removed
+        directories, missing_dir = resolve_source_paths(
+            f"{archive}|{archive}/"
+        )
+        self.assertFalse(missing_dir)
+        self.assertListEqual([archive], directories)
+        # existing folders are used as they are, even with wildcard names
+        old_dir = os.path.join(self.temp_dir.name, "Downloads [old]")
+        os.mkdir(old_dir)
+        self.assertTupleEqual(
+            ([old_dir], False), resolve_source_paths(old_dir)
+        )
+        # environment variables & "~" are expanded
+        with patch.dict(os.environ, {"B2Y_TEST_DIR": archive}):
+            self.assertListEqual(
+                [archive], resolve_source_paths("$B2Y_TEST_DIR")[0]
+            )
+        # the default directory is used if none exist
+        with patch.object(
+            transactionfile_reader, "find_directory", return_value=archive
+        ):
+            self.assertTupleEqual(
+                ([archive], True), resolve_source_paths("missing|missing2")
+            )
+
+    def test_scan_directories(self):
+        """Test that subdirectories are only scanned when recursive."""
+        archive, month_dir = self.make_tree()
+        files, directories = scan_directories([archive])
+        self.assertListEqual([], files)
+        self.assertListEqual([archive], directories)
+        files, directories = scan_directories(
+            [archive, month_dir], recursive=True, max_workers=2
+        )
+        self.assertListEqual(
+            [
+                os.path.join(month_dir, "bank_a_2021-01.csv"),
+                os.path.join(archive, "acc2", "2021-02", "bank_a_2021-02.csv"),
+            ],
+            files,
+        )
+        self.assertEqual(5, len(directories))
+
+    def test_recursive_search(self):
+        """Test that files in nested folders are found when enabled."""
+        archive, _ = self.make_tree()
+        source_path = f"{self.temp_dir.name}|{archive}"
+        configs = [
+            make_config("flat", "bank_a", source_path),
+            make_config("nested", "bank_a", source_path, recursive=True),
+        ]
+        file_index = build_file_index(configs)
+        self.assertEqual(2, len(file_index["flat"]))
+        self.assertEqual(4, len(file_index["nested"]))
+        for recursive, expected in [(False, 2), (True, 4)]:
+            with self.subTest(recursive=recursive):
+                files = get_files(
+                    name="test",
+                    file_pattern="bank_a",
+                    try_path=source_path,
+                    regex_active=False,
+                    ext=".csv",
+                    prefix="fixed_",
+                    recursive=recursive,
+                )
+                self.assertEqual(expected, len(files))
+
+    def test_literal_prefix(self):
+        """Test that regex characters in plain prefixes are matched as text."""
+        with open(os.path.join(self.temp_dir.name, "Statement (1).csv"), "w"):
+            pass
+        files = get_files(
+            name="test",
+            file_pattern="Statement (1",
+            try_path=self.temp_dir.name,
+            regex_active=False,
+            ext=".csv",
+            prefix="fixed_",
+        )
+        self.assertEqual(1, len(files))
+
+    def make_archives(self) -> tuple[str, str]:
+        """Create a zip & gzip archive of statements."""
+        zip_path = os.path.join(self.temp_dir.name, "export.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("2021/", "")
+            archive.writestr("2021/bank_a_01.csv", "Date,Payee\n1,Zip\n")
+            archive.writestr("2021/other.csv", "Date,Payee\n1,Other\n")
+        gz_path = os.path.join(self.temp_dir.name, "bank_a_02.csv.gz")
+        with gzip.open(gz_path, "wb") as archive:
+            archive.write("Empfänger,Bäckerei\n".encode("utf_16"))
+        return zip_path, gz_path
+
+    def test_archive_members(self):
+        """Test that archive members are listed & read in place."""
+        zip_path, gz_path = self.make_archives()
+        zip_member = os.path.join(zip_path, "2021", "bank_a_01.csv")
+        gz_member = os.path.join(gz_path, "bank_a_02.csv")
+        self.assertListEqual(
+            [zip_member, os.path.join(zip_path, "2021", "other.csv")],
+            list_archive_members(zip_path),
+        )
+        self.assertListEqual([gz_member], list_archive_members(gz_path))
+        self.assertEqual(b"Date,Payee\n1,Zip\n", read_file_bytes(zip_member))
+        self.assertEqual("utf_16", detect_encoding(gz_member))
+        self.assertEqual(
+            get_file_identity(zip_path), get_file_identity(zip_member)
+        )
+        # broken archives are skipped
+        broken_path = self.write_test_file(b"not a zip")
+        os.rename(broken_path, broken_path + ".zip")
+        with self.assertLogs(level="WARNING"):
+            self.assertListEqual(
+                [], list_archive_members(broken_path + ".zip")
+            )
+
+    def test_search_archives(self):
+        """Test that archive members are only matched when enabled."""
+        zip_path, gz_path = self.make_archives()
+        configs = [
+            make_config("plain", "bank_a", self.temp_dir.name),
+            make_config("archives", "bank_a", self.temp_dir.name),
+        ]
+        configs[1]["archives"] = True
+        file_index = build_file_index(configs)
+        plain_files = [
+            os.path.join(self.temp_dir.name, "bank_a_2021.csv"),
+            os.path.join(self.temp_dir.name, "bank_ab_2021.csv"),
+        ]
+        self.assertListEqual(plain_files, file_index["plain"])
+        self.assertCountEqual(
+            plain_files
+            + [
+                os.path.join(zip_path, "2021", "bank_a_01.csv"),
+                os.path.join(gz_path, "bank_a_02.csv"),
+            ],
+            file_index["archives"],
+        )
+
+    def write_test_file(self, data: bytes) -> str:
+        file_path = os.path.join(self.temp_dir.name, "encoding_test.csv")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        return file_path
+
+    def test_detect_encoding(self):
+        """Test encoding detection for different kinds of file."""
+        text = "Datum;Empfänger;Betrag\n01.02.2021;Bäckerei Müller;-3,50\n"
+        test_data = [
+            (text.encode("utf-8"), "", "utf-8"),
+            (text.encode("utf_8_sig"), "", "utf_8_sig"),
+            (text.encode("utf_16"), "", "utf_16"),
+            (text.encode("utf_32"), "", "utf_32"),
+            ("a,b,c\n".encode("ascii"), "", "ascii"),
+            # configured encoding takes priority over detection
+            (text.encode("utf-8"), "cp1252", "cp1252"),
+            # unknown configured encodings are ignored
+            (text.encode("utf-8"), "not-a-codec", "utf-8"),
+        ]
+        for data, config_encoding, expected in test_data:
+            with self.subTest(expected=expected, configured=config_encoding):
+                file_path = self.write_test_file(data)
+                self.assertEqual(
+                    expected,
+                    detect_encoding(file_path, config_encoding),
+                )
+
+    def test_detect_encoding_from_memory(self):
+        """Test that file contents already in memory are used if provided."""
+        file_path = self.write_test_file("a,b,c\n".encode("ascii"))
+        data = "Empfänger,Bäckerei\n".encode("utf_16")
+        self.assertEqual("utf_16", detect_encoding(file_path, data=data))
+
+    def test_detect_encoding_non_ascii_after_limit(self):
+        """Test that non-ASCII data past the detection limit is found."""
+        data = b"a,b,c\n" * 100 + "ø,å,é\n".encode("utf-8")
+        file_path = self.write_test_file(data)
+        with patch.object(transactionfile_reader, "DETECTION_CHUNK_SIZE", 64):
+            with patch.object(
+                transactionfile_reader, "DETECTION_MAX_BYTES", 128
+            ):
+                encoding = detect_encoding(file_path)
+        self.assertNotEqual("ascii", encoding)
+        data.decode(encoding)
+
 
 """def test_read_data(self):
         Test that the right number of rows are read from the test files
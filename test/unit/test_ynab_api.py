@@ -1,7 +1,13 @@
+import json
 import unittest
 from unittest import TestCase
 
-from bank2ynab.ynab_api import apply_mapping, generate_name_id_list
+import pandas as pd
+
+from bank2ynab.ynab_api import (
+    build_budget_payloads,
+    generate_name_id_list,
+)
 
 
 class TestYNAB_API(TestCase):
@@ -19,53 +25,47 @@ class TestYNAB_API(TestCase):
     def test_run(self):
         raise NotImplementedError
 
-    def test_apply_mapping(self):
+    def test_build_budget_payloads(self):
         test_data = {
-            "bank 1": [
-                {"test field 1": 1},
-                {"test field 2": 1},
-                {"test field 3": 1},
-            ],
-            "bank 2": [
-                {"test field 1": 2},
-                {"test field 2": 2},
-                {"test field 3": 2},
-            ],
-            "bank 3": [
-                {"test field 1": 3},
-                {"test field 2": 3},
-                {"test field 3": 3},
-            ],
+            "bank 1": pd.DataFrame(
+                {"account_id": ["", ""], "amount": [1000, -20]}
+            ),
+            "bank 2": pd.DataFrame({"account_id": [""], "amount": [5]}),
+            "bank 3": pd.DataFrame({"account_id": [""], "amount": [-7]}),
+            "bank 4": pd.DataFrame({"account_id": [], "amount": []}),
         }
         test_mapping = {
             "bank 1": {"budget_id": "budget 1", "account_id": "account_1"},
             "bank 2": {"budget_id": "budget 1", "account_id": "account_2"},
             "bank 3": {"budget_id": "budget 3", "account_id": "account_4"},
+            "bank 4": {"budget_id": "budget 4", "account_id": "account_5"},
         }
 
+        # budgets without transactions have nothing to upload
         expected_output = {
             "budget 1": {
                 "transactions": [
-                    {"test field 1": 1, "account_id": "account_1"},
-                    {"test field 2": 1, "account_id": "account_1"},
-                    {"test field 3": 1, "account_id": "account_1"},
-                    {"test field 1": 2, "account_id": "account_2"},
-                    {"test field 2": 2, "account_id": "account_2"},
-                    {"test field 3": 2, "account_id": "account_2"},
+                    {"account_id": "account_1", "amount": 1000},
+                    {"account_id": "account_1", "amount": -20},
+                    {"account_id": "account_2", "amount": 5},
                 ]
             },
             "budget 3": {
                 "transactions": [
-                    {"test field 1": 3, "account_id": "account_4"},
-                    {"test field 2": 3, "account_id": "account_4"},
-                    {"test field 3": 3, "account_id": "account_4"},
+                    {"account_id": "account_4", "amount": -7},
                 ]
             },
         }
 
-        test_dict = apply_mapping(test_data, test_mapping)
+        test_dict = build_budget_payloads(test_data, test_mapping)
 
-        self.assertDictEqual(expected_output, test_dict)
+        self.assertDictEqual(
+            expected_output,
+            {
+                budget_id: json.loads(payload)
+                for budget_id, payload in test_dict.items()
+            },
+        )
 
     def test_generate_name_id_list(self):
         test_dict = {
@@ -0,0 +1,71 @@
+"""
+Benchmark import_id generation in fill_api_columns() against the previous
+row-by-row implementation, checking both produce identical IDs.
+
+usage: python utils/benchmark_import_id.py [rows]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bank2ynab.dataframe_handler import fill_api_columns  # noqa: E402
+
+
+def make_transactions(rows: int) -> pd.DataFrame:
+    """
+    Generate transactions with repeated amounts & dates, so that many
+    import_ids need an occurrence count above 1.
+    """
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2012-01-01", "2021-12-31").strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "Date": rng.choice(dates, rows),
+            "Payee": "Payee",
+            "Memo": "Memo",
+            "amount": rng.integers(-5000, 5000, rows) * 10,
+        }
+    )
+
+
+def previous_import_ids(df: pd.DataFrame) -> pd.Series:
+    """
+    import_id generation as previously done in fill_api_columns().
+    """
+    df = df.copy()
+    df["date"] = df["Date"].astype(str)
+    df["import_id"] = df.agg(
+        lambda x: f"YNAB:{x['amount']}:{x['date']}:", axis=1
+    )
+    df["same_id_count"] = (df.groupby(["import_id"]).cumcount() + 1).astype(
+        str
+    )
+    return df["import_id"] + df["same_id_count"]
+
+
+def time_call(label: str, rows: int, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10}{elapsed:8.2f} s{rows / elapsed:14,.0f} rows/s")
+    return result
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_transactions(rows)
+    print(f"import_id generation for {rows:,} rows")
+    expected = time_call("previous", rows, previous_import_ids, df)
+    result = time_call("current", rows, fill_api_columns, df.copy())
+    if not expected.equals(result["import_id"]):
+        sys.exit("import_ids differ from the previous implementation")
+    print("import_ids identical")
+
+
+if __name__ == "__main__":
+    main()
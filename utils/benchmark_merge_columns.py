@@ -0,0 +1,112 @@
+"""
+Benchmark merge_duplicate_columns() on wide inputs with several memo &
+payee columns against the previous implementation, checking the merged
+values against a row-by-row merge. The previous implementation appends
+the text of whole columns to every row, so needs a lot of memory for
+more than a few hundred thousand rows.
+
+usage: python utils/benchmark_merge_columns.py [rows] [memo columns]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bank2ynab.dataframe_handler import (  # noqa: E402
+    get_used_columns,
+    merge_duplicate_columns,
+)
+
+
+def make_input_columns(memo_columns: int) -> list[str]:
+    """
+    Input columns of a wide statement, with the memo split over several
+    columns (as in several German formats) and the payee over two.
+    """
+    return (
+        ["Date", "skip", "Payee", "Inflow", "Payee"]
+        + ["Memo", "skip"] * memo_columns
+        + ["skip"] * 5
+    )
+
+
+def make_transactions(rows: int, input_columns: list[str]) -> pd.DataFrame:
+    """
+    Generate text columns with some blank & some space-padded values.
+    """
+    rng = np.random.default_rng(0)
+    words = np.array(["Rent", "  Card payment ", "Ref 123", "SEPA", None])
+    data = {
+        str(index): rng.choice(words, rows)
+        for index in range(len(input_columns))
+    }
+    df = pd.DataFrame(data)
+    df.columns = input_columns
+    return df
+
+
+def rowwise_merge(df: pd.DataFrame, key: str) -> pd.Series:
+    """
+    Merge each row's values for a duplicated column one row at a time.
+    """
+    dupes = df.loc[:, df.columns == key]
+    merged = [
+        " ".join(" ".join(str(v) for v in row if pd.notna(v)).split()) or None
+        for row in dupes.itertuples(index=False)
+    ]
+    return pd.Series(merged, index=df.index, dtype=object, name=key)
+
+
+def previous_merge(df: pd.DataFrame, input_columns: list[str]) -> None:
+    """
+    merge_duplicate_columns() as previously implemented.
+    """
+    cols_to_merge: dict[str, list[int]] = dict()
+    for index, col in enumerate(input_columns):
+        cols_to_merge.setdefault(col, []).append(index)
+    for key, key_cols in cols_to_merge.items():
+        if len(key_cols) > 1:
+            df.iloc[:, key_cols[0]] = df.iloc[:, key_cols[0]].astype(str) + " "
+            for dupe_count, key_col in enumerate(key_cols[1:]):
+                df.iloc[:, key_cols[0]] += f"{df.iloc[:, key_col]} "
+                df.columns.values[key_col] = f"{key} {dupe_count}"
+            df[key] = (
+                df[key].str.replace("\\s{2,}", " ", regex=True).str.strip()
+            )
+
+
+def time_call(label: str, rows: int, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10}{elapsed:8.2f} s{rows / elapsed:14,.0f} rows/s")
+    return result
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    memo_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    # skipped columns aren't read, so are never merged
+    input_columns = get_used_columns(make_input_columns(memo_columns))
+    df = make_transactions(rows, input_columns)
+    print(
+        f"merging {memo_columns} memo & 2 payee columns for {rows:,} rows"
+        f" ({len(make_input_columns(memo_columns))} columns)"
+    )
+    expected = {key: rowwise_merge(df, key) for key in ("Payee", "Memo")}
+    time_call("previous", rows, previous_merge, df.copy(), input_columns)
+    result = time_call(
+        "current", rows, merge_duplicate_columns, df.copy(), input_columns
+    )
+    for key, expected_col in expected.items():
+        if not expected_col.equals(result[key]):
+            sys.exit(f"{key} differs from a row-by-row merge")
+    print("merged values identical to a row-by-row merge")
+
+
+if __name__ == "__main__":
+    main()